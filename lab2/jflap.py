@@ -0,0 +1,202 @@
+"""
+Загрузка машин Тьюринга из файлов JFLAP (.jff).
+
+XML разбирается в таблицу переходов формата TuringMachine
+{(состояние, символ): (запись, направление, следующее состояние)},
+таблица компилируется (см. compile_transitions) и сохраняется на диск
+в кеше, ключом которого служит хеш содержимого файла. Повторная
+загрузка того же файла - одно чтение pickle вместо разбора XML. В кеше -
+только встроенные типы (словарь, массивы), а не объекты классов модуля:
+при запуске jflap.py как скрипта класс назывался бы __main__.LoadedMachine
+и не читался бы при импорте.
+"""
+
+import hashlib
+import os
+import pickle
+import xml.etree.ElementTree as ET
+
+from lab2 import (BLANK, CompiledTransitions, TuringMachine, _compiled_cache, compile_transitions,
+                  create_input_string)
+
+# Увеличивается при изменении формата кеша
+CACHE_VERSION = 2
+CACHE_DIR_NAME = '.jff_cache'
+
+
+class JflapMachine:
+    """Машина Тьюринга из файла JFLAP: состояния, ленты и переходы по каждой ленте"""
+
+    def __init__(self, tapes, start_state, final_states, rules, blank=BLANK):
+        self.tapes = tapes
+        self.start_state = start_state
+        self.final_states = final_states
+        # Правила: (откуда, куда, чтение, запись, сдвиг), по кортежу на каждую ленту
+        self.rules = rules
+        self.blank = blank
+
+    @property
+    def halt_state(self):
+        """Все заключительные состояния JFLAP сливаются в первое из них"""
+        return self.final_states[0] if self.final_states else 'halt'
+
+    def transitions(self):
+        """Таблица переходов в формате TuringMachine (только для одной ленты)"""
+        if self.tapes != 1:
+            raise ValueError(f"Симулятор поддерживает одну ленту, в машине лент: {self.tapes}")
+
+        halt_state = self.halt_state
+        table = {}
+        for source, target, read, write, move in self.rules:
+            if source in self.final_states:
+                # JFLAP останавливается при входе в заключительное состояние
+                continue
+            if target in self.final_states:
+                target = halt_state
+            key = (source, read[0])
+            if key in table and table[key] != (write[0], move[0], target):
+                raise ValueError(f"Недетерминированный переход для {key}")
+            table[key] = (write[0], move[0], target)
+        return table
+
+
+def _tape_values(transition, tag, tapes, default):
+    """Значения тега по лентам: <read tape="2">a</read>; пустой тег - пустой символ"""
+    values = [default] * tapes
+    for element in transition.findall(tag):
+        number = int(element.get('tape', '1'))
+        values[number - 1] = element.text if element.text else default
+    return tuple(values)
+
+
+def parse_jff(data, blank=BLANK):
+    """Разобрать XML JFLAP (bytes) в JflapMachine"""
+    root = ET.fromstring(data)
+    machine_type = root.findtext('type')
+    if machine_type != 'turing':
+        raise ValueError(f"Ожидалась машина Тьюринга, в файле тип '{machine_type}'")
+
+    tapes = int(root.findtext('tapes', '1'))
+    automaton = root.find('automaton')
+    if automaton.find('block') is not None:
+        raise ValueError("Строительные блоки JFLAP не поддерживаются")
+
+    names = {}
+    start_state = None
+    final_states = []
+    for state in automaton.findall('state'):
+        name = state.get('name') or f"q{state.get('id')}"
+        names[state.get('id')] = name
+        if state.find('initial') is not None:
+            start_state = name
+        if state.find('final') is not None:
+            final_states.append(name)
+    if start_state is None:
+        raise ValueError("В машине нет начального состояния")
+
+    rules = []
+    for transition in automaton.findall('transition'):
+        rules.append((
+            names[transition.findtext('from')],
+            names[transition.findtext('to')],
+            _tape_values(transition, 'read', tapes, blank),
+            _tape_values(transition, 'write', tapes, blank),
+            _tape_values(transition, 'move', tapes, 'S'),
+        ))
+
+    return JflapMachine(tapes, start_state, final_states, rules, blank)
+
+
+class LoadedMachine:
+    """Скомпилированная машина из файла .jff, готовая к запуску"""
+
+    def __init__(self, transitions, start_state, halt_state, blank, compiled):
+        self.transitions = transitions
+        self.start_state = start_state
+        self.halt_state = halt_state
+        self.blank = blank
+        self.compiled = compiled
+
+    def to_dict(self):
+        """Словарь из встроенных типов для кеша (таблица - атрибутами CompiledTransitions)"""
+        return {'transitions': self.transitions, 'start_state': self.start_state,
+                'halt_state': self.halt_state, 'blank': self.blank, 'compiled': vars(self.compiled)}
+
+    @classmethod
+    def from_dict(cls, data):
+        compiled = CompiledTransitions.__new__(CompiledTransitions)
+        compiled.__dict__.update(data['compiled'])
+        return cls(data['transitions'], data['start_state'], data['halt_state'], data['blank'], compiled)
+
+    def create(self, input_tape, sparse=False):
+        """Новая TuringMachine на этой таблице переходов"""
+        return TuringMachine(input_tape, self.transitions, sparse=sparse,
+                             start_state=self.start_state, halt_state=self.halt_state,
+                             blank=self.blank)
+
+
+def load_jff(path, cache_dir=None, blank=BLANK):
+    """
+    Загрузить машину из .jff с дисковым кешем.
+    По умолчанию кеш лежит в каталоге .jff_cache рядом с файлом.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    digest = hashlib.sha256(data + f"|{blank}|{CACHE_VERSION}".encode('utf-8')).hexdigest()
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(path)), CACHE_DIR_NAME)
+    cache_path = os.path.join(cache_dir, digest + '.pickle')
+
+    loaded = None
+    try:
+        with open(cache_path, 'rb') as f:
+            loaded = LoadedMachine.from_dict(pickle.load(f))
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, TypeError, KeyError):
+        loaded = None
+
+    if loaded is None:
+        jflap = parse_jff(data, blank)
+        transitions = jflap.transitions()
+        compiled = compile_transitions(transitions, jflap.start_state, jflap.halt_state, blank)
+        loaded = LoadedMachine(transitions, jflap.start_state, jflap.halt_state, blank, compiled)
+
+        os.makedirs(cache_dir, exist_ok=True)
+        temporary = cache_path + f'.{os.getpid()}.tmp'
+        with open(temporary, 'wb') as f:
+            pickle.dump(loaded.to_dict(), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary, cache_path)
+    else:
+        # Скомпилированная таблица из кеша используется TuringMachine без перекомпиляции
+        key = (frozenset(loaded.transitions.items()), loaded.start_state, loaded.halt_state, blank)
+        _compiled_cache.setdefault(key, loaded.compiled)
+
+    return loaded
+
+
+def test_jflap_multiplication():
+    """Сравнить машину из Post_Turing/JFLAP/lab2.jff с результатом умножения"""
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    path = os.path.normpath(os.path.join(current_dir, '..', 'Post_Turing', 'JFLAP', 'lab2.jff'))
+    machine = load_jff(path)
+
+    print(f"Загружено: {path}")
+    print(f"Состояний: {len(machine.compiled.states)}, переходов: {len(machine.transitions)}")
+
+    failures = 0
+    for a in range(4):
+        for b in range(4):
+            tm = machine.create(create_input_string(a, b))
+            final_tape, final_state = tm.run_compiled(max_steps=100_000, accelerate=True)
+            result = final_tape.count('1')
+            if final_state != machine.halt_state or result != a * b:
+                failures += 1
+                print(f"✗ {a} × {b}: состояние {final_state}, получено {result}")
+
+    if failures == 0:
+        print("✓ УСПЕХ! Машина JFLAP умножает верно для a, b от 0 до 3")
+    return failures == 0
+
+
+if __name__ == "__main__":
+    test_jflap_multiplication()
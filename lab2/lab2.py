@@ -1,23 +1,423 @@
+import argparse
+import itertools
+import json
+import operator
+import os
+import re
+import sys
+import time
+from array import array
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+BLANK = '_'
+
+# ИСПРАВЛЕННЫЕ ПРАВИЛА ПЕРЕХОДОВ
+MULTIPLICATION_TRANSITIONS = {
+    # Начальное состояние - найти первую 1 для пометки
+    ('q0', '1'): ('X', 'R', 'q1'),
+    ('q0', '*'): ('*', 'R', 'q9'),
+    ('q9', '1'): ('y', 'R', 'q9'),
+    ('q9', '='): ('=', 'S', 'halt'),
+
+    # После пометки левой 1, перейти к правой части
+    ('q1', '1'): ('1', 'R', 'q1'),
+    ('q1', '*'): ('*', 'R', 'q2'),
+
+    # Найти первую 1 в правой части для копирования
+    ('q2', '1'): ('Y', 'R', 'q3'),
+    ('q2', 'Y'): ('Y', 'R', 'q2'),
+    ('q2', '='): ('=', 'L', 'q7'),
+
+    # Перейти к концу ленты чтобы добавить новую 1
+    ('q3', '1'): ('1', 'R', 'q3'),
+    ('q3', '='): ('=', 'R', 'q4'),
+    ('q4', '_'): ('1', 'L', 'q5'),
+    ('q4', '1'): ('1', 'R', 'q4'),
+
+    # Вернуться к правой части
+    ('q5', '1'): ('1', 'L', 'q5'),
+    ('q5', '='): ('=', 'L', 'q6'),
+    ('q6', '1'): ('1', 'L', 'q6'),
+    ('q6', 'Y'): ('Y', 'L', 'q6'),
+    ('q6', '*'): ('*', 'R', 'q2'),
+
+    # Все правые 1 обработаны, вернуться к левой части - СБРОСИТЬ Y обратно в 1
+    ('q7', 'Y'): ('1', 'L', 'q7'),  # Сбросить Y в 1
+    ('q7', '1'): ('1', 'L', 'q7'),
+    ('q7', '*'): ('*', 'L', 'q8'),
+
+    # Очистка - все левые 1 обработаны
+    ('q8', '1'): ('1', 'L', 'q8'),
+    ('q8', 'X'): ('X', 'R', 'q0'),  # ДОБАВЛЕНО: Очистить оставшиеся Y
+}
+
+# Смещение головки для каждого направления
+MOVES = {'L': -1, 'R': 1, 'S': 0}
+
+# Ширина строки таблицы: символ ленты кодируется одним байтом
+SYMBOL_SLOTS = 256
+
+
+class CompiledTransitions:
+    """
+    Таблица переходов, скомпилированная в плоские целочисленные массивы.
+    Состояния и символы получают плотные номера, переход для пары
+    (состояние, символ) лежит по индексу (состояние << 8) | символ.
+    """
+
+    def __init__(self, transitions, start_state='q0', halt_state='halt', blank=BLANK):
+        # Нумерация состояний: начальное получает 0, затем в порядке появления
+        self.states = [start_state]
+        self.state_ids = {start_state: 0}
+        # Нумерация символов: пустой символ всегда получает 0
+        self.symbols = [blank]
+        self.symbol_ids = {blank: 0}
+
+        for (state, symbol), (write_symbol, move_direction, next_state) in transitions.items():
+            if move_direction not in MOVES:
+                raise ValueError(f"Неверное направление: {move_direction}")
+            for name in (state, next_state):
+                self._state_id(name)
+            for ch in (symbol, write_symbol):
+                self.encode_symbol(ch)
+        self._state_id(halt_state)
+
+        self.start_id = 0
+        self.halt_id = self.state_ids[halt_state]
+        self.blank_id = 0
+
+        size = len(self.states) * SYMBOL_SLOTS
+        self.next_state = array('i', [-1]) * size   # -1: переход не определён
+        self.write_symbol = bytearray(size)
+        self.move = array('b', [0]) * size
+
+        for (state, symbol), (write_symbol, move_direction, next_state) in transitions.items():
+            index = (self.state_ids[state] << 8) | self.symbol_ids[symbol]
+            self.next_state[index] = self.state_ids[next_state]
+            self.write_symbol[index] = self.symbol_ids[write_symbol]
+            self.move[index] = MOVES[move_direction]
+
+        # Переходы-прогоны: состояние и символ не меняются, головка движется.
+        # Такой переход повторяется на всей серии одинаковых символов.
+        self.sweep = bytearray(size)
+        for index in range(size):
+            if (self.next_state[index] == index >> 8
+                    and self.write_symbol[index] == index & 0xFF
+                    and self.move[index] != 0):
+                self.sweep[index] = 1
+
+    def _state_id(self, name):
+        if name not in self.state_ids:
+            self.state_ids[name] = len(self.states)
+            self.states.append(name)
+        return self.state_ids[name]
+
+    def encode_symbol(self, symbol):
+        """Номер символа; незнакомые символы ленты получают новый номер без переходов"""
+        symbol_id = self.symbol_ids.get(symbol)
+        if symbol_id is None:
+            if len(self.symbols) >= SYMBOL_SLOTS:
+                raise ValueError(f"Слишком много различных символов (максимум {SYMBOL_SLOTS})")
+            symbol_id = len(self.symbols)
+            self.symbol_ids[symbol] = symbol_id
+            self.symbols.append(symbol)
+        return symbol_id
+
+    def encode_tape(self, tape):
+        return bytearray(self.encode_symbol(ch) for ch in tape)
+
+    def decode_tape(self, cells):
+        symbols = self.symbols
+        return [symbols[c] for c in cells]
+
+
+_compiled_cache = {}
+
+
+def compile_transitions(transitions, start_state='q0', halt_state='halt', blank=BLANK):
+    """Скомпилировать таблицу переходов один раз и переиспользовать между запусками"""
+    key = (frozenset(transitions.items()), start_state, halt_state, blank)
+    compiled = _compiled_cache.get(key)
+    if compiled is None:
+        compiled = CompiledTransitions(transitions, start_state, halt_state, blank)
+        _compiled_cache[key] = compiled
+    return compiled
+
+
+def _run_length(cells, start, stop, symbol):
+    """
+    Длина серии байтов symbol, начиная с cells[start] в сторону индекса stop
+    (stop не включается). Участки читаются срезами удваивающейся длины,
+    поэтому работа пропорциональна длине серии, а не ленты.
+    """
+    pattern = bytes((symbol,))
+    size = 64
+    if stop > start:
+        pos = start
+        while pos < stop:
+            end = min(stop, pos + size)
+            rest = len(cells[pos:end].lstrip(pattern))
+            if rest:
+                return end - rest - start
+            pos = end
+            size <<= 1
+        return stop - start
+
+    pos = start + 1
+    while pos > stop + 1:
+        begin = max(stop + 1, pos - size)
+        rest = len(cells[begin:pos].rstrip(pattern))
+        if rest:
+            return start + 1 - (begin + rest)
+        pos = begin
+        size <<= 1
+    return start - stop
+
+
+class Tape:
+    """
+    Лента на основе bytearray: один байт на ячейку, запас растёт
+    удвоением с обеих сторон, логическая ячейка 0 лежит по индексу origin.
+    Запись в любую сторону стоит O(1) амортизированно.
+    """
+
+    def __init__(self, cells=b'', margin=64, start=0):
+        cells = bytes(cells)
+        self.cells = bytearray(margin) + bytearray(cells) + bytearray(margin)
+        # start - логическая позиция первой ячейки cells
+        self.origin = margin - start
+        # Записанная область ленты [lo, hi) в логических координатах
+        self.lo = start
+        self.hi = start + len(cells)
+
+    def read(self, pos):
+        index = pos + self.origin
+        if 0 <= index < len(self.cells):
+            return self.cells[index]
+        return 0
+
+    def write(self, pos, symbol):
+        self._ensure(pos)
+        self.cells[pos + self.origin] = symbol
+
+    def _ensure(self, pos):
+        """Расширить записанную область до ячейки pos, пустые ячейки уже нули"""
+        index = pos + self.origin
+        if index < 0:
+            grow = max(-index, len(self.cells))
+            self.cells[0:0] = bytes(grow)
+            self.origin += grow
+        elif index >= len(self.cells):
+            self.cells.extend(bytes(max(index - len(self.cells) + 1, len(self.cells))))
+        grown = pos < self.lo or pos >= self.hi
+        self.lo = min(self.lo, pos)
+        self.hi = max(self.hi, pos + 1)
+        return grown
+
+    def window(self, pos):
+        """
+        Участок для быстрого цикла: (буфер, смещение, lo, hi, расширена ли лента).
+        Ячейка pos лежит в buffer[pos + смещение] при lo <= pos < hi.
+        """
+        grown = self._ensure(pos)
+        return self.cells, self.origin, self.lo, self.hi, grown
+
+    def untouch(self, pos):
+        """Откатить расширение на крайнюю ячейку pos, в которую так и не записали"""
+        if pos == self.hi - 1:
+            self.hi -= 1
+        elif pos == self.lo:
+            self.lo += 1
+
+    def __len__(self):
+        return self.hi - self.lo
+
+    def __iter__(self):
+        return iter(self.snapshot())
+
+    def snapshot(self):
+        """Копия записанной части ленты"""
+        return bytes(self.cells[self.lo + self.origin:self.hi + self.origin])
+
+
+class SparseTape:
+    """
+    Разреженная лента из блоков по CHUNK_SIZE байт: память выделяется
+    только под блоки, в которые реально заходила головка.
+    """
+
+    CHUNK_BITS = 12
+    CHUNK_SIZE = 1 << CHUNK_BITS
+
+    def __init__(self, cells=b''):
+        self.chunks = {}
+        self.lo = 0
+        self.hi = 0
+        for pos, symbol in enumerate(bytes(cells)):
+            self.write(pos, symbol)
+        self.hi = len(cells)
+
+    def _chunk(self, pos):
+        number = pos >> self.CHUNK_BITS
+        chunk = self.chunks.get(number)
+        if chunk is None:
+            chunk = self.chunks[number] = bytearray(self.CHUNK_SIZE)
+        return number, chunk
+
+    def read(self, pos):
+        chunk = self.chunks.get(pos >> self.CHUNK_BITS)
+        if chunk is None:
+            return 0
+        return chunk[pos & (self.CHUNK_SIZE - 1)]
+
+    def write(self, pos, symbol):
+        self._ensure(pos)
+        self._chunk(pos)[1][pos & (self.CHUNK_SIZE - 1)] = symbol
+
+    def _ensure(self, pos):
+        grown = pos < self.lo or pos >= self.hi
+        self.lo = min(self.lo, pos)
+        self.hi = max(self.hi, pos + 1)
+        return grown
+
+    def window(self, pos):
+        grown = self._ensure(pos)
+        number, chunk = self._chunk(pos)
+        start = number << self.CHUNK_BITS
+        lo = max(self.lo, start)
+        hi = min(self.hi, start + self.CHUNK_SIZE)
+        return chunk, -start, lo, hi, grown
+
+    def untouch(self, pos):
+        if pos == self.hi - 1:
+            self.hi -= 1
+        elif pos == self.lo:
+            self.lo += 1
+
+    def __len__(self):
+        return self.hi - self.lo
+
+    def __iter__(self):
+        for pos in range(self.lo, self.hi):
+            yield self.read(pos)
+
+    def snapshot(self):
+        return bytes(self)
+
+
+MASK64 = (1 << 64) - 1
+
+
+def _zobrist(pos, symbol):
+    """Псевдослучайный 64-битный ключ пары (позиция, символ); пустой символ даёт 0"""
+    if symbol == 0:
+        return 0
+    x = (pos * 0x9E3779B97F4A7C15 + symbol * 0xBF58476D1CE4E5B9) & MASK64
+    x ^= x >> 31
+    x = (x * 0x94D049BB133111EB) & MASK64
+    return x ^ (x >> 29)
+
+
+# Лента считается неограниченно растущей, если прибавляет ячейку хотя бы раз в столько шагов
+UNBOUNDED_RATE = 16
+
+
+class _HashedRun:
+    """
+    Пошаговое выполнение с инкрементным хешем конфигурации.
+    Хеш ленты - XOR ключей непустых ячеек, поэтому запись меняет его за O(1),
+    а пустые ячейки по краям на него не влияют.
+    """
+
+    def __init__(self, machine, state, head, tape):
+        self.machine = machine
+        self.state = state
+        self.head = head
+        self.tape = tape
+        self.tape_hash = 0
+        for pos in range(tape.lo, tape.hi):
+            self.tape_hash ^= _zobrist(pos, tape.read(pos))
+
+    def step(self):
+        """Один шаг; False, если машина остановилась или переход не определён"""
+        machine = self.machine
+        if self.state == machine.halt_id:
+            return False
+        symbol = self.tape.read(self.head)
+        index = (self.state << 8) | symbol
+        new_state = machine.next_state[index]
+        if new_state < 0:
+            return False
+
+        written = machine.write_symbol[index]
+        if written != symbol:
+            self.tape_hash ^= _zobrist(self.head, symbol) ^ _zobrist(self.head, written)
+        self.tape.write(self.head, written)
+        self.head += machine.move[index]
+        self.state = new_state
+        return True
+
+    def hash(self):
+        # Номера состояний сдвинуты за диапазон символов, чтобы не совпасть с ключами ленты
+        return self.tape_hash ^ _zobrist(self.head, SYMBOL_SLOTS + self.state)
+
+    def key(self):
+        """Точная конфигурация без пустых ячеек по краям - для проверки совпадения хешей"""
+        cells = self.tape.snapshot()
+        content = cells.strip(b'\0')
+        if not content:
+            return self.state, self.head, 0, content
+        leading = len(cells) - len(cells.lstrip(b'\0'))
+        return self.state, self.head, self.tape.lo + leading, content
+
+
+class LoopReport:
+    """
+    Итог запуска с поиском циклов:
+    'halt' - остановка, 'stuck' - нет перехода, 'loop' - конфигурация повторилась,
+    'unbounded' - лента равномерно росла до конца бюджета (эвристика),
+    'limit' - бюджет шагов исчерпан без признаков цикла или роста ленты.
+    """
+
+    def __init__(self, kind, start=None, period=None):
+        self.kind = kind
+        self.start = start
+        self.period = period
+
+    def __str__(self):
+        if self.kind == 'loop':
+            return f"зацикливание с шага {self.start}, период {self.period}"
+        return {
+            'halt': "машина остановилась",
+            'stuck': "нет перехода для текущей конфигурации",
+            'unbounded': "лента растёт без ограничения",
+            'limit': "достигнут лимит шагов",
+        }[self.kind]
+
+
 class TuringMachine:
-    def __init__(self, input_tape):
-        self.tape = list(input_tape)
+    def __init__(self, input_tape, transitions=None, sparse=False,
+                 start_state='q0', halt_state='halt', blank=BLANK):
+        self.transitions = MULTIPLICATION_TRANSITIONS if transitions is None else transitions
+        self.machine = compile_transitions(self.transitions, start_state, halt_state, blank)
+        self.halt_state = halt_state
+        tape_class = SparseTape if sparse else Tape
+        self.tape = tape_class(self.machine.encode_tape(input_tape))
         self.head = 0
-        self.state = 'q0'
+        self.state = start_state
         self.steps = 0
+        # Итог последнего запуска с detect_loops=True (LoopReport)
+        self.loop_report = None
+
+    def tape_symbols(self):
+        """Содержимое записанной части ленты в виде списка символов"""
+        return self.machine.decode_tape(self.tape)
         
     def _get_current_symbol(self):
-        if self.head < 0 or self.head >= len(self.tape):
-            return '_'
-        return self.tape[self.head]
+        return self.machine.symbols[self.tape.read(self.head)]
     
     def _set_current_symbol(self, symbol):
-        if self.head < 0:
-            self.tape = [symbol] + ['_'] * (-self.head - 1) + self.tape
-            self.head = 0
-        elif self.head >= len(self.tape):
-            self.tape = self.tape + ['_'] * (self.head - len(self.tape)) + [symbol]
-        else:
-            self.tape[self.head] = symbol
+        self.tape.write(self.head, self.machine.encode_symbol(symbol))
     
     def _move(self, direction):
         if direction == 'R':
@@ -28,8 +428,8 @@ class TuringMachine:
             raise ValueError(f"Неверное направление: {direction}")
     
     def _print_state(self):
-        tape_str = ''.join(self.tape)
-        head_pos = ' ' * self.head + '^'
+        tape_str = ''.join(self.tape_symbols())
+        head_pos = ' ' * (self.head - self.tape.lo) + '^'
         print(f"Шаг {self.steps:3d}: Состояние={self.state:2s} | Лента: {tape_str}")
         print(f"           {' ' * 12} {head_pos}")
     
@@ -39,58 +439,17 @@ class TuringMachine:
             self._print_state()
             print("\n" + "="*50)
 
-        # ИСПРАВЛЕННЫЕ ПРАВИЛА ПЕРЕХОДОВ
-        transitions = {
-            # Начальное состояние - найти первую 1 для пометки
-            ('q0', '1'): ('X', 'R', 'q1'),
-            ('q0', '*'): ('*', 'R', 'q9'),
-            ('q9', '1'): ('y', 'R', 'q9'),
-            ('q9', '='): ('=', 'S', 'halt'),
-
-            # После пометки левой 1, перейти к правой части
-            ('q1', '1'): ('1', 'R', 'q1'),
-            ('q1', '*'): ('*', 'R', 'q2'),
-
-            # Найти первую 1 в правой части для копирования
-            ('q2', '1'): ('Y', 'R', 'q3'),
-            ('q2', 'Y'): ('Y', 'R', 'q2'),
-            ('q2', '='): ('=', 'L', 'q7'),
-
-            # Перейти к концу ленты чтобы добавить новую 1
-            ('q3', '1'): ('1', 'R', 'q3'),
-            ('q3', '='): ('=', 'R', 'q4'),
-            ('q4', '_'): ('1', 'L', 'q5'),
-            ('q4', '1'): ('1', 'R', 'q4'),
-
-            # Вернуться к правой части
-            ('q5', '1'): ('1', 'L', 'q5'),
-            ('q5', '='): ('=', 'L', 'q6'),
-            ('q6', '1'): ('1', 'L', 'q6'),
-            ('q6', 'Y'): ('Y', 'L', 'q6'),
-            ('q6', '*'): ('*', 'R', 'q2'),
-
-            # Все правые 1 обработаны, вернуться к левой части - СБРОСИТЬ Y обратно в 1
-            ('q7', 'Y'): ('1', 'L', 'q7'),  # Сбросить Y в 1
-            ('q7', '1'): ('1', 'L', 'q7'),
-            ('q7', '*'): ('*', 'L', 'q8'),
-
-            # Очистка - все левые 1 обработаны
-            ('q8', '1'): ('1', 'L', 'q8'),
-            ('q8', 'X'): ('X', 'R', 'q0'),  # ДОБАВЛЕНО: Очистить оставшиеся Y
-            
-        }
-
-        while self.state != 'halt' and self.steps < max_steps:
+        while self.state != self.halt_state and self.steps < max_steps:
             current_symbol = self._get_current_symbol()
             key = (self.state, current_symbol)
 
-            if key not in transitions:
+            if key not in self.transitions:
                 if verbose:
                     print(f"\nНе определен переход для (состояние={self.state}, символ={current_symbol})")
-                    print("Текущая лента:", ''.join(self.tape))
+                    print("Текущая лента:", ''.join(self.tape_symbols()))
                 break
             
-            write_symbol, move_direction, next_state = transitions[key]
+            write_symbol, move_direction, next_state = self.transitions[key]
 
             self._set_current_symbol(write_symbol)
             self._move(move_direction)
@@ -102,15 +461,260 @@ class TuringMachine:
 
         if verbose:
             print("\n" + "="*50)
-            if self.state == 'halt':
+            if self.state == self.halt_state:
                 print("Вычисления завершены успешно!")
             else:
                 print(f"Вычисления остановлены после {self.steps} шагов")
 
-            result = ''.join([c for c in self.tape if c == '1'])
+            result = ''.join([c for c in self.tape_symbols() if c == '1'])
             print(f"Финальный результат: {len(result)} единиц -> {result}")
 
-        return self.tape, self.state
+        return self.tape_symbols(), self.state
+
+    def run_compiled(self, max_steps=500, accelerate=False, trace=None, detect_loops=False,
+                     profile=None):
+        """
+        Быстрый запуск по скомпилированной таблице переходов.
+        Цикл работает только с целыми номерами состояний и символов,
+        результат совпадает с run(verbose=False) шаг в шаг.
+
+        accelerate=True включает макрошаги: переход-прогон вида
+        (q, s) -> (s, R/L, q) выполняется сразу для всей серии символов s,
+        а к steps прибавляется реальное число пройденных ячеек.
+
+        trace - объект записи трассы (см. tm_trace.TraceRecorder): получает
+        каждый шаг и снимки ленты; с трассой макрошаги не используются.
+
+        detect_loops=True ищет повтор конфигурации и останавливает машину
+        досрочно; итог записывается в self.loop_report (см. LoopReport).
+
+        profile - счётчики выполнения (см. tm_profile.RunProfile): переходы,
+        позиции головки и время по состояниям; с профилем макрошаги тоже не
+        используются. Без него цикл не меняется.
+
+        Трасса, профиль и поиск циклов - отдельные режимы: их сочетание
+        даёт ValueError, а не молча теряет одно из них.
+        """
+        modes = [name for name, value in (('trace', trace), ('profile', profile),
+                                          ('detect_loops', detect_loops or None))
+                 if value is not None]
+        if len(modes) > 1:
+            raise ValueError(f"Режимы {', '.join(modes)} нельзя сочетать в одном запуске")
+        if detect_loops:
+            return self._run_detect_loops(max_steps)
+
+        machine = self.machine
+        next_state = machine.next_state
+        write_symbol = machine.write_symbol
+        move = machine.move
+        sweep = machine.sweep
+        halt = machine.halt_id
+
+        tape = self.tape
+        head = self.head
+        state = machine.state_ids[self.state]
+        steps = self.steps
+
+        if trace is not None:
+            trace.start(machine, steps, state, head, tape)
+        if profile is not None:
+            profile.start(machine, head)
+
+        # Шаг, на котором головка последний раз вышла за записанную область
+        touched = -1
+        cells, offset, lo, hi, grown = tape.window(head)
+        if grown:
+            touched = steps
+
+        if trace is not None:
+            record = trace.record
+            interval = trace.checkpoint_interval
+            while state != halt and steps < max_steps:
+                pos = head + offset
+                symbol = cells[pos]
+                index = (state << 8) | symbol
+                new_state = next_state[index]
+                if new_state < 0:
+                    break
+
+                written = write_symbol[index]
+                cells[pos] = written
+                record(steps, state, head, symbol, written)
+                head += move[index]
+                state = new_state
+                steps += 1
+
+                # Снимок до расширения ленты под новую позицию головки
+                if steps % interval == 0:
+                    trace.checkpoint(steps, state, head, tape)
+
+                if head < lo or head >= hi:
+                    cells, offset, lo, hi, grown = tape.window(head)
+                    if grown:
+                        touched = steps
+        elif profile is not None:
+            transition_counts = profile.transition_counts
+            positions = profile.head_positions
+            state_time = profile.state_time
+            clock = profile.clock
+            entered = clock() if clock else 0.0
+            while state != halt and steps < max_steps:
+                pos = head + offset
+                index = (state << 8) | cells[pos]
+                new_state = next_state[index]
+                if new_state < 0:
+                    break
+
+                transition_counts[index] += 1
+                positions[head] = positions.get(head, 0) + 1
+                cells[pos] = write_symbol[index]
+                head += move[index]
+                if clock and new_state != state:
+                    now = clock()
+                    state_time[state] += now - entered
+                    entered = now
+                state = new_state
+                steps += 1
+
+                if head < lo or head >= hi:
+                    cells, offset, lo, hi, grown = tape.window(head)
+                    if grown:
+                        touched = steps
+            if clock:
+                state_time[state] += clock() - entered
+        elif not accelerate:
+            while state != halt and steps < max_steps:
+                index = (state << 8) | cells[head + offset]
+                new_state = next_state[index]
+                if new_state < 0:
+                    break
+
+                cells[head + offset] = write_symbol[index]
+                head += move[index]
+                state = new_state
+                steps += 1
+
+                if head < lo or head >= hi:
+                    cells, offset, lo, hi, grown = tape.window(head)
+                    if grown:
+                        touched = steps
+        else:
+            while state != halt and steps < max_steps:
+                pos = head + offset
+                symbol = cells[pos]
+                index = (state << 8) | symbol
+
+                if sweep[index]:
+                    # Пропустить всю серию внутри окна, не больше оставшегося бюджета
+                    if move[index] > 0:
+                        stop = min(hi + offset, pos + max_steps - steps)
+                        run = _run_length(cells, pos, stop, symbol)
+                        head += run
+                    else:
+                        stop = max(lo + offset - 1, pos - (max_steps - steps))
+                        run = _run_length(cells, pos, stop, symbol)
+                        head -= run
+                    steps += run
+                else:
+                    new_state = next_state[index]
+                    if new_state < 0:
+                        break
+                    cells[pos] = write_symbol[index]
+                    head += move[index]
+                    state = new_state
+                    steps += 1
+
+                if head < lo or head >= hi:
+                    cells, offset, lo, hi, grown = tape.window(head)
+                    if grown:
+                        touched = steps
+
+        # Ячейка под головкой попала в ленту, но записи в неё не было
+        if touched == steps:
+            tape.untouch(head)
+
+        if trace is not None:
+            trace.finish(steps, state, head)
+        if profile is not None:
+            profile.finish(head, tape)
+
+        self.head = head
+        self.state = machine.states[state]
+        self.steps = steps
+        return self.tape_symbols(), self.state
+
+    def _run_detect_loops(self, max_steps):
+        """
+        Поиск цикла алгоритмом Брента по хешам конфигураций (состояние,
+        головка, лента). Хранится одна сохранённая конфигурация, совпадение
+        хешей подтверждается точным сравнением.
+        """
+        machine = self.machine
+        first_step = self.steps
+        initial = (machine.state_ids[self.state], self.head,
+                   self.tape.snapshot(), self.tape.lo)
+
+        run = _HashedRun(machine, initial[0], self.head, self.tape)
+        steps = first_step
+        power = lam = 1
+        saved_hash, saved_key, saved_step = run.hash(), run.key(), steps
+        # Длина ленты в моменты сохранения (шаги 1, 2, 4, 8, ...)
+        sizes = [(steps, len(self.tape))]
+        report = None
+
+        while steps < max_steps:
+            if not run.step():
+                break
+            steps += 1
+
+            if run.hash() == saved_hash and run.key() == saved_key:
+                start = self._loop_start(initial, first_step, steps - saved_step)
+                report = LoopReport('loop', start, steps - saved_step)
+                break
+
+            if lam == power:
+                saved_hash, saved_key, saved_step = run.hash(), run.key(), steps
+                sizes.append((steps, len(self.tape)))
+                power *= 2
+                lam = 0
+            lam += 1
+
+        if report is None:
+            if run.state == machine.halt_id:
+                report = LoopReport('halt')
+            elif steps < max_steps:
+                report = LoopReport('stuck')
+            else:
+                # Лента росла на каждом из последних удвоений числа шагов,
+                # причём не медленнее чем на ячейку за UNBOUNDED_RATE шагов
+                growth = sizes[-4:] + [(steps, len(self.tape))]
+                if len(sizes) > 4 and all(
+                        (b_size - a_size) * UNBOUNDED_RATE >= b_step - a_step > 0
+                        for (a_step, a_size), (b_step, b_size) in zip(growth, growth[1:])):
+                    report = LoopReport('unbounded')
+                else:
+                    report = LoopReport('limit')
+
+        self.head = run.head
+        self.state = machine.states[run.state]
+        self.steps = steps
+        self.loop_report = report
+        return self.tape_symbols(), self.state
+
+    def _loop_start(self, initial, first_step, period):
+        """Первый шаг цикла: два прогона со сдвигом period идут до совпадения"""
+        state, head, cells, lo = initial
+        behind = _HashedRun(self.machine, state, head, Tape(cells, start=lo))
+        ahead = _HashedRun(self.machine, state, head, Tape(cells, start=lo))
+        for _ in range(period):
+            ahead.step()
+
+        step = first_step
+        while behind.hash() != ahead.hash() or behind.key() != ahead.key():
+            behind.step()
+            ahead.step()
+            step += 1
+        return step
 
 def create_input_string(a, b):
     """Создать входную строку в формате '111*111=' для заданных чисел"""
@@ -118,6 +722,11 @@ def create_input_string(a, b):
     right_ones = '1' * b
     return f"{left_ones}*{right_ones}=______________"
 
+def parse_input_string(input_str):
+    """Числа (a, b) из ленты вида '111*11=___' или None, если лента не такая"""
+    match = re.fullmatch(r'(1*)\*(1*)=_*', input_str)
+    return (len(match.group(1)), len(match.group(2))) if match else None
+
 def test_multiplication():
     """Протестировать машину Тьюринга для умножения"""
     test_cases = [
@@ -140,7 +749,7 @@ def test_multiplication():
         print(f"Вход: {input_str}")
         
         tm = TuringMachine(input_str)
-        final_tape, final_state = tm.run(verbose=False, max_steps=500)
+        final_tape, final_state = tm.run_compiled(max_steps=500)
         
         result_ones = ''.join([c for c in final_tape if c == '1'])
         
@@ -155,6 +764,104 @@ def test_multiplication():
         
         print("-" * 40)
 
+def test_compiled_equivalence(max_value=3):
+    """Сравнить скомпилированный запуск со словарным шаг в шаг"""
+    cases = [(create_input_string(a, b), None)
+             for a in range(max_value + 1) for b in range(max_value + 1)]
+    # Ленты без запаса справа и с незнакомыми символами
+    cases += [(input_str, None) for input_str in ['1*1=', '11*1', '*=', '', 'X1*1=']]
+    # Машина, которая пишет левее начала ленты
+    left_drift = {
+        ('q0', '1'): ('1', 'L', 'q0'),
+        ('q0', '_'): ('1', 'L', 'q1'),
+        ('q1', '_'): ('_', 'L', 'q2'),
+        ('q2', '_'): ('1', 'S', 'halt'),
+    }
+    cases += [('111', left_drift), ('', left_drift)]
+    # Длинный проход туда и обратно через границы блоков разреженной ленты
+    sweep = {
+        ('q0', '1'): ('1', 'R', 'q0'),
+        ('q0', '_'): ('_', 'L', 'q1'),
+        ('q1', '1'): ('0', 'L', 'q1'),
+        ('q1', '_'): ('_', 'S', 'halt'),
+    }
+    cases += [('1' * 3 * SparseTape.CHUNK_SIZE, sweep)]
+
+    print("Проверка эквивалентности скомпилированной таблицы переходов")
+    print("=" * 40)
+
+    def config(tm):
+        return (tm.tape_symbols(), tm.head, tm.state, tm.steps)
+
+    failures = 0
+    for input_str, transitions in cases:
+        reference = TuringMachine(input_str, transitions)
+        reference.run(verbose=False, max_steps=100_000)
+        total_steps = reference.steps
+
+        # Сравниваем конфигурации после каждого шага (для длинных запусков - выборочно)
+        if total_steps <= 1000:
+            limits = range(total_steps + 1)
+        else:
+            limits = list(range(0, total_steps, 997)) + [total_steps]
+
+        for limit in limits:
+            expected = TuringMachine(input_str, transitions)
+            expected.run(verbose=False, max_steps=limit)
+            mismatch = None
+            for sparse in (False, True):
+                for accelerate in (False, True):
+                    actual = TuringMachine(input_str, transitions, sparse=sparse)
+                    actual.run_compiled(max_steps=limit, accelerate=accelerate)
+                    if config(actual) != config(expected):
+                        mismatch = actual
+                if mismatch is not None:
+                    break
+
+            if mismatch is not None:
+                failures += 1
+                print(f"✗ Расхождение для '{input_str[:40]}' на шаге {limit}:")
+                print(f"  словарь:    {config(expected)}")
+                print(f"  компиляция: {config(mismatch)}")
+                break
+
+    if failures == 0:
+        print(f"✓ УСПЕХ! Проверено входов: {len(cases)}")
+    else:
+        print(f"✗ НЕУДАЧА! Расхождений: {failures}")
+    return failures == 0
+
+def test_loop_detection():
+    """Проверить классификацию запусков детектором циклов"""
+    cases = [
+        # Умножение останавливается
+        (create_input_string(2, 3), None, 'halt'),
+        # Нет перехода: нет знака '='
+        ('11*1', None, 'stuck'),
+        # Бесконечное хождение туда и обратно по '1111'
+        ('1111', {
+            ('q0', '1'): ('1', 'R', 'q0'),
+            ('q0', '_'): ('_', 'L', 'q1'),
+            ('q1', '1'): ('1', 'L', 'q1'),
+            ('q1', '_'): ('_', 'R', 'q0'),
+        }, 'loop'),
+        # Бесконечная запись единиц вправо
+        ('', {('q0', '_'): ('1', 'R', 'q0')}, 'unbounded'),
+    ]
+
+    print("Проверка обнаружения зацикливания")
+    print("=" * 40)
+
+    failures = 0
+    for input_str, transitions, expected in cases:
+        tm = TuringMachine(input_str, transitions)
+        tm.run_compiled(max_steps=100_000, detect_loops=True)
+        status = "✓" if tm.loop_report.kind == expected else "✗"
+        if tm.loop_report.kind != expected:
+            failures += 1
+        print(f"{status} '{input_str}': {tm.loop_report} (шагов: {tm.steps})")
+    return failures == 0
+
 def debug_case(a, b):
     """Отладить конкретный случай с подробным выводом"""
     print(f"\nОТЛАДКА {a} × {b}:")
@@ -178,9 +885,164 @@ def debug_case(a, b):
         print("✗ НЕУДАЧА!")
         print(f"Финальная лента: {''.join(final_tape)}")
 
+# Предел шагов для входа, по которому оценку не построить (своя таблица
+# переходов или лента не вида '111*11='): незавершающийся вход не повесит пакет
+BATCH_MAX_STEPS = 10**6
+
+def step_budget(a, b):
+    """
+    Предел шагов машины умножения для a * b. Число шагов растёт примерно как
+    (a*b)^2: 12652 при 10 x 10, 1.3e7 при 60 x 60, 1.0e8 при 100 x 100, и на
+    всех a, b от 0 до 25 не больше 0.93 * (a*b + a + b + 4)^2; предел берётся
+    вдвое больше этой оценки.
+    """
+    return 2 * (a * b + a + b + 4) ** 2
+
+def multiplication_grid(a_values, b_values):
+    """Ленивая сетка пар (a, b) для пакетного запуска"""
+    return itertools.product(a_values, b_values)
+
+def _run_batch_chunk(transitions, reference, max_steps, accelerate, chunk):
+    """
+    Рабочая функция процесса: прогнать один блок входов. max_steps=None -
+    предел step_budget(a, b) для машины умножения, иначе BATCH_MAX_STEPS.
+    """
+    records = []
+    for case in chunk:
+        # Кортеж - аргументы create_input_string и эталона, строка - готовая лента
+        if isinstance(case, (tuple, list)):
+            args = tuple(case)
+            input_str = create_input_string(*args)
+        else:
+            input_str = case
+            args = parse_input_string(case)
+
+        limit = max_steps
+        if limit is None:
+            limit = step_budget(*args) if transitions is None and args is not None else BATCH_MAX_STEPS
+
+        tm = TuringMachine(input_str, transitions)
+        final_tape, final_state = tm.run_compiled(max_steps=limit, accelerate=accelerate)
+        result = final_tape.count('1')
+        halted = final_state == tm.halt_state
+        if halted:
+            status = 'halted'
+        elif tm.steps >= limit:
+            status = 'limit'      # предел исчерпан - ответа нет, но он и не неверный
+        else:
+            status = 'stuck'      # нет перехода из состояния, отличного от halt
+
+        record = {
+            'case': list(case) if isinstance(case, (tuple, list)) else [case],
+            'state': final_state,
+            'status': status,
+            'steps': tm.steps,
+            'max_steps': limit,
+            'result': result,
+            'halted': halted,
+        }
+        if reference is not None and args is not None:
+            record['expected'] = reference(*args)
+            record['passed'] = None if status == 'limit' else halted and result == record['expected']
+        records.append(record)
+    return records
+
+def run_batch(cases, output_path, transitions=None, reference=operator.mul,
+              max_steps=None, accelerate=True, workers=None, chunk_size=64):
+    """
+    Прогнать множество входов на всех ядрах.
+    cases - итерируемый набор пар (a, b) или готовых строк ленты. Эталон
+    reference получает пару (a, b); для строки - разобранную из неё пару,
+    а строка не вида '111*11=' не проверяется. None отключает проверку.
+    max_steps - общий предел шагов; по умолчанию у каждого входа свой,
+    step_budget(a, b) (BATCH_MAX_STEPS для своей таблицы переходов или
+    ленты не вида '111*11='). Статус входа: halted - остановился, limit -
+    исчерпал предел (не считается неудачей, passed: null), stuck - нет
+    перехода до halt (неудача).
+    Входы читаются блоками по chunk_size, в работе не больше 4 блоков на
+    процесс. Результаты пишутся в JSONL по мере готовности, последняя
+    строка - сводка.
+    """
+    workers = workers or os.cpu_count() or 1
+    cases = iter(cases)
+    chunks = iter(lambda: list(itertools.islice(cases, chunk_size)), [])
+
+    summary = {'cases': 0, 'passed': 0, 'failed': 0, 'not_halted': 0, 'limit': 0, 'steps': 0}
+    started = time.perf_counter()
+
+    with open(output_path, 'w', encoding='utf-8') as output_file, \
+            ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+
+        def submit_more():
+            while len(pending) < workers * 4:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    return
+                pending.add(pool.submit(_run_batch_chunk, transitions, reference,
+                                        max_steps, accelerate, chunk))
+
+        submit_more()
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                for record in future.result():
+                    record['type'] = 'case'
+                    output_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+                    summary['cases'] += 1
+                    summary['steps'] += record['steps']
+                    if record['status'] == 'limit':
+                        summary['limit'] += 1
+                    elif not record['halted']:
+                        summary['not_halted'] += 1
+                    if record.get('passed') is True:
+                        summary['passed'] += 1
+                    elif record.get('passed') is False:
+                        summary['failed'] += 1
+            submit_more()
+
+        summary['elapsed'] = round(time.perf_counter() - started, 3)
+        summary['type'] = 'summary'
+        output_file.write(json.dumps(summary, ensure_ascii=False) + "\n")
+
+    return summary
+
+def batch_main(argv):
+    """Командная строка пакетного режима: python lab2.py batch --a 0 500 --b 0 500"""
+    parser = argparse.ArgumentParser(prog="lab2.py batch",
+                                     description="Пакетный прогон машины умножения по сетке (a, b)")
+    parser.add_argument('--a', nargs=2, type=int, default=[0, 10], metavar=('ОТ', 'ДО'))
+    parser.add_argument('--b', nargs=2, type=int, default=[0, 10], metavar=('ОТ', 'ДО'))
+    parser.add_argument('--output', default='batch_results.jsonl')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunk-size', type=int, default=64)
+    parser.add_argument('--max-steps', type=int, default=None,
+                        help="предел шагов на вход (по умолчанию - оценка по a и b, см. step_budget); "
+                             "исчерпавшие его - статус limit")
+    parser.add_argument('--no-accelerate', action='store_true')
+    args = parser.parse_args(argv)
+
+    cases = multiplication_grid(range(args.a[0], args.a[1] + 1), range(args.b[0], args.b[1] + 1))
+    summary = run_batch(cases, args.output, max_steps=args.max_steps,
+                        accelerate=not args.no_accelerate, workers=args.workers,
+                        chunk_size=args.chunk_size)
+
+    print(f"Входов: {summary['cases']}, успешно: {summary['passed']}, "
+          f"неудачно: {summary['failed']}, не остановились: {summary['not_halted']}, "
+          f"исчерпали предел шагов: {summary['limit']}")
+    print(f"Всего шагов: {summary['steps']}, время: {summary['elapsed']} с")
+    print(f"Результаты записаны в {args.output}")
+
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == 'batch':
+        batch_main(sys.argv[2:])
+        sys.exit()
+
     # Запустить комплексные тесты
     test_multiplication()
+    test_compiled_equivalence()
+    test_loop_detection()
     
     # Отладить конкретные случаи которые не работают
     print("\n" + "="*60)
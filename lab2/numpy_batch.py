@@ -0,0 +1,175 @@
+"""
+Пакетное моделирование машин Тьюринга на NumPy.
+
+Все N машин выполняются синхронно: вектор состояний, вектор положений
+головок и матрица лент N x W. Каждый шаг - несколько векторных выборок
+из скомпилированной таблицы переходов; остановившиеся машины исключаются
+из активного набора.
+"""
+
+import time
+
+import numpy as np
+
+from lab2 import (MULTIPLICATION_TRANSITIONS, TuringMachine, compile_transitions,
+                  create_input_string)
+
+
+class BatchTuringMachine:
+    """Синхронное моделирование множества входов одной машины Тьюринга"""
+
+    def __init__(self, inputs, transitions=None, margin=64):
+        self.transitions = MULTIPLICATION_TRANSITIONS if transitions is None else transitions
+        self.machine = compile_transitions(self.transitions)
+        machine = self.machine
+
+        # Таблицы переходов в виде матриц [состояние, символ]
+        n_states = len(machine.states)
+        self.next_state = np.array(machine.next_state, dtype=np.int32).reshape(n_states, 256)
+        self.write_symbol = np.frombuffer(bytes(machine.write_symbol), dtype=np.uint8).reshape(n_states, 256)
+        self.move = np.array(machine.move, dtype=np.int64).reshape(n_states, 256)
+
+        encoded = [machine.encode_tape(input_str) for input_str in inputs]
+        count = len(encoded)
+        width = max((len(cells) for cells in encoded), default=0) + 2 * margin
+
+        # Матрица лент: логическая ячейка 0 каждой ленты лежит в столбце origin
+        self.tape = np.zeros((count, width), dtype=np.uint8)
+        for row, cells in enumerate(encoded):
+            self.tape[row, margin:margin + len(cells)] = np.frombuffer(bytes(cells), dtype=np.uint8)
+        self.origin = margin
+
+        self.head = np.full(count, margin, dtype=np.int64)
+        self.state = np.full(count, machine.start_id, dtype=np.int32)
+        self.steps = np.zeros(count, dtype=np.int64)
+        # Записанная область каждой ленты [lo, hi) в логических координатах
+        self.lo = np.zeros(count, dtype=np.int64)
+        self.hi = np.array([len(cells) for cells in encoded], dtype=np.int64)
+
+        self.machine_steps = 0
+        self.elapsed = 0.0
+
+    def _grow(self, left, right):
+        """Расширить матрицу лент на left столбцов слева и right справа"""
+        count, width = self.tape.shape
+        tape = np.zeros((count, width + left + right), dtype=np.uint8)
+        tape[:, left:left + width] = self.tape
+        self.tape = tape
+        self.head += left
+        self.origin += left
+
+    def run(self, max_steps=500):
+        """Выполнить до max_steps шагов для всех машин сразу"""
+        halt = self.machine.halt_id
+        next_state = self.next_state
+        write_symbol = self.write_symbol
+        move = self.move
+
+        started = time.perf_counter()
+        machine_steps = 0
+
+        # Номера строк ещё работающих машин
+        active = np.nonzero((self.state != halt) & (self.steps < max_steps))[0]
+        step = 0
+        while active.size and step < max_steps:
+            head = self.head[active]
+            state = self.state[active]
+            symbol = self.tape[active, head]
+            new_state = next_state[state, symbol]
+
+            # Машины без перехода останавливаются
+            defined = new_state >= 0
+            if not defined.all():
+                active = active[defined]
+                head = head[defined]
+                state = state[defined]
+                symbol = symbol[defined]
+                new_state = new_state[defined]
+                if not active.size:
+                    break
+
+            self.tape[active, head] = write_symbol[state, symbol]
+            position = head - self.origin
+            self.lo[active] = np.minimum(self.lo[active], position)
+            self.hi[active] = np.maximum(self.hi[active], position + 1)
+
+            head = head + move[state, symbol]
+            self.head[active] = head
+            self.state[active] = new_state
+            self.steps[active] += 1
+            machine_steps += active.size
+            step += 1
+
+            # Головки у края матрицы - удвоить запас с нужной стороны
+            width = self.tape.shape[1]
+            if head.min() <= 0 or head.max() >= width - 1:
+                self._grow(width if head.min() <= 0 else 0,
+                           width if head.max() >= width - 1 else 0)
+
+            finished = (new_state == halt) | (self.steps[active] >= max_steps)
+            if finished.any():
+                active = active[~finished]
+
+        self.machine_steps += machine_steps
+        self.elapsed += time.perf_counter() - started
+
+    def throughput(self):
+        """Машино-шагов в секунду за все вызовы run"""
+        if self.elapsed == 0:
+            return 0.0
+        return self.machine_steps / self.elapsed
+
+    def tape_symbols(self, row):
+        start = self.lo[row] + self.origin
+        stop = self.hi[row] + self.origin
+        return self.machine.decode_tape(self.tape[row, start:stop].tobytes())
+
+    def result(self, row):
+        """Конфигурация машины row: (лента, логическая головка, состояние, шаги)"""
+        return (self.tape_symbols(row), int(self.head[row] - self.origin),
+                self.machine.states[self.state[row]], int(self.steps[row]))
+
+
+def test_batch_equivalence(max_value=5, max_steps=500):
+    """Сравнить пакетный запуск с run_compiled для каждого входа"""
+    inputs = [create_input_string(a, b)
+              for a in range(max_value + 1) for b in range(max_value + 1)]
+    inputs += ['1*1=', '11*1', '']
+
+    batch = BatchTuringMachine(inputs, margin=2)
+    batch.run(max_steps=max_steps)
+
+    failures = 0
+    for row, input_str in enumerate(inputs):
+        tm = TuringMachine(input_str)
+        tm.run_compiled(max_steps=max_steps)
+        expected = (tm.tape_symbols(), tm.head, tm.state, tm.steps)
+        if batch.result(row) != expected:
+            failures += 1
+            print(f"✗ Расхождение для '{input_str}':")
+            print(f"  run_compiled: {expected}")
+            print(f"  пакет:        {batch.result(row)}")
+
+    if failures == 0:
+        print(f"✓ УСПЕХ! Пакетный запуск совпал для {len(inputs)} входов")
+    return failures == 0
+
+
+def benchmark(max_value=12, copies=20, max_steps=1_000_000):
+    """Прогнать сетку a, b в 0..max_value (copies раз) одним пакетом"""
+    inputs = [create_input_string(a, b)
+              for _ in range(copies)
+              for a in range(max_value + 1) for b in range(max_value + 1)]
+
+    batch = BatchTuringMachine(inputs)
+    batch.run(max_steps=max_steps)
+
+    halted = int((batch.state == batch.machine.halt_id).sum())
+    print(f"Машин: {len(inputs)}, остановились: {halted}")
+    print(f"Машино-шагов: {batch.machine_steps}, время: {batch.elapsed:.2f} с")
+    print(f"Пропускная способность: {batch.throughput():,.0f} машино-шагов/с")
+
+
+if __name__ == "__main__":
+    test_batch_equivalence()
+    benchmark()
@@ -0,0 +1,131 @@
+"""
+Профилирование машины Тьюринга по переходам.
+
+RunProfile передаётся в run_compiled(profile=...) и собирает число
+срабатываний каждого перехода и состояния, гистограмму позиций головки,
+границы использованной ленты и (по желанию) время в каждом состоянии.
+Без профиля run_compiled работает по прежнему циклу без счётчиков.
+"""
+
+import json
+import sys
+import time
+from array import array
+
+from lab2 import SYMBOL_SLOTS, TuringMachine, create_input_string
+
+
+class RunProfile:
+    """Счётчики выполнения; накапливаются по всем запускам одной машины"""
+
+    def __init__(self, timing=False):
+        self.timing = timing
+        self.clock = time.perf_counter if timing else None
+        self.machine = None
+        self.runs = 0
+        self.head_positions = {}
+        self.min_head = None
+        self.max_head = None
+        self.max_tape_length = 0
+
+    def start(self, machine, head):
+        if self.machine is None:
+            self.machine = machine
+            self.transition_counts = array('Q', [0]) * (len(machine.states) * SYMBOL_SLOTS)
+            self.state_time = [0.0] * len(machine.states)
+        elif self.machine is not machine:
+            raise ValueError("Профиль уже собирается для другой таблицы переходов")
+        self.runs += 1
+        self._update_bounds(head)
+
+    def finish(self, head, tape):
+        self._update_bounds(head)
+        if self.head_positions:
+            self._update_bounds(min(self.head_positions))
+            self._update_bounds(max(self.head_positions))
+        self.max_tape_length = max(self.max_tape_length, len(tape))
+
+    def _update_bounds(self, head):
+        self.min_head = head if self.min_head is None else min(self.min_head, head)
+        self.max_head = head if self.max_head is None else max(self.max_head, head)
+
+    def transitions(self):
+        """Сработавшие переходы: список ((состояние, символ), число), по убыванию"""
+        states = self.machine.states
+        symbols = self.machine.symbols
+        result = []
+        for index, count in enumerate(self.transition_counts):
+            if count:
+                result.append(((states[index >> 8], symbols[index & 0xFF]), count))
+        result.sort(key=lambda item: -item[1])
+        return result
+
+    def state_counts(self):
+        counts = {}
+        for (state, _), count in self.transitions():
+            counts[state] = counts.get(state, 0) + count
+        return dict(sorted(counts.items(), key=lambda item: -item[1]))
+
+    def to_dict(self):
+        result = {
+            'runs': self.runs,
+            'steps': sum(self.transition_counts) if self.machine else 0,
+            'transitions': [
+                {'state': state, 'symbol': symbol, 'count': count}
+                for (state, symbol), count in self.transitions()
+            ],
+            'states': self.state_counts(),
+            'head_positions': {str(pos): count for pos, count in sorted(self.head_positions.items())},
+            'min_head': self.min_head,
+            'max_head': self.max_head,
+            'max_tape_length': self.max_tape_length,
+        }
+        if self.timing and self.machine:
+            result['state_time'] = {
+                state: seconds for state, seconds in zip(self.machine.states, self.state_time) if seconds
+            }
+        return result
+
+    def to_json(self, path=None):
+        text = json.dumps(self.to_dict(), ensure_ascii=False, indent=2)
+        if path is not None:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(text)
+        return text
+
+    def hot_list(self, top=20):
+        """Плоский текстовый список самых частых переходов"""
+        total = sum(self.transition_counts) or 1
+        lines = [f"{'Переход':<24} {'Число':>12} {'Доля':>7}"]
+        for (state, symbol), count in self.transitions()[:top]:
+            lines.append(f"{f'({state}, {symbol})':<24} {count:>12} {100 * count / total:>6.2f}%")
+
+        lines.append("")
+        lines.append(f"{'Состояние':<24} {'Число':>12} {'Время, с':>10}")
+        state_ids = self.machine.state_ids
+        for state, count in self.state_counts().items():
+            seconds = f"{self.state_time[state_ids[state]]:.4f}" if self.timing else "-"
+            lines.append(f"{state:<24} {count:>12} {seconds:>10}")
+
+        lines.append("")
+        lines.append(f"Головка: от {self.min_head} до {self.max_head}, "
+                     f"наибольшая длина ленты: {self.max_tape_length}")
+        return "\n".join(lines)
+
+
+def profile_multiplication(a, b, timing=True):
+    """Профиль машины умножения на входе a × b"""
+    profile = RunProfile(timing=timing)
+    tm = TuringMachine(create_input_string(a, b))
+    tm.run_compiled(max_steps=10**9, profile=profile)
+
+    print(f"Профиль умножения {a} × {b}: шагов {tm.steps}, состояние {tm.state}")
+    print("=" * 50)
+    print(profile.hot_list())
+    return profile
+
+
+if __name__ == "__main__":
+    a = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    b = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    profile_multiplication(a, b)
@@ -0,0 +1,186 @@
+"""
+Компактная двоичная трасса выполнения машины Тьюринга.
+
+Файл трассы - массив записей фиксированной длины (шаг, номер состояния,
+позиция головки, прочитанный и записанный символ), отображённый в память.
+Рядом лежат снимки ленты через каждые checkpoint_interval шагов (.ckpt)
+и описание машины (.json). TraceReplay восстанавливает конфигурацию на
+любом шаге: берёт ближайший предыдущий снимок и доигрывает записи.
+"""
+
+import bisect
+import json
+import mmap
+import os
+import struct
+import tempfile
+
+from lab2 import Tape, TuringMachine, create_input_string
+
+# Запись шага: шаг, состояние, головка до шага, прочитанный и записанный символ
+RECORD = struct.Struct('<QIqBB')
+# Заголовок снимка: шаг, состояние, головка, lo ленты, длина ленты
+SNAPSHOT = struct.Struct('<QIqqQ')
+
+
+class TraceRecorder:
+    """Запись трассы в файл, отображённый в память; передаётся в run_compiled(trace=...)"""
+
+    def __init__(self, path, checkpoint_interval=10_000, block_records=1 << 16):
+        self.path = path
+        self.checkpoint_interval = checkpoint_interval
+        self.block_size = block_records * RECORD.size
+        self.count = 0
+
+    def start(self, machine, step, state, head, tape):
+        self.machine = machine
+        self.first_step = step
+        self.count = 0
+
+        self._file = open(self.path, 'w+b')
+        self._capacity = self.block_size
+        self._file.truncate(self._capacity)
+        self._map = mmap.mmap(self._file.fileno(), self._capacity)
+        self._snapshots = open(self.path + '.ckpt', 'wb')
+
+        self.checkpoint(step, state, head, tape)
+
+    def _grow(self):
+        """Удвоить файл трассы и отобразить его заново"""
+        self._map.close()
+        self._capacity *= 2
+        self._file.truncate(self._capacity)
+        self._map = mmap.mmap(self._file.fileno(), self._capacity)
+
+    def record(self, step, state, head, read, written):
+        offset = self.count * RECORD.size
+        if offset + RECORD.size > self._capacity:
+            self._grow()
+        RECORD.pack_into(self._map, offset, step, state, head, read, written)
+        self.count += 1
+
+    def checkpoint(self, step, state, head, tape):
+        cells = tape.snapshot()
+        self._snapshots.write(SNAPSHOT.pack(step, state, head, tape.lo, len(cells)))
+        self._snapshots.write(cells)
+
+    def finish(self, step, state, head):
+        self._map.flush()
+        self._map.close()
+        self._file.truncate(self.count * RECORD.size)
+        self._file.close()
+        self._snapshots.close()
+
+        meta = {
+            'states': self.machine.states,
+            'symbols': self.machine.symbols,
+            'checkpoint_interval': self.checkpoint_interval,
+            'first_step': self.first_step,
+            'last_step': step,
+            'final_state': state,
+            'final_head': head,
+        }
+        with open(self.path + '.json', 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+
+class TraceReplay:
+    """Восстановление конфигураций по записанной трассе"""
+
+    def __init__(self, path):
+        with open(path + '.json', 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        self.states = self.meta['states']
+        self.symbols = self.meta['symbols']
+        self.first_step = self.meta['first_step']
+        self.last_step = self.meta['last_step']
+
+        self._file = open(path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        self.count = size // RECORD.size
+
+        # Индекс снимков: шаги и смещения заголовков в файле .ckpt
+        self._snapshots = open(path + '.ckpt', 'rb')
+        self._snapshot_steps = []
+        self._snapshot_offsets = []
+        offset = 0
+        while True:
+            header = self._snapshots.read(SNAPSHOT.size)
+            if len(header) < SNAPSHOT.size:
+                break
+            step, _, _, _, length = SNAPSHOT.unpack(header)
+            self._snapshot_steps.append(step)
+            self._snapshot_offsets.append(offset)
+            offset += SNAPSHOT.size + length
+            self._snapshots.seek(offset)
+
+    def __len__(self):
+        return self.count
+
+    def record(self, index):
+        """Запись index: (шаг, состояние, головка, прочитано, записано)"""
+        if not 0 <= index < self.count:
+            raise IndexError(f"Нет записи с номером {index}")
+        step, state, head, read, written = RECORD.unpack_from(self._map, index * RECORD.size)
+        return step, self.states[state], head, self.symbols[read], self.symbols[written]
+
+    def configuration(self, step):
+        """Конфигурация после step шагов: (лента, головка, состояние)"""
+        if not self.first_step <= step <= self.last_step:
+            raise IndexError(f"Шаг {step} вне трассы [{self.first_step}, {self.last_step}]")
+
+        # Ближайший снимок не позже нужного шага
+        number = bisect.bisect_right(self._snapshot_steps, step) - 1
+        self._snapshots.seek(self._snapshot_offsets[number])
+        snapshot_step, _, _, lo, length = SNAPSHOT.unpack(self._snapshots.read(SNAPSHOT.size))
+        tape = Tape(self._snapshots.read(length), start=lo)
+
+        # Доиграть записи от снимка до нужного шага
+        for index in range(snapshot_step - self.first_step, step - self.first_step):
+            _, _, head, _, written = RECORD.unpack_from(self._map, index * RECORD.size)
+            tape.write(head, written)
+
+        if step < self.last_step:
+            _, state, head, _, _ = RECORD.unpack_from(self._map, (step - self.first_step) * RECORD.size)
+        else:
+            state, head = self.meta['final_state'], self.meta['final_head']
+
+        symbols = self.symbols
+        return [symbols[c] for c in tape.snapshot()], head, self.states[state]
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+        self._snapshots.close()
+
+
+def test_trace_replay(a=4, b=3, checkpoint_interval=50):
+    """Сравнить восстановленные конфигурации с прямым запуском до того же шага"""
+    input_str = create_input_string(a, b)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'run.trace')
+
+        tm = TuringMachine(input_str)
+        tm.run_compiled(max_steps=10**9, trace=TraceRecorder(path, checkpoint_interval))
+
+        replay = TraceReplay(path)
+        failures = 0
+        for step in range(replay.first_step, replay.last_step + 1):
+            expected = TuringMachine(input_str)
+            expected.run_compiled(max_steps=step)
+            if replay.configuration(step) != (expected.tape_symbols(), expected.head, expected.state):
+                failures += 1
+                print(f"✗ Расхождение на шаге {step}")
+                break
+        print(f"Записей в трассе: {len(replay)}, размер записи: {RECORD.size} байт")
+        replay.close()
+
+    if failures == 0:
+        print(f"✓ УСПЕХ! Трасса {a} × {b} восстановлена на всех {tm.steps + 1} шагах")
+    return failures == 0
+
+
+if __name__ == "__main__":
+    test_trace_replay()
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Пакетный режим моделирования систем Поста.
+
+Задания - либо много входных файлов (у каждого свои правила и INPUT),
+либо один файл правил и поток JSONL с наборами значений переменных.
+Наборы правил передаются процессам-исполнителям один раз при запуске
+пула и компилируются там один раз (кеш по хешу правил); блоки заданий
+несут только хеш и слово. Выводы идут на пуле процессов, результаты
+пишутся в JSONL по мере готовности, последняя строка - сводка. Задание,
+которое не удалось прочитать (битый файл, строка JSONL, неизвестная
+переменная), становится записью со статусом error и пакет не прерывает.
+
+    python post_simulator.py batch files a.txt b.txt --output results.jsonl
+    python post_simulator.py batch bindings input.txt inputs.jsonl
+"""
+
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from post_cache import DerivationCache
+from post_runs import RunMatcher, derive
+from post_simulator import RuleMatcher, initial_word, is_rope_safe, parse_input_file, rules_hash
+
+# Скомпилированные правила процесса-исполнителя: хеш -> (по сериям, строковый)
+_compiled_rules = {}
+# Кеш исходов процесса-исполнителя (создаётся при первом блоке)
+_worker_cache = None
+# Наборы правил и настройки процесса-исполнителя (задаются инициализатором пула)
+_worker_rule_sets = {}
+_worker_options = (1000, 100_000, 0, None)
+
+
+def _init_batch_worker(rule_sets, max_steps, max_text, cache_size, cache_db):
+    global _worker_rule_sets, _worker_options
+    _worker_rule_sets = rule_sets
+    _worker_options = (max_steps, max_text, cache_size, cache_db)
+
+
+def _matchers(digest, X, R):
+    if digest not in _compiled_rules:
+        _compiled_rules[digest] = (RunMatcher(R, X), RuleMatcher(R, X))
+    return _compiled_rules[digest]
+
+
+def _text_field(value, max_text):
+    """Текст слова в записи; слишком длинный заменяется на None (длина пишется отдельно)"""
+    text = str(value)
+    return text if max_text is None or len(text) <= max_text else None
+
+
+def _cache(cache_size, cache_db):
+    global _worker_cache
+    if _worker_cache is None and (cache_size or cache_db):
+        _worker_cache = DerivationCache(cache_size or 1, cache_db)
+    return _worker_cache
+
+
+def _error_record(case_id, error):
+    """Запись задания, которое не дошло до вывода"""
+    return {'id': case_id, 'status': 'error', 'steps': 0, 'result': None, 'result_length': 0,
+            'word': None, 'word_length': 0, 'error': error, 'elapsed': 0.0,
+            'cache_hits': 0, 'cache_misses': 0}
+
+
+def _run_batch_chunk(chunk):
+    """
+    Рабочая функция процесса: вывести слова одного блока заданий
+    (id, хеш правил, слово); при хеше None вместо слова - текст ошибки.
+    """
+    max_steps, max_text, cache_size, cache_db = _worker_options
+    cache = _cache(cache_size, cache_db)
+    records = []
+    for case_id, digest, word in chunk:
+        if digest is None:
+            records.append(_error_record(case_id, word))
+            continue
+        A, X, R = _worker_rule_sets[digest]
+        runs = is_rope_safe(word, A, X)
+        run_matcher, string_matcher = _matchers(digest, X, R)
+
+        started = time.perf_counter()
+        hits, misses = (cache.hits, cache.misses) if cache else (0, 0)
+        final, steps, result, error = derive(R, A, X, word, max_steps=max_steps, runs=runs,
+                                             matcher=run_matcher if runs else string_matcher,
+                                             cache=cache)
+        if error is not None:
+            status = 'error'
+        elif steps >= max_steps and (run_matcher if runs else string_matcher).find_first(final) is not None:
+            # Предел исчерпан, только если правило ещё применимо: вывод, закончившийся
+            # ровно на max_steps-м шаге, завершён
+            status = 'limit'
+        else:
+            status = 'done'
+
+        records.append({
+            'id': case_id,
+            'status': status,
+            'steps': steps,
+            'result': _text_field(result, max_text),
+            'result_length': len(result),
+            'word': _text_field(final, max_text),
+            'word_length': len(final),
+            'error': error,
+            'elapsed': round(time.perf_counter() - started, 6),
+            'cache_hits': cache.hits - hits if cache else 0,
+            'cache_misses': cache.misses - misses if cache else 0,
+        })
+    return records
+
+
+def file_cases(paths):
+    """
+    Задания из входных файлов: (наборы правил, итератор (id, хеш, слово)).
+    Файл, который не удалось разобрать, даёт задание (путь, None, ошибка).
+    """
+    rule_sets = {}
+    cases = []
+    for path in paths:
+        try:
+            A, X, A1, R, INPUT = parse_input_file(path)
+            word = initial_word(A, X, A1, INPUT)
+        except (OSError, ValueError) as e:
+            cases.append((path, None, str(e)))
+            continue
+        digest = rules_hash(A, X, R)
+        rule_sets[digest] = (A, X, R)
+        cases.append((path, digest, word))
+    return rule_sets, iter(cases)
+
+
+def binding_cases(rules_path, bindings):
+    """
+    Задания из одного файла правил и строк JSONL с значениями переменных:
+    {"a": "111", "b": "11"} или {"id": ..., "input": {"a": "111"}}.
+    Строка, которую не удалось прочитать, даёт задание (id, None, ошибка).
+    """
+    A, X, A1, R, _ = parse_input_file(rules_path)
+    digest = rules_hash(A, X, R)
+
+    def cases():
+        for number, line in enumerate(bindings, 1):
+            if not line.strip():
+                continue
+            case_id = number
+            try:
+                item = json.loads(line)
+                if not isinstance(item, dict):
+                    raise ValueError("строка JSONL должна быть объектом")
+                case_id = item.get('id', number)
+                values = item['input'] if 'input' in item else item
+                if not isinstance(values, dict):
+                    raise ValueError("значение 'input' должно быть объектом")
+                word = initial_word(A, X, A1, {str(k): str(v) for k, v in values.items()})
+            except ValueError as e:
+                yield case_id, None, f"строка {number}: {e}"
+                continue
+            yield case_id, digest, word
+
+    return {digest: (A, X, R)}, cases()
+
+
+def run_batch(rule_sets, cases, output_path, max_steps=1000, max_text=100_000,
+              workers=None, chunk_size=16, cache_size=0, cache_db=None):
+    """
+    Прогнать задания на всех ядрах. Задания читаются блоками по chunk_size,
+    в работе не больше 4 блоков на процесс; записи идут в порядке готовности.
+    cache_size - LRU исходов на процесс, cache_db - общая база SQLite.
+    """
+    workers = workers or os.cpu_count() or 1
+    chunks = iter(lambda: list(itertools.islice(cases, chunk_size)), [])
+
+    summary = {'cases': 0, 'done': 0, 'limit': 0, 'error': 0, 'steps': 0,
+               'cache_hits': 0, 'cache_misses': 0}
+    started = time.perf_counter()
+
+    with open(output_path, 'w', encoding='utf-8') as output_file, \
+            ProcessPoolExecutor(max_workers=workers, initializer=_init_batch_worker,
+                                initargs=(rule_sets, max_steps, max_text, cache_size, cache_db)) as pool:
+        pending = set()
+
+        def submit_more():
+            while len(pending) < workers * 4:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    return
+                pending.add(pool.submit(_run_batch_chunk, chunk))
+
+        submit_more()
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                for record in future.result():
+                    record['type'] = 'case'
+                    output_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    summary['cases'] += 1
+                    summary['steps'] += record['steps']
+                    summary['cache_hits'] += record['cache_hits']
+                    summary['cache_misses'] += record['cache_misses']
+                    summary[record['status']] += 1
+                output_file.flush()
+            submit_more()
+
+        summary['elapsed'] = round(time.perf_counter() - started, 3)
+        summary['type'] = 'summary'
+        output_file.write(json.dumps(summary, ensure_ascii=False) + "\n")
+
+    return summary
+
+
+def test_batch(workers=2):
+    """Пакет из привязок совпадает с последовательным выводом derive; битые строки - ошибки"""
+    import tempfile
+
+    rules_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'input.txt')
+    pairs = [(a, b) for a in range(6) for b in range(6)]
+    bindings = [json.dumps({'id': f"{a}x{b}", 'input': {'a': '1' * a, 'b': '1' * b}}) for a, b in pairs]
+    # Битый JSON, не объект и плоская привязка с лишним ключом id
+    broken = ['{"a": "1"', '[1, 2]', json.dumps({'id': 'flat', 'a': '1'})]
+    bindings[3:3] = broken
+
+    with tempfile.TemporaryDirectory() as directory:
+        output_path = os.path.join(directory, 'results.jsonl')
+        rule_sets, cases = binding_cases(rules_path, bindings)
+        summary = run_batch(rule_sets, cases, output_path, workers=workers, chunk_size=4,
+                            cache_size=1000, cache_db=os.path.join(directory, 'cache.sqlite'))
+        with open(output_path, encoding='utf-8') as f:
+            records = [json.loads(line) for line in f]
+
+    A, X, _, R, _ = parse_input_file(rules_path)
+    expected = {}
+    for a, b in pairs:
+        word = '1' * a + '*' + '1' * b + '=/='
+        final, steps, result, _ = derive(R, A, X, word, runs=False)
+        expected[f"{a}x{b}"] = (final, steps, result)
+
+    got = {record['id']: (record['word'], record['steps'], record['result'])
+           for record in records if record['type'] == 'case' and record['status'] != 'error'}
+    errors = [record['id'] for record in records if record['type'] == 'case' and record['status'] == 'error']
+    ok = got == expected and sorted(map(str, errors)) == ['4', '5', 'flat'] and \
+        summary['cases'] == len(pairs) + len(broken) and summary['error'] == len(broken)
+
+    # Вывод, завершившийся ровно на последнем разрешённом шаге, - done, а не limit
+    with tempfile.TemporaryDirectory() as directory:
+        output_path = os.path.join(directory, 'exact.jsonl')
+        rule_sets, cases = binding_cases(rules_path, [json.dumps({'a': '11', 'b': '1'})])
+        exact = run_batch(rule_sets, cases, output_path, max_steps=expected["2x1"][1], workers=1)
+        ok = ok and exact['done'] == 1 and exact['limit'] == 0
+    if ok:
+        print(f"✓ УСПЕХ! Пакет из {len(pairs)} заданий совпал с последовательным выводом")
+    else:
+        print("✗ Пакетный вывод расходится с последовательным")
+    return ok
+
+
+def batch_main(argv):
+    """Командная строка пакетного режима (python post_simulator.py batch ...)"""
+    parser = argparse.ArgumentParser(prog="post_simulator.py batch",
+                                     description="Пакетный вывод в системах Поста")
+    parser.add_argument('mode', choices=('files', 'bindings'),
+                        help="files - входные файлы; bindings - файл правил и JSONL значений")
+    parser.add_argument('paths', nargs='+',
+                        help="входные файлы или: файл правил и файл JSONL ('-' - стандартный ввод)")
+    parser.add_argument('--output', default='batch_results.jsonl')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunk-size', type=int, default=16)
+    parser.add_argument('--max-steps', type=int, default=1000)
+    parser.add_argument('--max-text', type=int, default=100_000,
+                        help="слова длиннее в запись не попадают (только длина)")
+    parser.add_argument('--cache-size', type=int, default=0,
+                        help="LRU исходов вывода на процесс, слов (0 - без кеша в памяти)")
+    parser.add_argument('--cache-db', default=None, help="файл SQLite с исходами вывода")
+    args = parser.parse_args(argv)
+
+    if args.mode == 'files':
+        rule_sets, cases = file_cases(args.paths)
+        summary = run_batch(rule_sets, cases, args.output, args.max_steps, args.max_text,
+                            args.workers, args.chunk_size, args.cache_size, args.cache_db)
+    else:
+        if len(args.paths) != 2:
+            parser.error("для bindings нужны файл правил и файл JSONL")
+        rules_path, bindings_path = args.paths
+        bindings = sys.stdin if bindings_path == '-' else open(bindings_path, encoding='utf-8')
+        with bindings:
+            rule_sets, cases = binding_cases(rules_path, bindings)
+            summary = run_batch(rule_sets, cases, args.output, args.max_steps, args.max_text,
+                                args.workers, args.chunk_size, args.cache_size, args.cache_db)
+
+    print(f"Заданий: {summary['cases']}, завершено: {summary['done']}, "
+          f"по пределу шагов: {summary['limit']}, с ошибкой: {summary['error']}")
+    print(f"Всего шагов: {summary['steps']}, время: {summary['elapsed']} с")
+    if args.cache_size or args.cache_db:
+        print(f"Попаданий в кеш: {summary['cache_hits']}, промахов: {summary['cache_misses']}")
+    print(f"Результаты записаны в {args.output}")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        batch_main(sys.argv[1:])
+    else:
+        test_batch()
@@ -0,0 +1,164 @@
+"""
+Кеш исходов вывода системы Поста.
+
+Вывод детерминирован (первое применимое правило в самом левом вхождении),
+поэтому исход слова при тех же правилах всегда один: итоговое слово,
+число оставшихся шагов и последний результат /…= на этом пути. Кеш
+сопоставляет (хеш правил, слово) -> (итоговое слово, шаги, результат):
+вывод останавливается, как только дошёл до слова с известным исходом.
+В памяти - LRU на capacity слов, на диске - необязательная база SQLite.
+Сохраняются только завершённые выводы (без ошибки и без упора в предел).
+Итоговое слово общее у всех слов пути, поэтому оно хранится один раз под
+своим ключом word_key, а записи слов пути ссылаются на этот ключ.
+"""
+
+import hashlib
+import re
+import sqlite3
+from collections import OrderedDict
+
+_RUN = re.compile(r'(.)\1*', re.DOTALL)
+
+
+def word_key(word):
+    """Ключ слова: один и тот же для строки и для слова из серий (RunWord)"""
+    if hasattr(word, 'symbols'):
+        runs = zip(word.symbols, word.counts)
+    else:
+        runs = ((m.group(1), m.end() - m.start()) for m in _RUN.finditer(word))
+    data = '\0'.join(f"{symbol}{count}" for symbol, count in runs)
+    return hashlib.blake2b(data.encode('utf-8'), digest_size=16).digest()
+
+
+class DerivationCache:
+    """LRU исходов вывода с необязательным хранилищем SQLite"""
+
+    def __init__(self, capacity=100_000, path=None):
+        self.capacity = capacity
+        # (хеш правил, ключ слова) -> (ключ итогового слова, шаги, результат)
+        self.entries = OrderedDict()
+        # (хеш правил, ключ итогового слова) -> [итоговое слово, число ссылок]
+        self.finals = {}
+        self.hits = 0
+        self.misses = 0
+        self.db = None
+        if path is not None:
+            self.db = sqlite3.connect(path, timeout=30)
+            self.db.execute("CREATE TABLE IF NOT EXISTS final_words ("
+                            "rules TEXT, key BLOB, word TEXT, PRIMARY KEY (rules, key))")
+            self.db.execute("CREATE TABLE IF NOT EXISTS path_words ("
+                            "rules TEXT, word BLOB, final BLOB, steps INTEGER, result TEXT, "
+                            "PRIMARY KEY (rules, word))")
+            self.db.commit()
+
+    def _release(self, digest, final_key):
+        final = self.finals[(digest, final_key)]
+        final[1] -= 1
+        if not final[1]:
+            del self.finals[(digest, final_key)]
+
+    def _remember(self, digest, key, final_key, final, steps, result):
+        old = self.entries.pop((digest, key), None)
+        final_entry = self.finals.setdefault((digest, final_key), [final, 0])
+        final_entry[1] += 1
+        if old is not None:
+            self._release(digest, old[0])
+        self.entries[(digest, key)] = (final_key, steps, result)
+        if len(self.entries) > self.capacity:
+            (old_digest, _), (old_final, _, _) = self.entries.popitem(last=False)
+            self._release(old_digest, old_final)
+
+    def get(self, digest, key):
+        """(итоговое слово, шаги, результат) для ключа слова или None"""
+        outcome = None
+        entry = self.entries.get((digest, key))
+        if entry is not None:
+            self.entries.move_to_end((digest, key))
+            final_key, steps, result = entry
+            outcome = (self.finals[(digest, final_key)][0], steps, result)
+        elif self.db is not None:
+            row = self.db.execute("SELECT p.final, f.word, p.steps, p.result FROM path_words p "
+                                  "JOIN final_words f ON f.rules = p.rules AND f.key = p.final "
+                                  "WHERE p.rules = ? AND p.word = ?", (digest, key)).fetchone()
+            if row is not None:
+                final_key, final, steps, result = row
+                self._remember(digest, key, final_key, final, steps, result)
+                outcome = (final, steps, result)
+
+        if outcome is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return outcome
+
+    def put_many(self, digest, final, items):
+        """Запомнить исходы слов, ведущих к итоговому слову final: [(ключ слова, (шаги, результат))]"""
+        final_key = word_key(final)
+        final = str(final)
+        for key, (steps, result) in items:
+            self._remember(digest, key, final_key, final, steps, result)
+        if self.db is not None:
+            self.db.execute("INSERT OR REPLACE INTO final_words VALUES (?, ?, ?)", (digest, final_key, final))
+            self.db.executemany("INSERT OR REPLACE INTO path_words VALUES (?, ?, ?, ?, ?)",
+                                [(digest, key, final_key, steps, result) for key, (steps, result) in items])
+            self.db.commit()
+
+    def stats(self):
+        total = self.hits + self.misses
+        rate = self.hits / total if total else 0.0
+        return f"попаданий в кеш: {self.hits}, промахов: {self.misses} ({rate:.1%})"
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+
+def test_derivation_cache(trials=500, seed=5):
+    """С кешем (в памяти и в SQLite) вывод тот же, что без него"""
+    import os
+    import random
+    import tempfile
+
+    from post_runs import derive
+
+    rng = random.Random(seed)
+    A = {'1', '*', '=', '/'}
+    X = {'a', 'b', 'c'}
+    symbols = sorted(A) + sorted(X)
+    failures = 0
+    hits = 0
+
+    with tempfile.TemporaryDirectory() as directory:
+        for trial in range(trials):
+            R = [(''.join(rng.choice(symbols) for _ in range(rng.randint(1, 5))),
+                  ''.join(rng.choice(symbols) for _ in range(rng.randint(0, 6))))
+                 for _ in range(rng.randint(1, 4))]
+            words = [''.join(rng.choice(sorted(A)) * rng.choice((1, 2, 7))
+                             for _ in range(rng.randint(0, 6))) for _ in range(4)]
+            # Повторяем слова и их продолжения, чтобы кеш срабатывал
+            words += words[:2]
+            path = os.path.join(directory, f'cache-{trial % 3}.sqlite')
+            memory, disk = DerivationCache(capacity=8), DerivationCache(capacity=2, path=path)
+            for word in words:
+                for runs in (False, True):
+                    steps = rng.choice((3, 12))
+                    expected = derive(R, A, X, word, max_steps=steps, runs=False)
+                    for cache in (memory, disk):
+                        got = derive(R, A, X, word, max_steps=steps, runs=runs, cache=cache)
+                        got = (str(got[0]), got[1], str(got[2]), got[3])
+                        if got != expected:
+                            failures += 1
+                            if failures <= 3:
+                                print(f"✗ {R} '{word}':\n  без кеша: {expected}\n  с кешем:  {got}")
+            hits += memory.hits + disk.hits
+            disk.close()
+
+    if failures == 0:
+        print(f"✓ УСПЕХ! Вывод с кешем совпал с выводом без кеша на {trials} системах "
+              f"(попаданий в кеш: {hits})")
+    return failures == 0
+
+
+if __name__ == '__main__':
+    test_derivation_cache()
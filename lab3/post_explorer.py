@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+Полный перебор выводов канонической системы Поста.
+
+Симулятор применяет первое применимое правило в самом левом вхождении,
+а система Поста недетерминирована: из слова выводимо всё, что получается
+любым правилом в любой позиции при любых значениях переменных (в том
+числе пустых). Здесь строится граф выводов из аксиомы
+и ищется целевое слово: в ширину (кратчайший вывод), в глубину или
+по эвристике (best-first). Фронт хранится в главном процессе, пачки
+слов раскрываются пулом процессов. Посещённые слова отсекаются по хешу
+или фильтром Блума, если множество не помещается в память.
+"""
+
+import argparse
+import hashlib
+import heapq
+import math
+import os
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+from post_simulator import CompiledRule, apply_match, initial_word, memory_used, parse_input_file
+
+STRATEGIES = ('bfs', 'dfs', 'best')
+
+
+def _digest(word):
+    return hashlib.blake2b(word.encode('utf-8'), digest_size=16).digest()
+
+
+class VisitedSet:
+    """Точное множество посещённых слов по 128-битному хешу"""
+
+    def __init__(self):
+        self.hashes = set()
+
+    def add(self, word):
+        """Добавить слово; True, если его ещё не было"""
+        digest = _digest(word)
+        if digest in self.hashes:
+            return False
+        self.hashes.add(digest)
+        return True
+
+    def __len__(self):
+        return len(self.hashes)
+
+
+class BloomFilter:
+    """
+    Фильтр Блума для посещённых слов: фиксированная память, ложные
+    срабатывания с вероятностью error_rate (такие слова не раскрываются).
+    """
+
+    def __init__(self, capacity, error_rate=0.001):
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def add(self, word):
+        digest = _digest(word)
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        new = False
+        for i in range(self.hash_count):
+            bit = (h1 + i * h2) % self.size
+            byte, mask = bit >> 3, 1 << (bit & 7)
+            if not self.bits[byte] & mask:
+                self.bits[byte] |= mask
+                new = True
+        if new:
+            self.count += 1
+        return new
+
+    def __len__(self):
+        return self.count
+
+
+BINDINGS = ('all', 'first')
+
+# Правила процесса-исполнителя (задаются инициализатором пула)
+_worker_rules = None
+
+
+def _init_worker(R, A, X, bindings='all'):
+    global _worker_rules
+    _worker_rules = (R, [CompiledRule(lhs, X) for lhs, _ in R], A, X, bindings)
+
+
+def all_bindings(lhs, X, word, i):
+    """
+    Все совпадения левой части lhs с началом в позиции i: (конец, подстановки).
+    Переменная принимает любое (и пустое) значение; повторная переменная -
+    то же значение, что при первом вхождении.
+    """
+    def match(lhs_index, position, substitutions):
+        if lhs_index == len(lhs):
+            yield position, dict(substitutions)
+            return
+        ch = lhs[lhs_index]
+        if ch not in X:
+            if word.startswith(ch, position):
+                yield from match(lhs_index + 1, position + 1, substitutions)
+        elif ch in substitutions:
+            value = substitutions[ch]
+            if word.startswith(value, position):
+                yield from match(lhs_index + 1, position + len(value), substitutions)
+        else:
+            for end in range(position, len(word) + 1):
+                substitutions[ch] = word[position:end]
+                yield from match(lhs_index + 1, end, substitutions)
+            del substitutions[ch]
+
+    yield from match(0, i, {})
+
+
+def successors(word, R, compiled, A, X, bindings='all'):
+    """
+    Все слова, выводимые за один шаг: [(номер правила, позиция, слово)].
+    bindings='all' - все значения переменных, 'first' - только подстановка
+    симулятора (CompiledRule, как в apply_rule).
+    """
+    result = []
+    seen = set()
+    for number, rule in enumerate(compiled):
+        for i in range(len(word)):
+            if bindings == 'all':
+                matches = all_bindings(R[number][0], X, word, i)
+            else:
+                found = rule.match_at(word, i)
+                matches = () if found is None else (found,)
+            for end, substitutions in matches:
+                try:
+                    new_word = apply_match(word, R[number], (number, i, end, substitutions), A, X)
+                except ValueError:
+                    continue
+                if (number, i, new_word) not in seen:
+                    seen.add((number, i, new_word))
+                    result.append((number, i, new_word))
+    return result
+
+
+def _expand_chunk(words):
+    """Раскрыть пачку слов; вместе с результатом - номер процесса и его память"""
+    R, compiled, A, X, bindings = _worker_rules
+    return os.getpid(), memory_used(), [successors(word, R, compiled, A, X, bindings) for word in words]
+
+
+def _heuristic(word, target_counts, target_length):
+    """Оценка для best-first: расхождение в числе символов каждого вида"""
+    counts = Counter(word)
+    keys = counts.keys() | target_counts.keys()
+    return sum(abs(counts[ch] - target_counts[ch]) for ch in keys) + abs(len(word) - target_length)
+
+
+class ExplorationResult:
+    """Итог перебора: статус found/exhausted/inconclusive/depth/memory, вывод и счётчики"""
+
+    def __init__(self, status, derivation, expanded, visited, elapsed, bindings='all'):
+        self.status = status
+        self.bindings = bindings
+        self.derivation = derivation   # [(номер правила, позиция, слово)] от аксиомы
+        self.expanded = expanded
+        self.visited = visited
+        self.elapsed = elapsed
+
+    def __str__(self):
+        messages = {
+            'found': f"Слово выводимо за {len(self.derivation)} шагов",
+            'exhausted': ("Слово невыводимо: все достижимые слова перебраны" if self.bindings == 'all' else
+                          "Слово не найдено при детерминированной подстановке: все достижимые так слова перебраны"),
+            'inconclusive': ("Слово не найдено, но невыводимость не доказана: фильтр Блума "
+                             "мог принять непосещённые слова за посещённые"),
+            'depth': "Слово не найдено в пределах глубины",
+            'memory': "Перебор остановлен: превышен предел памяти",
+        }
+        return (f"{messages[self.status]} (раскрыто слов: {self.expanded}, "
+                f"посещено: {self.visited}, время: {self.elapsed:.2f} с)")
+
+
+def explore(R, A, X, start, target, strategy='bfs', max_depth=50, max_memory=None,
+            bloom_capacity=None, workers=None, batch_size=256, bindings='all'):
+    """
+    Поиск вывода target из start.
+    strategy - 'bfs' (кратчайший вывод), 'dfs' или 'best';
+    bindings - 'all' (все значения переменных) или 'first' (как в симуляторе);
+    max_memory - предел памяти в байтах: главный процесс плюс последние
+    известные размеры процессов пула (каждый сообщает свой с каждой пачкой);
+    bloom_capacity - вместо точного множества использовать фильтр Блума;
+    его ложные срабатывания пропускают слова, поэтому полный перебор без
+    находки даёт статус 'inconclusive', а не 'exhausted';
+    workers=0 - раскрывать слова в текущем процессе.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Неизвестная стратегия '{strategy}', допустимы: {', '.join(STRATEGIES)}")
+    if bindings not in BINDINGS:
+        raise ValueError(f"Неизвестный режим подстановки '{bindings}', допустимы: {', '.join(BINDINGS)}")
+
+    started = time.perf_counter()
+    visited = BloomFilter(bloom_capacity) if bloom_capacity else VisitedSet()
+    visited.add(start)
+
+    target_counts = Counter(target)
+    # Узел фронта: (слово, глубина, вывод в виде связного списка (предок, шаг))
+    frontier = deque() if strategy != 'best' else []
+    order = 0
+
+    def push(word, depth, path):
+        nonlocal order
+        if strategy == 'best':
+            order += 1
+            heapq.heappush(frontier, (_heuristic(word, target_counts, len(target)), depth, order, word, path))
+        else:
+            frontier.append((word, depth, path))
+
+    def pop():
+        if strategy == 'best':
+            _, depth, _, word, path = heapq.heappop(frontier)
+            return word, depth, path
+        return frontier.popleft() if strategy == 'bfs' else frontier.pop()
+
+    def derivation(path):
+        steps = []
+        while path is not None:
+            path, step = path
+            steps.append(step)
+        return steps[::-1]
+
+    def result(status, path=None):
+        return ExplorationResult(status, derivation(path), expanded, len(visited),
+                                 time.perf_counter() - started, bindings)
+
+    expanded = 0
+    if start == target:
+        return result('found')
+    push(start, 0, None)
+    cut_by_depth = False
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    pool = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(R, A, X, bindings)) if workers else None
+    if pool is None:
+        _init_worker(R, A, X, bindings)
+    worker_memory = {}   # номер процесса пула -> его последняя известная память
+    try:
+        while frontier:
+            if max_memory is not None and (memory_used() or 0) + sum(worker_memory.values()) > max_memory:
+                return result('memory')
+
+            batch = [pop() for _ in range(min(batch_size, len(frontier)))]
+            words = [word for word, _, _ in batch]
+            if pool is None:
+                expansions = _expand_chunk(words)[2]
+            else:
+                chunk = max(1, len(words) // (workers * 4))
+                chunks = [words[i:i + chunk] for i in range(0, len(words), chunk)]
+                expansions = []
+                for pid, used, part in pool.map(_expand_chunk, chunks):
+                    worker_memory[pid] = used or 0
+                    expansions.extend(part)
+            expanded += len(batch)
+
+            for (_, depth, path), children in zip(batch, expansions):
+                for number, position, new_word in children:
+                    child_path = (path, (number, position, new_word))
+                    if new_word == target:
+                        return result('found', child_path)
+                    if depth + 1 >= max_depth:
+                        cut_by_depth = True
+                        continue
+                    if visited.add(new_word):
+                        push(new_word, depth + 1, child_path)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    if cut_by_depth:
+        return result('depth')
+    return result('inconclusive' if bloom_capacity else 'exhausted')
+
+
+def test_explorer(filename=None):
+    """Кратчайший вывод для lab3/input.txt: один и тот же при любом числе процессов"""
+    if filename is None:
+        filename = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'input.txt')
+    A, X, A1, R, INPUT = parse_input_file(filename)
+    start = initial_word(A, X, A1, INPUT)
+
+    results = [
+        explore(R, A, X, start, '111111', workers=0),
+        explore(R, A, X, start, '111111', workers=2, batch_size=4),
+        explore(R, A, X, start, '111111', workers=0, bloom_capacity=10_000),
+    ]
+    lengths = {len(result.derivation) for result in results}
+    ok = all(result.status == 'found' for result in results) and len(lengths) == 1
+
+    # Каждый шаг вывода - действительно применение правила в указанной позиции
+    compiled = [CompiledRule(lhs, X) for lhs, _ in R]
+    word = start
+    for number, position, new_word in results[0].derivation:
+        if (number, position, new_word) not in successors(word, R, compiled, A, X):
+            ok = False
+        word = new_word
+
+    unreachable = explore(R, A, X, start, '11', workers=0)
+    ok = ok and unreachable.status == 'exhausted'
+    # С фильтром Блума невыводимость не утверждается
+    ok = ok and explore(R, A, X, start, '11', workers=0, bloom_capacity=10_000).status == 'inconclusive'
+    # При подстановке симулятора перебор полон лишь для неё, и итог говорит об этом
+    deterministic = explore(R, A, X, start, '11', workers=0, bindings='first')
+    ok = ok and deterministic.status == 'exhausted' and 'детерминированной' in str(deterministic)
+
+    if ok:
+        print(f"✓ УСПЕХ! {start} ⇒ 111111 за {lengths.pop()} шагов; 11 не выводимо")
+    else:
+        print("✗ Результаты перебора расходятся")
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Поиск вывода слова в системе Поста")
+    parser.add_argument('input', help="файл с описанием системы (как для post_simulator.py)")
+    parser.add_argument('target', help="целевое слово")
+    parser.add_argument('--strategy', choices=STRATEGIES, default='bfs')
+    parser.add_argument('--max-depth', type=int, default=50)
+    parser.add_argument('--bindings', choices=BINDINGS, default='all',
+                        help="all - любые значения переменных, first - подстановка как в симуляторе")
+    parser.add_argument('--max-memory', type=int, default=None,
+                        help="предел памяти главного процесса и пула вместе, МБ")
+    parser.add_argument('--bloom', type=int, default=None, metavar='N',
+                        help="фильтр Блума на N слов вместо точного множества "
+                             "(без находки итог не окончательный)")
+    parser.add_argument('--workers', type=int, default=None, help="число процессов (0 - без пула)")
+    parser.add_argument('--batch-size', type=int, default=256)
+    args = parser.parse_args(argv)
+
+    A, X, A1, R, INPUT = parse_input_file(args.input)
+    try:
+        start = initial_word(A, X, A1, INPUT)
+    except ValueError as e:
+        print(f"Ошибка: {e}")
+        return
+
+    result = explore(R, A, X, start, args.target, strategy=args.strategy,
+                     max_depth=args.max_depth,
+                     max_memory=args.max_memory * 2**20 if args.max_memory else None,
+                     bloom_capacity=args.bloom, workers=args.workers,
+                     batch_size=args.batch_size, bindings=args.bindings)
+    print(result)
+    print(f"Начальная строка: {start}")
+    for number, position, new_word in result.derivation:
+        lhs, rhs = R[number]
+        print(f"{lhs} -> {rhs} (позиция {position}): {new_word}")
+
+
+if __name__ == '__main__':
+    main()
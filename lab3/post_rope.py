@@ -0,0 +1,301 @@
+"""
+Неизменяемая строка-верёвка (rope) для длинных слов системы Поста.
+
+Слово хранится как сбалансированное по высоте дерево кусков текста.
+Разрез и склейка создают только O(log n) новых узлов, остальные
+поддеревья разделяются между старой и новой версией слова, поэтому
+переписывание участка стоит O(log n) плюс размер вставки, а значения
+переменных можно брать срезами без копирования текста.
+
+Rope поддерживает те операции str, которыми пользуется RuleMatcher:
+len, итерацию, срезы, find/rfind по символу и startswith.
+"""
+
+# Соседние листья короче этого склеиваются в один
+LEAF_MAX = 512
+
+
+def _bit(ch):
+    return 1 << (ord(ch) & 63)
+
+
+class _Leaf:
+    __slots__ = ('text', 'length', 'mask')
+    height = 0
+
+    def __init__(self, text):
+        self.text = text
+        self.length = len(text)
+        # Маска символов куска: поиск символа пропускает поддеревья без него
+        self.mask = 0
+        for ch in set(text):
+            self.mask |= _bit(ch)
+
+
+class _Node:
+    __slots__ = ('left', 'right', 'length', 'height', 'mask')
+
+    def __init__(self, left, right):
+        self.left = left
+        self.right = right
+        self.length = left.length + right.length
+        self.height = max(left.height, right.height) + 1
+        self.mask = left.mask | right.mask
+
+
+def _rebalance(left, right):
+    """Узел из двух поддеревьев с разницей высот не больше 2 (одно вращение)"""
+    if left.height > right.height + 1:
+        if left.left.height >= left.right.height:
+            return _Node(left.left, _Node(left.right, right))
+        inner = left.right
+        return _Node(_Node(left.left, inner.left), _Node(inner.right, right))
+    if right.height > left.height + 1:
+        if right.right.height >= right.left.height:
+            return _Node(_Node(left, right.left), right.right)
+        inner = right.left
+        return _Node(_Node(left, inner.left), _Node(inner.right, right.right))
+    return _Node(left, right)
+
+
+def _concat(left, right):
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if isinstance(left, _Leaf) and isinstance(right, _Leaf) and left.length + right.length <= LEAF_MAX:
+        return _Leaf(left.text + right.text)
+    if left.height > right.height + 1:
+        return _rebalance(left.left, _concat(left.right, right))
+    if right.height > left.height + 1:
+        return _rebalance(_concat(left, right.left), right.right)
+    return _Node(left, right)
+
+
+def _split(node, index):
+    """Разрезать дерево по позиции index: (левая часть, правая часть), пустые - None"""
+    if node is None:
+        return None, None
+    if index <= 0:
+        return None, node
+    if index >= node.length:
+        return node, None
+    if isinstance(node, _Leaf):
+        return _Leaf(node.text[:index]), _Leaf(node.text[index:])
+    if index <= node.left.length:
+        left, middle = _split(node.left, index)
+        return left, _concat(middle, node.right)
+    middle, right = _split(node.right, index - node.left.length)
+    return _concat(node.left, middle), right
+
+
+def _from_text(text):
+    if not text:
+        return None
+    if len(text) <= LEAF_MAX:
+        return _Leaf(text)
+    middle = len(text) // 2
+    return _Node(_from_text(text[:middle]), _from_text(text[middle:]))
+
+
+def _find(node, ch, bit, start, offset):
+    """Первое вхождение ch не раньше start в поддереве, начинающемся с offset"""
+    if node is None or not node.mask & bit or offset + node.length <= start:
+        return -1
+    if isinstance(node, _Leaf):
+        idx = node.text.find(ch, max(0, start - offset))
+        return offset + idx if idx != -1 else -1
+    found = _find(node.left, ch, bit, start, offset)
+    if found != -1:
+        return found
+    return _find(node.right, ch, bit, start, offset + node.left.length)
+
+
+def _rfind(node, ch, bit, start, end, offset):
+    """Последнее вхождение ch в [start, end) в поддереве, начинающемся с offset"""
+    if node is None or not node.mask & bit or offset >= end or offset + node.length <= start:
+        return -1
+    if isinstance(node, _Leaf):
+        idx = node.text.rfind(ch, max(0, start - offset), end - offset)
+        return offset + idx if idx != -1 else -1
+    found = _rfind(node.right, ch, bit, start, end, offset + node.left.length)
+    if found != -1:
+        return found
+    return _rfind(node.left, ch, bit, start, end, offset)
+
+
+class Rope:
+    """Неизменяемая строка на дереве кусков"""
+
+    __slots__ = ('root',)
+
+    def __init__(self, text=''):
+        self.root = _from_text(text)
+
+    @classmethod
+    def _wrap(cls, root):
+        rope = cls.__new__(cls)
+        rope.root = root
+        return rope
+
+    @classmethod
+    def join(cls, parts):
+        """Склеить последовательность строк и верёвок"""
+        root = None
+        for part in parts:
+            if isinstance(part, Rope):
+                root = _concat(root, part.root)
+            elif part:
+                root = _concat(root, _from_text(part))
+        return cls._wrap(root)
+
+    def __len__(self):
+        return self.root.length if self.root is not None else 0
+
+    def __str__(self):
+        return ''.join(self.pieces())
+
+    def __repr__(self):
+        return f"Rope({str(self)!r})"
+
+    def __eq__(self, other):
+        if isinstance(other, Rope):
+            other = str(other)
+        return str(self) == other
+
+    def __hash__(self):
+        return hash(str(self))
+
+    def pieces(self, start=0):
+        """Куски текста слева направо, начиная с позиции start"""
+        stack = []
+        node = self.root
+        offset = 0
+        while node is not None:
+            if isinstance(node, _Leaf):
+                if start - offset < node.length:
+                    yield node.text[max(0, start - offset):]
+                offset += node.length
+                node = stack.pop() if stack else None
+            elif start >= offset + node.left.length:
+                offset += node.left.length
+                node = node.right
+            else:
+                stack.append(node.right)
+                node = node.left
+
+    def __iter__(self):
+        for piece in self.pieces():
+            yield from piece
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step != 1:
+                raise ValueError("Шаг среза не поддерживается")
+            if stop <= start:
+                return Rope()
+            _, right = _split(self.root, start)
+            middle, _ = _split(right, stop - start)
+            return Rope._wrap(middle)
+
+        if key < 0:
+            key += len(self)
+        if not 0 <= key < len(self):
+            raise IndexError("Индекс вне строки")
+        node = self.root
+        while not isinstance(node, _Leaf):
+            if key < node.left.length:
+                node = node.left
+            else:
+                key -= node.left.length
+                node = node.right
+        return node.text[key]
+
+    def find(self, sub, start=0):
+        """Первое вхождение символа sub, начиная с позиции start"""
+        if len(sub) != 1:
+            raise ValueError("Rope.find ищет только один символ")
+        return _find(self.root, sub, _bit(sub), max(start, 0), 0)
+
+    def rfind(self, sub, start=0, end=None):
+        """Последнее вхождение символа sub в [start, end)"""
+        if len(sub) != 1:
+            raise ValueError("Rope.rfind ищет только один символ")
+        end = len(self) if end is None else min(end, len(self))
+        return _rfind(self.root, sub, _bit(sub), max(start, 0), end, 0)
+
+    def startswith(self, prefix, start=0):
+        if start + len(prefix) > len(self):
+            return False
+        position = 0
+        for piece in self.pieces(start):
+            chunk = prefix[position:position + len(piece)]
+            if not piece.startswith(chunk):
+                return False
+            position += len(chunk)
+            if position >= len(prefix):
+                return True
+        return position >= len(prefix)
+
+    def replace_range(self, start, end, part):
+        """Новая верёвка, где [start, end) заменён на part (строка или Rope)"""
+        left, rest = _split(self.root, start)
+        _, right = _split(rest, end - start)
+        middle = part.root if isinstance(part, Rope) else _from_text(part)
+        return Rope._wrap(_concat(_concat(left, middle), right))
+
+
+def test_rope(iterations=2000, seed=1):
+    """Сравнить операции Rope с теми же операциями над str на случайных правках"""
+    import random
+
+    rng = random.Random(seed)
+    alphabet = '1*=/ab'
+    text = ''.join(rng.choice(alphabet) for _ in range(3000))
+    rope = Rope(text)
+    failures = 0
+
+    for _ in range(iterations):
+        start = rng.randrange(len(text) + 1)
+        end = min(len(text), start + rng.randrange(40))
+        insert = ''.join(rng.choice(alphabet) for _ in range(rng.randrange(60)))
+        if rng.random() < 0.3 and end > start:
+            # Вставка среза самой верёвки - как значение переменной в правой части
+            piece_start = rng.randrange(len(text))
+            piece_end = min(len(text), piece_start + rng.randrange(2000))
+            insert = text[piece_start:piece_end]
+            rope = rope.replace_range(start, end, rope[piece_start:piece_end])
+        else:
+            rope = rope.replace_range(start, end, insert)
+        text = text[:start] + insert + text[end:]
+
+        ch = rng.choice(alphabet)
+        position = rng.randrange(len(text) + 1)
+        prefix = text[position:position + rng.randrange(1, 6)]
+        checks = [
+            (len(rope), len(text)),
+            (rope.find(ch, position), text.find(ch, position)),
+            (rope.rfind(ch, 0, position), text.rfind(ch, 0, position)),
+            (rope.startswith(prefix, position), text.startswith(prefix, position)),
+            (rope.startswith(prefix + 'x', position), False),
+            (str(rope[position:position + 100]), text[position:position + 100]),
+        ]
+        if text:
+            index = rng.randrange(len(text))
+            checks.append((rope[index], text[index]))
+        if any(got != expected for got, expected in checks) or str(rope) != text:
+            failures += 1
+            break
+
+    height = rope.root.height if rope.root is not None else 0
+    if failures == 0:
+        print(f"✓ УСПЕХ! Rope совпала со str на {iterations} правках "
+              f"(длина {len(text)}, высота дерева {height})")
+    else:
+        print("✗ Rope разошлась со str")
+    return failures == 0
+
+
+if __name__ == "__main__":
+    test_rope()
@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""
+Слово системы Поста в виде серий одинаковых символов (run-length).
+
+В унарной записи числа - длинные серии единиц, поэтому слово
+'111…1*11…1=/=' хранится как несколько пар (символ, число) и все
+операции сопоставления (find, rfind, startswith, срезы) и переписывания
+работают с числами повторений. Умножение 10^6 на 10^3 правилами из
+input.txt - тысяча шагов по десятку серий вместо строк из миллионов
+символов. Результат совпадает со строковым движком (RuleMatcher).
+"""
+
+import re
+import sys
+import time
+from bisect import bisect_left, bisect_right
+
+from post_cache import word_key
+from post_simulator import (RuleMatcher, apply_match, is_rope_safe, parse_input_file, rules_hash,
+                            substitute_variables)
+
+_RUN = re.compile(r'(.)\1*', re.DOTALL)
+
+
+class RunWord:
+    """Неизменяемое слово из серий: symbols[j] повторён counts[j] раз"""
+
+    __slots__ = ('symbols', 'counts', 'starts', 'length', '_runs_of')
+
+    def __init__(self, text=''):
+        runs = [(m.group(1), m.end() - m.start()) for m in _RUN.finditer(text)]
+        self._set_runs([symbol for symbol, _ in runs], [count for _, count in runs])
+
+    @classmethod
+    def from_runs(cls, runs):
+        """Слово из пар (символ, число); соседние серии одного символа сливаются"""
+        symbols, counts = [], []
+        for symbol, count in runs:
+            if count <= 0:
+                continue
+            if symbols and symbols[-1] == symbol:
+                counts[-1] += count
+            else:
+                symbols.append(symbol)
+                counts.append(count)
+        word = cls.__new__(cls)
+        word._set_runs(symbols, counts)
+        return word
+
+    @classmethod
+    def join(cls, parts):
+        """Склеить последовательность строк и слов из серий"""
+        runs = []
+        for part in parts:
+            if isinstance(part, RunWord):
+                runs.extend(part.runs())
+            elif part:
+                runs.extend((m.group(1), m.end() - m.start()) for m in _RUN.finditer(part))
+        return cls.from_runs(runs)
+
+    def _set_runs(self, symbols, counts):
+        self.symbols = symbols
+        self.counts = counts
+        self.starts = []
+        position = 0
+        for count in counts:
+            self.starts.append(position)
+            position += count
+        self.length = position
+        self._runs_of = None
+
+    def runs(self):
+        return zip(self.symbols, self.counts)
+
+    def runs_of(self, symbol):
+        """Номера серий символа symbol по возрастанию"""
+        if self._runs_of is None:
+            self._runs_of = {}
+            for j, ch in enumerate(self.symbols):
+                self._runs_of.setdefault(ch, []).append(j)
+        return self._runs_of.get(symbol, [])
+
+    def _run_at(self, position):
+        return bisect_right(self.starts, position) - 1
+
+    def __len__(self):
+        return self.length
+
+    def __str__(self):
+        return ''.join(symbol * count for symbol, count in self.runs())
+
+    def __repr__(self):
+        return f"RunWord({list(self.runs())!r})"
+
+    def __eq__(self, other):
+        if isinstance(other, RunWord):
+            return self.symbols == other.symbols and self.counts == other.counts
+        return str(self) == other
+
+    def __hash__(self):
+        return hash((tuple(self.symbols), tuple(self.counts)))
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            if key < 0:
+                key += self.length
+            if not 0 <= key < self.length:
+                raise IndexError("Индекс вне строки")
+            return self.symbols[self._run_at(key)]
+
+        start, stop, step = key.indices(self.length)
+        if step != 1:
+            raise ValueError("Шаг среза не поддерживается")
+        if stop <= start:
+            return RunWord()
+        first, last = self._run_at(start), self._run_at(stop - 1)
+        runs = [(self.symbols[j], self.counts[j]) for j in range(first, last + 1)]
+        if first == last:
+            runs[0] = (runs[0][0], stop - start)
+        else:
+            runs[0] = (runs[0][0], self.starts[first] + self.counts[first] - start)
+            runs[-1] = (runs[-1][0], stop - self.starts[last])
+        return RunWord.from_runs(runs)
+
+    def find(self, sub, start=0):
+        """Первое вхождение символа sub, начиная с позиции start"""
+        if len(sub) != 1:
+            raise ValueError("RunWord.find ищет только один символ")
+        start = max(start, 0)
+        if start >= self.length:
+            return -1
+        j = self._run_at(start)
+        if self.symbols[j] == sub:
+            return start
+        runs = self.runs_of(sub)
+        k = bisect_right(runs, j)
+        return self.starts[runs[k]] if k < len(runs) else -1
+
+    def rfind(self, sub, start=0, end=None):
+        """Последнее вхождение символа sub в [start, end)"""
+        if len(sub) != 1:
+            raise ValueError("RunWord.rfind ищет только один символ")
+        end = self.length if end is None else min(end, self.length)
+        if end <= max(start, 0):
+            return -1
+        j = self._run_at(end - 1)
+        if self.symbols[j] == sub:
+            found = end - 1
+        else:
+            runs = self.runs_of(sub)
+            k = bisect_left(runs, j) - 1
+            if k < 0:
+                return -1
+            found = self.starts[runs[k]] + self.counts[runs[k]] - 1
+        return found if found >= start else -1
+
+    def startswith(self, prefix, start=0):
+        if start + len(prefix) > self.length:
+            return False
+        if not prefix:
+            return True
+        j = self._run_at(start)
+        available = self.starts[j] + self.counts[j] - start
+        for m in _RUN.finditer(prefix):
+            symbol, count = m.group(1), m.end() - m.start()
+            while count:
+                if self.symbols[j] != symbol:
+                    return False
+                used = min(count, available)
+                count -= used
+                available -= used
+                if not available and j + 1 < len(self.symbols):
+                    j += 1
+                    available = self.counts[j]
+        return True
+
+    def replace_range(self, start, end, part):
+        """Новое слово, где [start, end) заменён на part (строка или RunWord)"""
+        return RunWord.join([self[:start], part, self[end:]])
+
+
+class RunMatcher:
+    """
+    Поиск первого применимого правила по сериям.
+    Кандидаты - вхождения опорных строк правил. Опорная строка из двух и
+    более серий встречается не чаще раза на серию. Для опорной строки из
+    одной серии внутри длинной серии слова исход проверки одинаков во всех
+    позициях, от которых до конца серии больше, чем символов-констант
+    в левой части: проверяются начало серии, следующая позиция и хвост.
+    """
+
+    def __init__(self, R, X):
+        self.matcher = RuleMatcher(R, X)
+        self.anchor_runs = []
+        self.literal_length = []
+        for (lhs, _), rule in zip(R, self.matcher.rules):
+            self.anchor_runs.append([(m.group(1), m.end() - m.start())
+                                     for m in _RUN.finditer(rule.anchor)])
+            self.literal_length.append(sum(1 for ch in lhs if ch not in X))
+
+    def _candidates(self, number, word):
+        """Позиции начала вхождений опорной строки правила number по возрастанию"""
+        pattern = self.anchor_runs[number]
+        symbol, count = pattern[0]
+        symbols, counts, starts = word.symbols, word.counts, word.starts
+
+        if len(pattern) == 1:
+            margin = self.literal_length[number] + 1
+            for j in word.runs_of(symbol):
+                if counts[j] < count:
+                    continue
+                first = starts[j]
+                last = first + counts[j] - count
+                run_end = first + counts[j]
+                yield from range(first, min(first + 2, last + 1))
+                yield from range(max(first + 2, run_end - margin), last + 1)
+            return
+
+        tail_symbol, tail_count = pattern[-1]
+        middle = pattern[1:-1]
+        for j in word.runs_of(symbol):
+            k = j + len(pattern) - 1
+            if counts[j] < count or k >= len(symbols):
+                continue
+            if symbols[k] != tail_symbol or counts[k] < tail_count:
+                continue
+            if all(symbols[j + 1 + i] == s and counts[j + 1 + i] == c
+                   for i, (s, c) in enumerate(middle)):
+                yield starts[j] + counts[j] - count
+
+    def find_first(self, word):
+        """(номер правила, начало, конец, подстановки) или None, как RuleMatcher.find_first"""
+        matcher = self.matcher
+        for number, rule in enumerate(matcher.rules):
+            if not rule.anchor:
+                found = rule.match_at(word, 0)
+                if found is not None:
+                    return number, 0, found[0], found[1]
+                continue
+            last = len(rule.anchor) - 1
+            for position in self._candidates(number, word):
+                found = matcher._match_anchored(number, word, position + last)
+                if found is not None:
+                    return (number,) + found
+        return None
+
+
+def run_result(word):
+    """Значение первого вхождения /1…1= (как re.search(r'/([1]+)=')) или None"""
+    symbols = word.symbols
+    for j in word.runs_of('/'):
+        if j + 2 < len(symbols) and symbols[j + 1] == '1' and symbols[j + 2] == '=':
+            start = word.starts[j + 1]
+            return word[start:start + word.counts[j + 1]]
+    return None
+
+
+def derive(R, A, X, word, max_steps=1000, runs=True, matcher=None, cache=None):
+    """
+    Вывод первым применимым правилом (как в main) без трассы:
+    (итоговое слово, число шагов, последний результат /…=, ошибка или None).
+    runs=False - тот же вывод строковым движком RuleMatcher; matcher -
+    заранее собранный RunMatcher или RuleMatcher для этих правил;
+    cache - DerivationCache: вывод обрывается на слове с известным исходом,
+    а исходы всех слов завершённого вывода запоминаются.
+    """
+    if runs and not is_rope_safe(word, A, X):
+        raise ValueError("Слово с переменными или символами вне A ведётся только строкой")
+    current = RunWord(word) if runs else word
+    if matcher is None:
+        matcher = RunMatcher(R, X) if runs else RuleMatcher(R, X)
+    final_result = ""
+
+    # Для кеша: ключи пройденных слов и результат /…= после каждого шага
+    digest = rules_hash(A, X, R) if cache is not None else None
+    path_keys, path_results = [], []
+    outcome = None
+
+    step = 0
+    while step < max_steps:
+        if cache is not None:
+            key = word_key(current)
+            outcome = cache.get(digest, key)
+            if outcome is not None and step + outcome[1] <= max_steps:
+                final, remaining, result = outcome
+                current = RunWord(final) if runs else final
+                step += remaining
+                final_result = result or final_result
+                break
+            outcome = None
+            path_keys.append(key)
+
+        match = matcher.find_first(current)
+        if match is None:
+            break
+        try:
+            current = apply_match(current, R[match[0]], match, A, X)
+        except ValueError as e:
+            return current, step, final_result, str(e)
+
+        if runs:
+            result = run_result(current)
+        else:
+            result_match = re.search(r'/([1]+)=', current)
+            result = result_match.group(1) if result_match else None
+        if result is not None:
+            final_result = result
+        if cache is not None:
+            path_results.append(result)
+        step += 1
+
+    halted = outcome is not None or (path_keys and len(path_results) < len(path_keys))
+    if cache is not None and halted:
+        _remember_path(cache, digest, current, path_keys, path_results, outcome)
+    return current, step, final_result, None
+
+
+def _remember_path(cache, digest, final, path_keys, path_results, outcome):
+    """Исходы слов пути: от слова i до конца осталось len(path_results) - i шагов"""
+    if outcome is None:
+        # Вывод остановился сам: последнее слово пути итоговое, шагов 0
+        tail_steps, tail_result = 0, ""
+    else:
+        final, tail_steps, tail_result = outcome
+    items = []
+    result = tail_result
+    for i in range(len(path_results) - 1, -1, -1):
+        if not result and path_results[i] is not None:
+            result = str(path_results[i])
+        items.append((path_keys[i], (tail_steps + len(path_results) - i, result)))
+    if outcome is None:
+        items.append((path_keys[-1], (0, "")))
+    cache.put_many(digest, final, items)
+
+
+def test_run_engine(trials=2000, seed=11):
+    """Сравнить вывод по сериям со строковым движком на случайных системах"""
+    import random
+
+    rng = random.Random(seed)
+    A = {'1', '*', '=', '/'}
+    X = {'a', 'b', 'c'}
+    symbols = sorted(A) + sorted(X)
+    failures = 0
+
+    for _ in range(trials):
+        R = [(''.join(rng.choice(symbols) for _ in range(rng.randint(1, 5))),
+              ''.join(rng.choice(symbols) for _ in range(rng.randint(0, 6))))
+             for _ in range(rng.randint(1, 4))]
+        # Длинные серии, чтобы проверялся пропуск внутренних позиций
+        word = ''.join(rng.choice(sorted(A)) * rng.choice((1, 1, 2, 7, 20))
+                       for _ in range(rng.randint(0, 8)))
+        expected = derive(R, A, X, word, max_steps=12, runs=False)
+        got = derive(R, A, X, word, max_steps=12, runs=True)
+        got = (str(got[0]), got[1], str(got[2]), got[3])
+        if got != expected:
+            failures += 1
+            if failures <= 3:
+                print(f"✗ {R} '{word}':\n  строка: {expected}\n  серии:  {got}")
+
+    if failures == 0:
+        print(f"✓ УСПЕХ! Вывод по сериям совпал со строковым на {trials} системах")
+    return failures == 0
+
+
+def multiply(a, b, filename='input.txt'):
+    """Умножение a × b правилами из input.txt на сериях"""
+    A, X, _, R, _ = parse_input_file(filename)
+    word = substitute_variables('a*b=/=', {'a': '1' * a, 'b': '1' * b})
+
+    started = time.perf_counter()
+    final, steps, result, error = derive(R, A, X, word, max_steps=b + 10)
+    elapsed = time.perf_counter() - started
+
+    print(f"{a} × {b}: шагов {steps}, результат /…= из {len(result)} единиц, "
+          f"итоговое слово {final!r}, время {elapsed:.3f} с")
+    if error:
+        print(f"Ошибка: {error}")
+    return len(result), final
+
+
+if __name__ == '__main__':
+    test_run_engine()
+    if len(sys.argv) > 1:
+        multiply(int(sys.argv[1]), int(sys.argv[2]) if len(sys.argv) > 2 else 1000)
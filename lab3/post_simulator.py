@@ -1,8 +1,17 @@
 #!/usr/bin/env python3
 # post_simulator.py - Расширенная версия с поддержкой секции INPUT
 
-import sys
+import argparse
+import hashlib
+import json
+import os
 import re
+import sys
+import time
+from bisect import bisect_left, bisect_right, insort
+
+from post_rope import Rope
+from post_trace import COMPRESSIONS, LEVELS, TraceWriter
 
 def parse_input_file(filename):
     """Разбор входного файла с поддержкой секции INPUT"""
@@ -53,6 +62,12 @@ def parse_input_file(filename):
 
 def substitute_variables(string, variables):
     """Подстановка значений вместо переменных"""
+    # Один проход, если имена односимвольные и значения не содержат
+    # имён переменных (иначе последовательные замены дали бы другой итог)
+    if all(len(var) == 1 for var in variables) and \
+            not any(ch in variables for value in variables.values() for ch in value):
+        return ''.join(variables.get(ch, ch) for ch in string)
+
     result = string
     for var, value in variables.items():
         result = result.replace(var, value)
@@ -129,84 +144,806 @@ def apply_rule(current_string, rule, A, X):
     
     return current_string, None  # Если правило не применимо
 
-def main():
-    if len(sys.argv) != 2:
-        print("Использование: python post_simulator.py <входной_файл>")
-        return
+class CompiledRule:
+    """
+    Левая часть правила, разобранная на постоянные участки и группы переменных:
+    lhs = prefix (vars_1 const_1) (vars_2 const_2) ...
+    Сопоставление повторяет apply_rule: первая переменная группы захватывает
+    всё до ближайшего вхождения первого символа следующей константы,
+    остальные переменные группы получают пустую строку, возврата нет.
+    """
+
+    def __init__(self, lhs, X):
+        self.lhs = lhs
+        self.prefix = ''
+        self.parts = []   # [(переменные, константа)], у последней группы константа может быть ''
+
+        position = 0
+        while position < len(lhs) and lhs[position] not in X:
+            position += 1
+        self.prefix = lhs[:position]
+
+        while position < len(lhs):
+            start = position
+            while position < len(lhs) and lhs[position] in X:
+                position += 1
+            variables = lhs[start:position]
+            start = position
+            while position < len(lhs) and lhs[position] not in X:
+                position += 1
+            self.parts.append((variables, lhs[start:position]))
+
+        # Опорная строка для многошаблонного поиска
+        if self.prefix:
+            self.anchor = self.prefix
+        elif self.parts and self.parts[0][1]:
+            self.anchor = self.parts[0][1]
+        else:
+            self.anchor = ''
+
+    def match_parts(self, string, current_index, substitutions, first=0):
+        """Сопоставить группы начиная с first; вернуть конец совпадения или -1"""
+        for variables, constant in self.parts[first:]:
+            # Переменной нужен хотя бы один оставшийся символ (как в apply_rule)
+            if current_index >= len(string):
+                return -1
+            if constant:
+                idx = string.find(constant[0], current_index)
+                if idx == -1:
+                    return -1
+                value = string[current_index:idx]
+                current_index = idx
+            elif len(variables) > 1:
+                return -1
+            else:
+                value = string[current_index:]
+                current_index = len(string)
+
+            substitutions[variables[0]] = value
+            for var in variables[1:]:
+                substitutions[var] = ''
+
+            if constant:
+                if not string.startswith(constant, current_index):
+                    return -1
+                current_index += len(constant)
+        return current_index
+
+    def match_at(self, string, i):
+        """Совпадение, начинающееся в позиции i: (конец, подстановки) или None"""
+        if i >= len(string) or not string.startswith(self.prefix, i):
+            return None
+        substitutions = {}
+        end = self.match_parts(string, i + len(self.prefix), substitutions)
+        if end < 0:
+            return None
+        return end, substitutions
+
+
+class RuleMatcher:
+    """
+    Поиск первого применимого правила за один проход по строке.
+    Опорные константы всех правил собраны в автомат Ахо-Корасик; каждое
+    срабатывание проверяется только для правил с меньшим номером, чем уже
+    найденное, поэтому сохраняются приоритет правил и самое левое вхождение.
+    """
+
+    def __init__(self, R, X):
+        self.rules = [CompiledRule(lhs, X) for lhs, _ in R]
+
+        # Бор: переходы, ссылки неудач и выходы (номера правил)
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        for number, rule in enumerate(self.rules):
+            if rule.anchor:
+                node = 0
+                for ch in rule.anchor:
+                    if ch not in self.goto[node]:
+                        self.goto.append({})
+                        self.fail.append(0)
+                        self.output.append([])
+                        self.goto[node][ch] = len(self.goto) - 1
+                    node = self.goto[node][ch]
+                self.output[node].append(number)
+
+        queue = list(self.goto[0].values())
+        for node in queue:
+            for ch, child in self.goto[node].items():
+                fallback = self.fail[node]
+                while fallback and ch not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(ch, 0)
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+                queue.append(child)
+
+    def _match_anchored(self, number, string, end):
+        """Проверить правило number по вхождению его опорной строки, кончающемуся в end"""
+        rule = self.rules[number]
+        start = end - len(rule.anchor) + 1
+        if rule.prefix:
+            found = rule.match_at(string, start)
+            if found is None:
+                return None
+            return start, found[0], found[1]
+
+        # Правило начинается с переменной: самое левое начало - сразу после
+        # предыдущего вхождения первого символа константы
+        variables, constant = rule.parts[0]
+        i = string.rfind(constant[0], 0, start) + 1
+        substitutions = {variables[0]: string[i:start]}
+        for var in variables[1:]:
+            substitutions[var] = ''
+        finish = rule.match_parts(string, start + len(constant), substitutions, first=1)
+        if finish < 0:
+            return None
+        return i, finish, substitutions
+
+    def find_first(self, string):
+        """
+        Первое применимое правило и его самое левое совпадение:
+        (номер правила, начало, конец, подстановки) или None
+        """
+        best = None
+        # Правила без опорной константы проверяются только в позиции 0
+        for number, rule in enumerate(self.rules):
+            if not rule.anchor:
+                found = rule.match_at(string, 0)
+                if found is not None:
+                    best = (number, 0, found[0], found[1])
+                    break
+        if best is not None and best[0] == 0:
+            return best
+
+        goto, fail, output = self.goto, self.fail, self.output
+        node = 0
+        end = -1
+        # По Rope автомат идёт кусками, без сборки слова в одну строку
+        pieces = string.pieces() if isinstance(string, Rope) else (string,)
+        for piece in pieces:
+            for ch in piece:
+                end += 1
+                while node and ch not in goto[node]:
+                    node = fail[node]
+                node = goto[node].get(ch, 0)
+                for number in output[node]:
+                    if best is not None and number >= best[0]:
+                        continue
+                    found = self._match_anchored(number, string, end)
+                    if found is not None:
+                        best = (number,) + found
+                        if number == 0:
+                            return best
+        return best
+
+
+# Ключ позиций символов, отличных от '1' (границы значения /1…1=)
+BREAKS = None
+_BREAK = re.compile(r'[^1]')
+
+
+def _occurrences(text, pattern, limit):
+    """Начала вхождений pattern в text, меньшие limit (BREAKS - символы, кроме '1')"""
+    if pattern is BREAKS:
+        return [m.start() for m in _BREAK.finditer(text, 0, limit)]
+    found = []
+    idx = text.find(pattern)
+    while 0 <= idx < limit:
+        found.append(idx)
+        idx = text.find(pattern, idx + 1)
+    return found
+
+
+class _Positions:
+    """
+    Отсортированные позиции блоками с ленивыми сдвигами: позиция - значение
+    в блоке плюс смещение блока, а смещения - суммы в дереве Фенвика. Сдвиг
+    всех позиций правее правки стоит O(log блоков), остальные операции
+    касаются только блоков, в которые попадает окно правки.
+    """
+
+    BLOCK = 512
+
+    def __init__(self, positions=()):
+        positions = list(positions)
+        self._layout([positions[i:i + self.BLOCK] for i in range(0, len(positions), self.BLOCK)],
+                     [0] * ((len(positions) + self.BLOCK - 1) // self.BLOCK))
+
+    def _layout(self, blocks, offsets):
+        """Новое разбиение на блоки с заданными смещениями (дерево строится за O(блоков))"""
+        self.blocks = blocks or [[]]
+        offsets = offsets or [0]
+        self.tree = [0] * (len(self.blocks) + 1)
+        for i, offset in enumerate(offsets):
+            self.tree[i + 1] = offset - (offsets[i - 1] if i else 0)
+        for i in range(1, len(self.tree)):
+            j = i + (i & -i)
+            if j < len(self.tree):
+                self.tree[j] += self.tree[i]
+
+    def _relayout(self):
+        """Разбить переполненные блоки и убрать пустые"""
+        blocks, offsets = [], []
+        for b, block in enumerate(self.blocks):
+            offset = self._offset(b)
+            for i in range(0, len(block), self.BLOCK):
+                blocks.append(block[i:i + self.BLOCK])
+                offsets.append(offset)
+        self._layout(blocks, offsets)
+
+    def _offset(self, b):
+        """Смещение блока b"""
+        b += 1
+        total = 0
+        while b:
+            total += self.tree[b]
+            b &= b - 1
+        return total
+
+    def _shift_blocks(self, b, delta):
+        """Сдвинуть блоки b, b + 1, ... на delta"""
+        b += 1
+        while b < len(self.tree):
+            self.tree[b] += delta
+            b += b & -b
+
+    def _find_block(self, x):
+        """Первый блок, в котором есть позиции не меньше x (len(blocks), если нет)"""
+        lo, hi = 0, len(self.blocks)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            block = self.blocks[mid]
+            if block and block[-1] + self._offset(mid) >= x:
+                hi = mid
+            else:
+                lo = mid + 1
+        return lo
+
+    def __iter__(self):
+        for b, block in enumerate(self.blocks):
+            offset = self._offset(b)
+            for position in block:
+                yield position + offset
+
+    def range(self, lo, hi):
+        """Позиции из [lo, hi)"""
+        found = []
+        for b in range(self._find_block(lo), len(self.blocks)):
+            block, offset = self.blocks[b], self._offset(b)
+            j = bisect_left(block, hi - offset)
+            found.extend(position + offset for position in block[bisect_left(block, lo - offset):j])
+            if j < len(block):
+                break
+        return found
+
+    def next_after(self, x):
+        """Наименьшая позиция больше x или None"""
+        b = self._find_block(x + 1)
+        if b == len(self.blocks):
+            return None
+        block, offset = self.blocks[b], self._offset(b)
+        return block[bisect_left(block, x + 1 - offset)] + offset
+
+    def remove(self, lo, hi):
+        """Удалить позиции из [lo, hi)"""
+        emptied = False
+        for b in range(self._find_block(lo), len(self.blocks)):
+            block, offset = self.blocks[b], self._offset(b)
+            j = bisect_left(block, hi - offset)
+            rest = len(block) - j
+            del block[bisect_left(block, lo - offset):j]
+            emptied = emptied or not block
+            if rest:
+                break
+        if emptied:
+            self._relayout()
+
+    def shift(self, x, delta):
+        """Прибавить delta ко всем позициям не меньше x (порядок не должен нарушиться)"""
+        b = self._find_block(x)
+        if b == len(self.blocks):
+            return
+        block = self.blocks[b]
+        i = bisect_left(block, x - self._offset(b))
+        if i == 0:
+            self._shift_blocks(b, delta)
+            return
+        for t in range(i, len(block)):
+            block[t] += delta
+        self._shift_blocks(b + 1, delta)
+
+    def insert(self, positions):
+        """Добавить позиции (их ещё нет среди хранимых)"""
+        overflow = False
+        for position in positions:
+            b = min(self._find_block(position), len(self.blocks) - 1)
+            block = self.blocks[b]
+            insort(block, position - self._offset(b))
+            overflow = overflow or len(block) > 2 * self.BLOCK
+        if overflow:
+            self._relayout()
+
+
+class RuleIndex:
+    """
+    Инкрементальный индекс применимости правил для слова в Rope.
+    Хранит отсортированные позиции вхождений опорных строк всех правил,
+    символов '/' и всех символов, кроме '1' (для шаблона результата /1…1=).
+    После переписывания новое слово описывается участками: неизменные части
+    и значения переменных скопированы из старого слова (их вхождения
+    переносятся со сдвигом), константы правой части - новый текст. Заново
+    сканируются только константы и стыки участков шириной в самую длинную
+    опорную строку. Позиции хранятся в _Positions: хвост слова за правкой
+    сдвигается лениво, так что шаг стоит O(правки), а не O(числа позиций).
+    """
+
+    def __init__(self, matcher, word):
+        self.matcher = matcher
+        self.word = word
+        patterns = {rule.anchor for rule in matcher.rules if rule.anchor}
+        patterns.add('/')
+        self.span = max(len(pattern) for pattern in patterns)
+        text = str(word)
+        self.positions = {pattern: _Positions(_occurrences(text, pattern, len(text)))
+                          for pattern in list(patterns) + [BREAKS]}
+
+    def _segments(self, rule, match, new_length):
+        """Участки нового слова: [начало, конец, начало в старом слове или None]"""
+        lhs, rhs = rule
+        _, start, end, substitutions = match
+        old_length = len(self.word)
+
+        # Где значения переменных лежат в старом слове
+        sources = {}
+        position = start
+        for ch in lhs:
+            if ch in substitutions:
+                if ch in sources:
+                    # Повторная переменная: значение не восстановить по одному проходу
+                    sources = None
+                    break
+                sources[ch] = position
+                position += len(substitutions[ch])
+            else:
+                position += 1
+
+        segments = []
+
+        def add(length, source):
+            if not length:
+                return
+            begin = segments[-1][1] if segments else 0
+            if segments:
+                last = segments[-1]
+                if source is None and last[2] is None or \
+                        source is not None and last[2] is not None and last[2] + last[1] - last[0] == source:
+                    last[1] += length
+                    return
+            segments.append([begin, begin + length, source])
+
+        add(start, 0)
+        if sources is None or position != end:
+            add(new_length - start - (old_length - end), None)
+        else:
+            for ch in rhs:
+                if ch in substitutions:
+                    add(len(substitutions[ch]), sources[ch])
+                else:
+                    add(1, None)
+        add(old_length - end, end)
+        return segments
+
+    def update(self, new_word, rule, match):
+        """Учесть переписывание слова правилом rule по совпадению match"""
+        segments = self._segments(rule, match, len(new_word))
+        starts = [segment[0] for segment in segments]
+        old_length = len(self.word)
+
+        # Начала вхождений, которые могли измениться: новый текст и стыки участков
+        windows = []
+        for begin, end, source in segments:
+            lo = max(0, begin - self.span + 1)
+            hi = end if source is None else begin
+            if hi <= lo:
+                continue
+            if windows and lo <= windows[-1][1]:
+                windows[-1][1] = max(windows[-1][1], hi)
+            else:
+                windows.append([lo, hi])
+        texts = [(lo, hi, str(new_word[lo:hi + self.span - 1])) for lo, hi in windows]
+
+        # Начало слова остаётся на месте, конец (если скопирован целиком)
+        # сдвигается лениво; переносятся поштучно только значения переменных
+        head = segments[0] if segments and segments[0][2] == 0 else None
+        tail = segments[-1] if segments else None
+        if tail is None or tail is head or tail[2] is None or \
+                tail[2] + tail[1] - tail[0] != old_length or tail[2] < (head[1] if head else 0):
+            tail = None
+        middle = [segment for segment in segments
+                  if segment[2] is not None and segment is not head and segment is not tail]
+
+        for pattern, positions in self.positions.items():
+            length = len(pattern) if pattern is not BREAKS else 1
+            copied = []
+            for begin, end, source in middle:
+                shift = begin - source
+                copied.extend(position + shift
+                              for position in positions.range(source, source + (end - begin) - length + 1))
+
+            found = []
+            for lo, hi, text in texts:
+                for idx in _occurrences(text, pattern, hi - lo):
+                    position = lo + idx
+                    begin, end, source = segments[bisect_right(starts, position) - 1]
+                    if source is None or position + length > end:
+                        found.append(position)
+
+            positions.remove(max(0, head[1] - length + 1) if head else 0,
+                             tail[2] if tail else old_length)
+            if tail is not None and tail[0] != tail[2]:
+                positions.shift(tail[2], tail[0] - tail[2])
+            positions.insert(sorted(copied + found) if found else copied)
+
+        self.word = new_word
+
+    def find_first(self):
+        """То же, что RuleMatcher.find_first, но по индексу кандидатов"""
+        word = self.word
+        matcher = self.matcher
+        for number, rule in enumerate(matcher.rules):
+            if not rule.anchor:
+                found = rule.match_at(word, 0)
+                if found is not None:
+                    return number, 0, found[0], found[1]
+                continue
+            last = len(rule.anchor) - 1
+            for position in self.positions[rule.anchor]:
+                found = matcher._match_anchored(number, word, position + last)
+                if found is not None:
+                    return (number,) + found
+        return None
+
+    def result(self):
+        """Значение первого вхождения /1…1= (как re.search(r'/([1]+)=')) или None"""
+        breaks = self.positions[BREAKS]
+        for position in self.positions['/']:
+            end = breaks.next_after(position)
+            if end is None:
+                return None
+            if end > position + 1 and self.word[end] == '=':
+                return self.word[position + 1:end]
+        return None
+
+
+def is_rope_safe(string, A, X):
+    """
+    Слово можно вести в Rope, если все его символы из A и не являются
+    переменными: тогда значения переменных тоже такие, подстановка в
+    правую часть сводится к одному проходу, а проверять нужно только
+    символы самой правой части.
+    """
+    return all(ch in A and ch not in X for ch in string)
+
+def apply_match(current_string, rule, match, A, X):
+    """Выполнить подстановку для найденного совпадения (как в apply_rule)"""
+    _, start, end, substitutions = match
+    if not isinstance(current_string, str):
+        # Rope или слово из серий (post_runs.RunWord): правая часть собирается
+        # из констант и срезов-значений без копирования слова
+        parts = []
+        literal = []
+        for ch in rule[1]:
+            if ch in substitutions:
+                parts.append(''.join(literal))
+                parts.append(substitutions[ch])
+                literal = []
+            elif ch not in A:
+                raise ValueError(f"Ошибка применения правила: Символ '{ch}' не входит в алфавит A")
+            else:
+                literal.append(ch)
+        parts.append(''.join(literal))
+        return current_string.replace_range(start, end, type(current_string).join(parts))
+
+    new_part = rule[1]
+    for var, value in substitutions.items():
+        new_part = new_part.replace(var, value)
+
+    valid, error = validate_string(new_part, A, X)
+    if not valid:
+        raise ValueError(f"Ошибка применения правила: {error}")
+
+    return current_string[:start] + new_part + current_string[end:]
+
+def test_rule_index(trials=300, seed=7):
+    """Сравнить RuleIndex с полным поиском RuleMatcher и re.search на случайных выводах"""
+    import random
+
+    rng = random.Random(seed)
+    A = {'1', '*', '=', '/'}
+    X = {'a', 'b', 'c'}
+    symbols = sorted(A) + sorted(X)
+    failures = 0
+
+    for _ in range(trials):
+        R = [(''.join(rng.choice(symbols) for _ in range(rng.randint(1, 5))),
+              ''.join(rng.choice(symbols) for _ in range(rng.randint(0, 6))))
+             for _ in range(rng.randint(1, 4))]
+        word = ''.join(rng.choice(sorted(A)) for _ in range(rng.randint(0, 30)))
+        matcher = RuleMatcher(R, X)
+        rope = Rope(word)
+        index = RuleIndex(matcher, rope)
+
+        for _ in range(40):
+            expected = matcher.find_first(word)
+            got = index.find_first()
+            if expected is None or got is None:
+                if expected != got:
+                    failures += 1
+                break
+            if expected[:3] != got[:3]:
+                failures += 1
+                break
+            try:
+                word = apply_match(word, R[expected[0]], expected, A, X)
+            except ValueError:
+                break
+            new_rope = apply_match(rope, R[got[0]], got, A, X)
+            index.update(new_rope, R[got[0]], got)
+            rope = new_rope
+
+            result_match = re.search(r'/([1]+)=', word)
+            result = index.result()
+            if (result_match.group(1) if result_match else None) != (None if result is None else str(result)):
+                failures += 1
+                break
+            if len(word) > 3000:
+                break
+
+    if failures == 0:
+        print(f"✓ УСПЕХ! Индекс правил совпал с полным поиском в {trials} выводах")
+    else:
+        print(f"✗ Расхождений: {failures}")
+    return failures == 0
+
+def initial_word(A, X, A1, INPUT):
+    """Проверить аксиому и INPUT, вернуть начальное слово (ValueError при ошибке)"""
+    if not A1:
+        raise ValueError("не найдены аксиомы")
+    axiom_template = next(iter(A1))
+
+    # Проверка, что аксиома содержит только символы алфавита или переменные
+    for ch in axiom_template:
+        if ch not in A and ch not in X:
+            raise ValueError(f"символ '{ch}' в аксиоме не входит в алфавит A или множество переменных X")
+
+    # Проверка, что все переменные во входных данных объявлены в X
+    for var in INPUT.keys():
+        if var not in X:
+            raise ValueError(f"переменная '{var}' в INPUT не входит в множество X")
+
+    # Подстановка переменных из INPUT
+    return substitute_variables(axiom_template, INPUT) if INPUT else axiom_template
+
+def rules_hash(A, X, R):
+    """Хеш набора правил: снимок можно продолжить только с теми же A, X и R"""
+    data = json.dumps([sorted(A), sorted(X), R], ensure_ascii=False)
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+def memory_used():
+    """
+    Текущий размер резидентной памяти процесса в байтах или None, если его
+    не измерить: через psutil (любая ОС), иначе через /proc (Linux).
+    Без psutil на Windows и macOS предел памяти не проверяется.
+    """
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError, IndexError):
+        return None
+
+def save_checkpoint(path, word, step, final_result, digest):
+    """Записать снимок вывода (через временный файл, чтобы не оставить обрывок)"""
+    snapshot = {
+        'word': str(word),
+        'step': step,
+        'final_result': str(final_result),
+        'rules_hash': digest,
+    }
+    temporary = path + f'.{os.getpid()}.tmp'
+    with open(temporary, 'w', encoding='utf-8') as f:
+        json.dump(snapshot, f, ensure_ascii=False)
+    os.replace(temporary, path)
+
+def load_checkpoint(path, digest):
+    """Прочитать снимок: (слово, шаг, последний результат)"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            snapshot = json.load(f)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"снимок '{path}' не найден, продолжать нечего")
+    except ValueError:
+        raise ValueError(f"снимок '{path}' повреждён")
+    try:
+        if snapshot['rules_hash'] != digest:
+            raise ValueError(f"снимок '{path}' сделан для другого набора правил")
+        return snapshot['word'], snapshot['step'], snapshot['final_result']
+    except (KeyError, TypeError):
+        raise ValueError(f"снимок '{path}' повреждён")
+
+DEFAULT_CHECKPOINT = 'post_simulator.ckpt.json'
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description="Моделирование канонической системы Поста")
+    parser.add_argument('input', help="входной файл с описанием системы")
+    parser.add_argument('--max-steps', type=int, default=1000,
+                        help="предел числа шагов вывода (с учётом шагов до снимка)")
+    parser.add_argument('--max-time', type=float, default=None, help="предел времени работы, с")
+    parser.add_argument('--max-memory', type=int, default=None, help="предел памяти, МБ")
+    parser.add_argument('--checkpoint', default=None,
+                        help="файл снимка для продолжения вывода (без него снимки не пишутся; "
+                             f"для --resume по умолчанию {DEFAULT_CHECKPOINT})")
+    parser.add_argument('--checkpoint-every', type=int, default=10_000,
+                        help="снимок каждые N шагов (0 - только при остановке по пределу)")
+    parser.add_argument('--checkpoint-seconds', type=float, default=60.0,
+                        help="снимок не реже чем раз в столько секунд")
+    parser.add_argument('--resume', action='store_true',
+                        help="продолжить вывод с последнего снимка")
+    parser.add_argument('--output', default=None,
+                        help="файл трассы (по умолчанию output.txt, со сжатием - output.txt.gz/.zst)")
+    parser.add_argument('--trace', choices=LEVELS, default='full',
+                        help="подробность трассы: ничего, итог, каждый N-й шаг, каждый шаг")
+    parser.add_argument('--trace-every', type=int, default=1000, metavar='N',
+                        help="шаг прореживания для --trace every")
+    parser.add_argument('--deltas', action='store_true',
+                        help="писать только правило, позицию и вставку вместо целых слов")
+    parser.add_argument('--compress', choices=COMPRESSIONS, default='none')
+    parser.add_argument('--writer-thread', action='store_true',
+                        help="сбрасывать буфер трассы в фоновом потоке")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_arguments(argv)
 
     try:
         # Разбор входного файла
-        A, X, A1, R, INPUT = parse_input_file(sys.argv[1])
+        A, X, A1, R, INPUT = parse_input_file(args.input)
 
         # --- Проверки ---
-        if not A1:
-            print("Ошибка: не найдены аксиомы")
+        try:
+            axiom_word = initial_word(A, X, A1, INPUT)
+        except ValueError as e:
+            print(f"Ошибка: {e}")
             return
-        axiom_template = next(iter(A1))
 
-        # Проверка, что аксиома содержит только символы алфавита или переменные
-        for ch in axiom_template:
-            if ch not in A and ch not in X:
-                print(f"Ошибка: символ '{ch}' в аксиоме не входит в алфавит A или множество переменных X")
+        # Слово из INPUT или из снимка
+        digest = rules_hash(A, X, R)
+        step = 0
+        final_result = ""  # Последний найденный результат между /…=
+        # Снимки пишутся только в явно заданный файл (или в тот, с которого продолжаем)
+        checkpoint = args.checkpoint or (DEFAULT_CHECKPOINT if args.resume else None)
+        if args.resume:
+            try:
+                current_string, step, final_result = load_checkpoint(checkpoint, digest)
+            except (FileNotFoundError, ValueError) as e:
+                print(f"Ошибка: {e}")
                 return
+        else:
+            current_string = axiom_word
 
-        # Проверка, что все переменные во входных данных объявлены в X
-        for var in INPUT.keys():
-            if var not in X:
-                print(f"Ошибка: переменная '{var}' в INPUT не входит в множество X")
-                return
+        # Левые части правил компилируются один раз
+        matcher = RuleMatcher(R, X)
 
-        # Подстановка переменных из INPUT
-        current_string = substitute_variables(axiom_template, INPUT) if INPUT else axiom_template
+        # Длинное слово хранится в Rope: правка стоит O(log n) плюс размер вставки
+        # и индекс кандидатов обновляется только в окне правки
+        index = None
+        if is_rope_safe(current_string, A, X):
+            current_string = Rope(current_string)
+            index = RuleIndex(matcher, current_string)
+        # Текст слова строится только когда он нужен трассе или снимку
+        current_text = None
 
-        step = 0
-        max_steps = 1000
-        output_filename = "output.txt"
-        final_result = ""  # Последний найденный результат между /…=
+        max_steps = args.max_steps
+        max_memory = args.max_memory * 2**20 if args.max_memory else None
+        if max_memory is not None and memory_used() is None:
+            print("Предупреждение: память процесса не измерить (нужен psutil), --max-memory не действует")
+            max_memory = None
+        output_filename = args.output or "output.txt" + {'none': '', 'gzip': '.gz', 'zstd': '.zst'}[args.compress]
+        started = time.monotonic()
+        checkpoint_step, checkpoint_time = step, started
+        resumed_step = step
 
-        with open(output_filename, "w", encoding='utf-8') as output_file:
-            output_file.write(f"Начальная строка: {current_string}\n\n")
-
-            while step < max_steps:
-                rule_applied = False
-
-                for rule in R:
-                    try:
-                        new_string, substitutions = apply_rule(current_string, rule, A, X)
-                    except ValueError as e:
-                        # Ошибка применения правила
-                        print(f"Ошибка: {e}")
-                        output_file.write(f"Ошибка: {e}\n")
-                        return
-
-                    if substitutions is not None:
-                        # Обновить результат, если есть шаблон /…=
-                        match = re.search(r'/([1]+)=', new_string)
-                        if match:
-                            final_result = match.group(1)
-
-                        # Записать шаг
-                        output_file.write(f"Шаг {step + 1}:\n")
-                        output_file.write(f"Исходная строка: {current_string}\n")
-                        output_file.write(f"Применено правило: {rule[0]} -> {rule[1]}\n")
-                        output_file.write(f"Результат: {new_string}\n\n")
-
-                        current_string = new_string
-                        rule_applied = True
-                        step += 1
-                        break
+        # При продолжении трасса дописывается в конец файла
+        trace = TraceWriter(output_filename, level=args.trace, every=args.trace_every,
+                            deltas=args.deltas, compression=args.compress,
+                            append=args.resume, threaded=args.writer_thread)
+        with trace:
+            if args.resume:
+                trace.write(f"Продолжение с шага {step}: {current_string}\n\n")
+            else:
+                trace.write(f"Начальная строка: {current_string}\n\n")
+
+            while True:
+                # Проверка пределов; при остановке по пределу сохраняется снимок
+                now = time.monotonic()
+                stop = None
+                if step >= max_steps:
+                    stop = "достигнут максимум шагов"
+                elif args.max_time is not None and now - started > args.max_time:
+                    stop = "исчерпан предел времени"
+                elif max_memory is not None and (memory_used() or 0) > max_memory:
+                    stop = "превышен предел памяти"
+                if stop:
+                    trace.write(f"Вычисление остановлено: {stop}.\n")
+                    print(f"Предупреждение: {stop}")
+                    if checkpoint:
+                        save_checkpoint(checkpoint, current_string, step, final_result, digest)
+                        print(f"Снимок сохранён в {checkpoint}, продолжить: --resume --checkpoint {checkpoint}")
+                    break
 
-                if not rule_applied:
-                    output_file.write("Вычисление завершено успешно. Правила больше не применимы.\n")
+                if checkpoint and ((args.checkpoint_every and step - checkpoint_step >= args.checkpoint_every) or
+                                   (step > checkpoint_step and now - checkpoint_time >= args.checkpoint_seconds)):
+                    save_checkpoint(checkpoint, current_string, step, final_result, digest)
+                    checkpoint_step, checkpoint_time = step, now
+
+                match = index.find_first() if index else matcher.find_first(current_string)
+                if match is None:
+                    trace.write("Вычисление завершено успешно. Правила больше не применимы.\n")
                     print("Вычисление завершено успешно.")
+                    # Законченный вывод продолжать не нужно
+                    if checkpoint and (args.resume or checkpoint_step != resumed_step) \
+                            and os.path.exists(checkpoint):
+                        os.remove(checkpoint)
                     break
-            else:
-                output_file.write("Вычисление остановлено: достигнут максимум шагов.\n")
-                print("Предупреждение: достигнут максимум шагов")
 
-            output_file.write(f"Итоговый результат: {final_result}\n")
+                rule = R[match[0]]
+                try:
+                    new_string = apply_match(current_string, rule, match, A, X)
+                except ValueError as e:
+                    # Ошибка применения правила
+                    print(f"Ошибка: {e}")
+                    trace.write(f"Ошибка: {e}\n")
+                    return
+
+                # Обновить результат, если есть шаблон /…=
+                new_text = None
+                if index:
+                    index.update(new_string, rule, match)
+                    result = index.result()
+                    if result is not None:
+                        final_result = result
+                else:
+                    new_text = new_string
+                    result_match = re.search(r'/([1]+)=', new_text)
+                    if result_match:
+                        final_result = result_match.group(1)
+
+                # Записать шаг
+                if trace.wants_step(step + 1):
+                    _, start, end, _ = match
+                    if trace.deltas:
+                        inserted = new_string[start:end + len(new_string) - len(current_string)]
+                        trace.write_delta(step + 1, match[0], rule, start, end, inserted)
+                    else:
+                        if current_text is None:
+                            current_text = str(current_string)
+                        new_text = str(new_string)
+                        trace.write_step(step + 1, current_text, rule, new_text)
+
+                current_string = new_string
+                current_text = new_text
+                step += 1
+
+            if trace.level != 'full':
+                trace.write(f"Выполнено шагов: {step}\n")
+            trace.write(f"Итоговый результат: {final_result}\n")
 
-        print(f"Результаты вычислений записаны в {output_filename}")
+        if trace.level != 'none':
+            print(f"Результаты вычислений записаны в {output_filename}")
         print(f"Окончательный результат: {final_result}")
 
     except Exception as e:
@@ -216,4 +953,8 @@ def main():
 
 
 if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == 'batch':
+        from post_batch import batch_main
+        batch_main(sys.argv[2:])
+        sys.exit()
     main()
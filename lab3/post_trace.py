@@ -0,0 +1,185 @@
+"""
+Запись трассы вывода системы Поста.
+
+Уровни подробности: none (ничего), summary (начальное слово и итог),
+every (каждый N-й шаг) и full (каждый шаг, как раньше). Текст копится
+в большом буфере и сбрасывается кусками - в текущем потоке или в
+фоновом потоке записи. Поток можно сжимать gzip или zstd (zstd - если
+установлен пакет zstandard). В режиме deltas вместо целых слов на шаг
+пишется только номер правила, позиция и вставленный текст.
+"""
+
+import gzip
+import queue
+import threading
+
+LEVELS = ('none', 'summary', 'every', 'full')
+COMPRESSIONS = ('none', 'gzip', 'zstd')
+
+
+def open_trace_file(path, append=False, compression='none'):
+    """Открыть файл трассы на запись в байтах с нужным сжатием"""
+    mode = 'ab' if append else 'wb'
+    if compression == 'gzip':
+        return gzip.open(path, mode)
+    if compression == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise ValueError("Для сжатия zstd нужен пакет zstandard (pip install zstandard)")
+        # Кадры zstd при дописывании просто идут один за другим
+        return zstandard.ZstdCompressor().stream_writer(open(path, mode), closefd=True)
+    return open(path, mode)
+
+
+class TraceWriter:
+    """Буферизованная запись трассы с уровнем подробности"""
+
+    def __init__(self, path, level='full', every=1, deltas=False, compression='none',
+                 append=False, buffer_size=1 << 20, threaded=False):
+        if level not in LEVELS:
+            raise ValueError(f"Неизвестный уровень трассы '{level}', допустимы: {', '.join(LEVELS)}")
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Неизвестное сжатие '{compression}', допустимы: {', '.join(COMPRESSIONS)}")
+        self.path = path
+        self.level = level
+        self.every = max(1, every)
+        self.deltas = deltas
+        self.buffer_size = buffer_size
+        self._pieces = []
+        self._buffered = 0
+        self._file = open_trace_file(path, append, compression) if level != 'none' else None
+
+        # Фоновый поток получает готовые куски; очередь ограничена, чтобы не копить память
+        self._queue = None
+        self._error = None
+        self._reported = False
+        if threaded and self._file is not None:
+            self._queue = queue.Queue(maxsize=4)
+            self._thread = threading.Thread(target=self._writer, daemon=True)
+            self._thread.start()
+
+    def _writer(self):
+        # После ошибки записи поток только разбирает очередь, чтобы put не
+        # встал навсегда; саму ошибку поднимает следующий flush или close
+        while True:
+            chunk = self._queue.get()
+            if chunk is None:
+                break
+            if self._error is None:
+                try:
+                    self._file.write(chunk)
+                except BaseException as e:
+                    self._error = e
+
+    def _check_writer(self, again=True):
+        """
+        Поднять в вызывающем потоке ошибку, на которой остановилась запись:
+        при каждом flush, а при close - только если о ней ещё не сообщали.
+        """
+        if self._error is not None and (again or not self._reported):
+            self._reported = True
+            raise OSError(f"Ошибка записи трассы в '{self.path}': {self._error}") from self._error
+
+    def wants_step(self, step):
+        """Писать ли шаг step (нумерация с 1)"""
+        return self.level == 'full' or (self.level == 'every' and step % self.every == 0)
+
+    def write(self, text):
+        """Строки начала и итога; на уровне none не пишутся"""
+        if self._file is None:
+            return
+        self._pieces.append(text)
+        self._buffered += len(text)
+        if self._buffered >= self.buffer_size:
+            self.flush()
+
+    def write_step(self, step, source, rule, result):
+        self.write(f"Шаг {step}:\n"
+                   f"Исходная строка: {source}\n"
+                   f"Применено правило: {rule[0]} -> {rule[1]}\n"
+                   f"Результат: {result}\n\n")
+
+    def write_delta(self, step, number, rule, start, end, replacement):
+        self.write(f"Шаг {step}: правило {number + 1} ({rule[0]} -> {rule[1]}), "
+                   f"[{start}:{end}] -> {replacement}\n")
+
+    def flush(self):
+        if not self._pieces:
+            return
+        chunk = ''.join(self._pieces).encode('utf-8')
+        self._pieces = []
+        self._buffered = 0
+        if self._queue is not None:
+            self._check_writer()
+            self._queue.put(chunk)
+        else:
+            self._file.write(chunk)
+
+    def close(self):
+        if self._file is None:
+            return
+        try:
+            self.flush()
+        finally:
+            if self._queue is not None:
+                self._queue.put(None)
+                self._thread.join()
+            self._file.close()
+            self._file = None
+        if self._queue is not None:
+            self._check_writer(again=False)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def test_trace_writer():
+    """Одинаковый текст при прямой записи, в фоновом потоке и со сжатием gzip"""
+    import os
+    import tempfile
+
+    lines = [f"Шаг {i}: правило 1 (a*1b=/c= -> a*b=/ca=), [0:9] -> 111*1=\n" for i in range(20000)]
+    expected = ''.join(lines)
+    texts = []
+    with tempfile.TemporaryDirectory() as directory:
+        for threaded, compression in ((False, 'none'), (True, 'none'), (True, 'gzip')):
+            path = os.path.join(directory, f'trace-{threaded}-{compression}')
+            with TraceWriter(path, compression=compression, threaded=threaded, buffer_size=4096) as trace:
+                for line in lines:
+                    trace.write(line)
+            opener = gzip.open if compression == 'gzip' else open
+            with opener(path, 'rb') as f:
+                texts.append(f.read().decode('utf-8'))
+
+    ok = all(text == expected for text in texts)
+
+    # Ошибка фонового потока записи доходит до вызывающего, а не вешает его
+    class BrokenFile:
+        def write(self, chunk):
+            raise OSError("нет места на диске")
+
+        def close(self):
+            pass
+
+    with tempfile.TemporaryDirectory() as directory:
+        trace = TraceWriter(os.path.join(directory, 'broken'), threaded=True, buffer_size=16)
+        trace._file.close()
+        trace._file = BrokenFile()
+        try:
+            for line in lines:
+                trace.write(line)
+            trace.close()
+            ok = False
+        except OSError:
+            trace.close()
+
+    print("✓ УСПЕХ! Трасса совпадает во всех режимах записи" if ok else "✗ Трассы различаются")
+    return ok
+
+
+if __name__ == '__main__':
+    test_trace_writer()
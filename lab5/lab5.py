@@ -1,3 +1,4 @@
+import argparse
 import os
 
 class MealyMachineGenerator:
@@ -139,7 +140,12 @@ def validate_word(word, automaton_matrix):
     
     return is_accepted, output_sequence, path, transition_log
 
-def main():
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Синтез автомата Мили для (x^n|d^m)^k axb")
+    parser.add_argument('--minimize', action='store_true',
+                        help="записать и использовать минимальный автомат (алгоритм Хопкрофта)")
+    args = parser.parse_args(argv)
+
     # Получаем текущую директорию
     current_dir = os.path.dirname(os.path.abspath(__file__))
     input_file_path = os.path.join(current_dir, 'input.txt')
@@ -195,12 +201,19 @@ def main():
     # Генерируем автомат
     generator = MealyMachineGenerator(n, m, k)
     automaton_matrix = generator.generate_automaton()
+    state_count = len(automaton_matrix)
+    if args.minimize:
+        from mealy_minimize import minimize
+        automaton_matrix, _ = minimize(automaton_matrix)
+        print(f"Минимальный автомат: {len(automaton_matrix)} состояний вместо {state_count}")
     
     # Записываем выходные данные в файл
     output_file_path = os.path.join(current_dir, 'output.txt')
     with open(output_file_path, 'w', encoding='utf-8') as f:
         f.write(f"Автоматная матрица для n={n}, m={m}, k={k}\n")
         f.write(f"Паттерн: {k} групп по ({n} 'x' ИЛИ {m} 'd') затем 'a x b'\n")
+        if args.minimize:
+            f.write(f"Минимальный автомат: {len(automaton_matrix)} состояний вместо {state_count}\n")
         f.write("Состояние | x | d | a | b\n")
         f.write("-" * 80 + "\n")
         
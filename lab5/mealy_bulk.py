@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Массовая проверка слов автоматом Мили на NumPy.
+
+Слова читаются из файла или стандартного ввода блоками по chunk_size,
+блок сортируется по длине и делится на группы, каждая группа
+упаковывается в матрицу номеров символов N x L (короткие слова
+дополнены, в матрице не больше MAX_CELLS ячеек - одно длинное слово не
+раздувает её на весь блок), и все N слов группы продвигаются по
+компактной таблице (CompactMealy) одновременно: на каждый столбец - одна
+векторная выборка следующих состояний и выходов с маской слов, которые
+ещё читаются.
+Для каждого слова печатается только флаг (1 - принято, 0 - отвергнуто)
+и выходная последовательность; в конце - число слов в секунду.
+
+    python mealy_bulk.py words.txt --params "n=2 m=3 k=3" --output results.txt
+    generate_words | python mealy_bulk.py -
+"""
+
+import argparse
+import itertools
+import os
+import sys
+import time
+
+import numpy as np
+
+from mealy_table import INVALID, SYMBOL_IDS, CompactMealy
+
+# Перекодировка байтов в номера символов; PAD - дополнение коротких слов
+_CODES = np.full(256, INVALID, dtype=np.uint8)
+for _symbol, _id in SYMBOL_IDS.items():
+    _CODES[ord(_symbol)] = _id
+PAD = 0xFE
+# Наибольшая матрица символов одной группы слов (ячеек)
+MAX_CELLS = 1 << 22
+
+
+class BulkValidator:
+    """Векторная проверка блоков слов по компактной таблице автомата"""
+
+    def __init__(self, table, max_cells=MAX_CELLS):
+        self.table = table
+        self.max_cells = max_cells
+        states = len(table)
+        self.next_state = np.frombuffer(table.next_state, dtype=np.int32).reshape(states, 4)
+        bits = np.unpackbits(np.frombuffer(bytes(table.outputs), dtype=np.uint8), bitorder='little')
+        self.outputs = bits[:states * 4].reshape(states, 4)
+        self.words = 0
+        self.accepted = 0
+        self.elapsed = 0.0
+
+    def encode(self, words):
+        """Номера символов всех слов подряд (вектор uint8) и вектор длин"""
+        data = [word.encode('ascii', 'replace') for word in words]
+        lengths = np.fromiter((len(item) for item in data), dtype=np.int64, count=len(data))
+        return _CODES[np.frombuffer(b''.join(data), dtype=np.uint8)], lengths
+
+    def _buckets(self, lengths):
+        """
+        Номера слов по возрастанию длины, группами: матрица группы (слов x
+        наибольшая длина) не больше max_cells ячеек, так что одно длинное
+        слово не раздувает матрицу всего блока; слово длиннее max_cells -
+        отдельная группа.
+        """
+        order = np.argsort(lengths, kind='stable')
+        ordered = np.maximum(lengths[order], 1)
+        begin = 0
+        while begin < len(order):
+            # Слова группы не короче первого, поэтому их не больше max_cells // его длина
+            window = ordered[begin:begin + max(1, self.max_cells // int(ordered[begin]))]
+            cells = np.arange(1, len(window) + 1) * window
+            size = max(1, int(np.searchsorted(cells, self.max_cells, side='right')))
+            yield order[begin:begin + size]
+            begin += size
+
+    @staticmethod
+    def _matrix(codes, starts, lengths, rows):
+        """
+        Матрица номеров символов слов rows: len(rows) x наибольшая длина
+        (дополнена PAD), их длины и пара индексов: ячейки матрицы и те же
+        символы в общем векторе блока.
+        """
+        lengths = lengths[rows]
+        width = int(lengths.max()) if len(rows) else 0
+        matrix = np.full((len(rows), width), PAD, dtype=np.uint8)
+        within = np.arange(int(lengths.sum())) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        cells = (np.repeat(np.arange(len(rows)), lengths), within)
+        flat = np.repeat(starts[rows], lengths) + within
+        matrix[cells] = codes[flat]
+        return matrix, lengths, cells, flat
+
+    def _run(self, codes, lengths):
+        """Прогон матрицы слов: (флаги приёма, матрица выходов 0/1, длины выходов)"""
+        count, width = codes.shape
+        state = np.full(count, self.table.start, dtype=np.int32)
+        alive = np.ones(count, dtype=bool)        # слово ещё не остановлено ошибкой
+        produced = np.zeros(count, dtype=np.int64)
+        outputs = np.zeros((count, width), dtype=np.uint8)
+
+        for column in range(width):
+            active = alive & (lengths > column)
+            if not active.any():
+                break
+            symbols = codes[:, column]
+            # Неверный символ: слово отвергается, выход обрывается
+            alive &= ~(active & (symbols == INVALID))
+            rows = np.nonzero(alive & active)[0]
+            current, symbol = state[rows], symbols[rows]
+            following = self.next_state[current, symbol]
+            # Переход не определён (только у неполных таблиц)
+            undefined = following < 0
+            if undefined.any():
+                alive[rows[undefined]] = False
+                rows, current, symbol, following = (rows[~undefined], current[~undefined],
+                                                    symbol[~undefined], following[~undefined])
+            outputs[rows, column] = self.outputs[current, symbol]
+            state[rows] = following
+            produced[rows] = column + 1
+
+        return alive & (state == self.table.final), outputs, produced
+
+    def validate(self, words):
+        """
+        Проверка блока слов: (флаги приёма, выходы 0/1 всех слов подряд,
+        длины выходов, начала). Выходы слова i - outputs[starts[i]:starts[i] +
+        produced[i]]. Слова идут группами близкой длины (см. _buckets).
+        """
+        started = time.perf_counter()
+        codes, lengths = self.encode(words)
+        starts = np.cumsum(lengths) - lengths
+        accepted = np.zeros(len(words), dtype=bool)
+        produced = np.zeros(len(words), dtype=np.int64)
+        outputs = np.zeros(len(codes), dtype=np.uint8)
+
+        for rows in self._buckets(lengths):
+            matrix, group_lengths, cells, flat = self._matrix(codes, starts, lengths, rows)
+            group_accepted, group_outputs, group_produced = self._run(matrix, group_lengths)
+            accepted[rows] = group_accepted
+            produced[rows] = group_produced
+            # Выходы за produced - нули матрицы, их никто не читает
+            outputs[flat] = group_outputs[cells]
+
+        self.words += len(words)
+        self.accepted += int(accepted.sum())
+        self.elapsed += time.perf_counter() - started
+        return accepted, outputs, produced, starts
+
+    def render(self, words):
+        """Результат блока одним куском байтов: строки 'флаг выходы' по слову"""
+        accepted, outputs, produced, starts = self.validate(words)
+        # Строка слова: флаг, пробел, выходы, перевод строки
+        line_lengths = produced + 3
+        line_starts = np.cumsum(line_lengths) - line_lengths
+        text = np.empty(int(line_lengths.sum()), dtype=np.uint8)
+        text[line_starts] = accepted + ord('0')
+        text[line_starts + 1] = ord(' ')
+        text[line_starts + produced + 2] = ord('\n')
+        within = np.arange(int(produced.sum())) - np.repeat(np.cumsum(produced) - produced, produced)
+        text[np.repeat(line_starts + 2, produced) + within] = outputs[np.repeat(starts, produced) + within] + ord('0')
+        return text.tobytes()
+
+    def lines(self, words):
+        """Строки результата: флаг и выходная последовательность"""
+        return self.render(words).decode('ascii').splitlines()
+
+    def rate(self):
+        return self.words / self.elapsed if self.elapsed else 0.0
+
+
+def read_words(stream, chunk_size):
+    """Блоки слов из потока (по слову в строке, пустые строки пропускаются)"""
+    words = (line.strip().replace(" ", "") for line in stream)
+    words = (word for word in words if word)
+    while True:
+        chunk = list(itertools.islice(words, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def parse_parameters(text):
+    """n, m, k из строки вида 'n=2 m=3 k=3' (первая строка input.txt)"""
+    params = dict(item.split('=') for item in text.split())
+    return int(params['n']), int(params['m']), int(params['k'])
+
+
+def test_bulk_validator(words=5000, seed=3):
+    """Векторная проверка совпадает с CompactMealy.run, в том числе на неверных символах"""
+    import io
+    import random
+
+    rng = random.Random(seed)
+    ok = True
+    for n, m, k in ((1, 1, 1), (2, 3, 3), (3, 1, 2)):
+        table = CompactMealy.from_parameters(n, m, k)
+        partial = CompactMealy.from_transitions({'Qstart': {'x': ('Qfinal', '1')},
+                                                 'Qfinal': {'a': ('Qstart', '0')}})
+        sample = []
+        for _ in range(words):
+            if rng.random() < 0.3:
+                groups = ''.join(rng.choice(('x' * n, 'd' * m)) for _ in range(k))
+                sample.append(groups + 'axb')
+            else:
+                sample.append(''.join(rng.choice('xdab' if rng.random() < 0.9 else 'xdabz')
+                                      for _ in range(rng.randint(0, 3 * k + 5))))
+        for automaton, max_cells in ((table, MAX_CELLS), (partial, MAX_CELLS), (table, 40)):
+            # Малый max_cells - много групп, в том числе из одного длинного слова
+            validator = BulkValidator(automaton, max_cells)
+            stream = io.StringIO('\n'.join(sample) + '\n')
+            got = [line for chunk in read_words(stream, 777) for line in validator.lines(chunk)]
+            expected = []
+            for word in sample:
+                if word:
+                    accepted, output = automaton.run(word)
+                    expected.append(f"{int(accepted)} {output}")
+            if got != expected:
+                ok = False
+                print(f"✗ n={n} m={m} k={k}: результаты пакетной проверки расходятся")
+
+    if ok:
+        print(f"✓ УСПЕХ! Пакетная проверка совпала с пословной на {words} словах для каждого автомата")
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Массовая проверка слов автоматом Мили")
+    parser.add_argument('words', nargs='?', default=None,
+                        help="файл со словами по одному в строке ('-' - стандартный ввод)")
+    parser.add_argument('--params', default=None,
+                        help="параметры 'n=2 m=3 k=3' (по умолчанию - первая строка input.txt)")
+    parser.add_argument('--output', default=None, help="файл результатов (по умолчанию - стандартный вывод)")
+    parser.add_argument('--chunk-size', type=int, default=65536)
+    args = parser.parse_args(argv)
+
+    if args.words is None:
+        test_bulk_validator()
+        return
+
+    params = args.params
+    if params is None:
+        input_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'input.txt')
+        with open(input_path, 'r', encoding='utf-8') as f:
+            params = f.readline()
+    n, m, k = parse_parameters(params)
+
+    validator = BulkValidator(CompactMealy.from_parameters(n, m, k))
+    source = sys.stdin if args.words == '-' else open(args.words, 'r', encoding='utf-8')
+    target = sys.stdout.buffer if args.output is None else open(args.output, 'wb')
+    started = time.perf_counter()
+    try:
+        for chunk in read_words(source, args.chunk_size):
+            target.write(validator.render(chunk))
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout.buffer:
+            target.close()
+        else:
+            target.flush()
+    total = time.perf_counter() - started
+
+    print(f"Слов: {validator.words}, принято: {validator.accepted}, отвергнуто: "
+          f"{validator.words - validator.accepted}", file=sys.stderr)
+    print(f"Проверка: {validator.rate():,.0f} слов/с, вместе с чтением и записью: "
+          f"{validator.words / total if total else 0:,.0f} слов/с", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
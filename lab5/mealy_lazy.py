@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Ленивый автомат Мили для (x^n | d^m)^k axb.
+
+MealyMachineGenerator заранее строит все k·(n+m) состояний ReadingX/ReadingD
+и для каждого - строку переходов в ловушку. Здесь состояние чтения
+кодируется тройкой (группа, фаза 'x'/'d', счётчик), а строка переходов
+вычисляется по этой тройке при первом обращении и кладётся в LRU
+ограниченного размера. Память зависит от числа посещённых состояний,
+а не от k. Объект можно передавать в validate_word вместо словаря:
+он отвечает на in и [] по именам состояний генератора.
+"""
+
+import sys
+import time
+from collections import OrderedDict
+
+SYMBOLS = ('x', 'd', 'a', 'b')
+FIXED_STATES = ("Qstart", "SuffixX", "SuffixB", "Qfinal", "Qtrap")
+TRAP = "Qtrap"
+
+
+class LazyMealy:
+    """Автомат Мили, строки переходов которого вычисляются по запросу"""
+
+    def __init__(self, n, m, k, cache_size=4096):
+        self.n = n
+        self.m = m
+        self.k = k
+        self.cache_size = cache_size
+        self.rows = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    # Состояние - имя служебного состояния или тройка (группа, фаза, счётчик)
+
+    def _group_start(self, group):
+        """Переходы в начало группы group по 'x' и по 'd'"""
+        return {'x': ((group, 'x', 1), "0"), 'd': ((group, 'd', 1), "0")}
+
+    def _compute_row(self, state):
+        row = {symbol: (TRAP, "0") for symbol in SYMBOLS}
+        if state == "Qstart":
+            row.update(self._group_start(0))
+        elif state == "SuffixX":
+            row['x'] = ("SuffixB", "0")
+        elif state == "SuffixB":
+            row['b'] = ("Qfinal", "1")
+        elif isinstance(state, tuple):
+            group, phase, counter = state
+            length = self.n if phase == 'x' else self.m
+            if counter < length:
+                row[phase] = ((group, phase, counter + 1), "0")
+            elif group < self.k - 1:
+                row.update(self._group_start(group + 1))
+            else:
+                row['a'] = ("SuffixX", "0")
+        return row
+
+    def row(self, state):
+        """Строка переходов состояния: символ -> (следующее состояние, выход)"""
+        row = self.rows.get(state)
+        if row is not None:
+            self.hits += 1
+            self.rows.move_to_end(state)
+            return row
+        self.misses += 1
+        row = self._compute_row(state)
+        self.rows[state] = row
+        if len(self.rows) > self.cache_size:
+            self.rows.popitem(last=False)
+        return row
+
+    def run(self, word):
+        """(принято ли, выходная последовательность) без печати"""
+        state = "Qstart"
+        output = []
+        for char in word:
+            if char not in SYMBOLS:
+                return False, ''.join(output)
+            state, out = self.row(state)[char]
+            output.append(out)
+        return state == "Qfinal", ''.join(output)
+
+    # Имена состояний, как у MealyMachineGenerator
+
+    def name(self, state):
+        if isinstance(state, tuple):
+            group, phase, counter = state
+            return f"Reading{phase.upper()}_{group}_{counter}"
+        return state
+
+    def parse(self, name):
+        """Состояние по имени или None, если такого состояния в автомате нет"""
+        if name in FIXED_STATES:
+            return name
+        try:
+            kind, group, counter = name.split('_')
+            group, counter = int(group), int(counter)
+        except (AttributeError, ValueError):
+            return None
+        phase = {'ReadingX': 'x', 'ReadingD': 'd'}.get(kind)
+        length = self.n if phase == 'x' else self.m
+        if phase is None or not 0 <= group < self.k or not 1 <= counter <= length:
+            return None
+        return group, phase, counter
+
+    def __contains__(self, name):
+        return self.parse(name) is not None
+
+    def __getitem__(self, name):
+        state = self.parse(name)
+        if state is None:
+            raise KeyError(name)
+        return {symbol: (self.name(next_state), output)
+                for symbol, (next_state, output) in self.row(state).items()}
+
+    def __len__(self):
+        return len(FIXED_STATES) + self.k * (self.n + self.m)
+
+    def __iter__(self):
+        yield "Qstart"
+        for group in range(self.k):
+            for phase, length in (('x', self.n), ('d', self.m)):
+                for counter in range(1, length + 1):
+                    yield self.name((group, phase, counter))
+        yield from FIXED_STATES[1:]
+
+
+def test_lazy_automaton(max_length=7):
+    """Ленивый автомат совпадает с построенной таблицей, в том числе через validate_word"""
+    import contextlib
+    import io
+    from itertools import product
+
+    from lab5 import MealyMachineGenerator, validate_word
+    from mealy_minimize import run_word
+
+    ok = True
+    for n, m, k in ((1, 1, 1), (2, 3, 1), (2, 3, 3), (3, 1, 2)):
+        transitions = MealyMachineGenerator(n, m, k).generate_automaton()
+        lazy = LazyMealy(n, m, k, cache_size=3)
+        if {name: lazy[name] for name in lazy} != transitions or len(lazy) != len(transitions):
+            ok = False
+            print(f"✗ n={n} m={m} k={k}: строки переходов отличаются от таблицы")
+        for length in range(max_length + 1):
+            for letters in product(SYMBOLS, repeat=length):
+                word = ''.join(letters)
+                if lazy.run(word) != run_word(transitions, word):
+                    ok = False
+                    print(f"✗ n={n} m={m} k={k}: слово '{word}' обрабатывается по-разному")
+                    break
+        word = 'x' * n * k + 'axb'
+        with contextlib.redirect_stdout(io.StringIO()):
+            if validate_word(word, lazy) != validate_word(word, transitions):
+                ok = False
+        if len(lazy.rows) > lazy.cache_size:
+            ok = False
+
+    if ok:
+        print(f"✓ УСПЕХ! Ленивый автомат совпадает с таблицей на словах длины до {max_length}")
+    return ok
+
+
+def measure(n, m, k, words=1000):
+    """Время и число вычисленных строк при проверке коротких слов для огромного k"""
+    started = time.perf_counter()
+    lazy = LazyMealy(n, m, k)
+    accepted = 0
+    for i in range(words):
+        word = ('x' * n if i % 2 else 'd' * m) * (i % 7 + 1) + 'axb'
+        accepted += lazy.run(word)[0]
+    elapsed = time.perf_counter() - started
+    print(f"n={n}, m={m}, k={k}: {words} слов за {elapsed:.3f} с, принято {accepted}, "
+          f"строк в кеше {len(lazy.rows)}, попаданий {lazy.hits}, вычислено {lazy.misses}")
+
+
+if __name__ == '__main__':
+    test_lazy_automaton()
+    if len(sys.argv) > 3:
+        measure(int(sys.argv[1]), int(sys.argv[2]), int(sys.argv[3]))
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Минимизация автомата Мили (алгоритм Хопкрофта).
+
+Начальное разбиение - по выходам на каждом входном символе и по тому,
+конечное ли состояние (слово принимается по попаданию в Qfinal, а
+выходы Qfinal и Qtrap совпадают). Затем блоки дробятся, пока все
+состояния блока не переходят по каждому символу в один и тот же блок.
+Каждый блок становится одним состоянием с именем своего первого
+состояния, поэтому Qstart, Qfinal и Qtrap сохраняют имена и таблица
+подходит для validate_word как есть.
+"""
+
+from collections import deque
+
+SYMBOLS = ('x', 'd', 'a', 'b')
+
+
+def reachable_states(transitions, start="Qstart"):
+    """Достижимые из start состояния в порядке обхода в ширину"""
+    seen = {start}
+    order = [start]
+    queue = deque([start])
+    while queue:
+        state = queue.popleft()
+        for next_state, _ in transitions[state].values():
+            if next_state not in seen:
+                seen.add(next_state)
+                order.append(next_state)
+                queue.append(next_state)
+    return order
+
+
+def minimize(transitions, start="Qstart", finals=("Qfinal",), symbols=SYMBOLS):
+    """
+    Минимальный автомат, эквивалентный transitions (только достижимая часть).
+    Возвращает (таблица в том же формате, {старое состояние: новое}).
+    """
+    reachable = set(reachable_states(transitions, start))
+    # Порядок исходной таблицы, чтобы представителями стали первые состояния
+    states = [state for state in transitions if state in reachable]
+    index = {state: i for i, state in enumerate(states)}
+    finals = set(finals)
+
+    target = [[index[transitions[state][symbol][0]] for symbol in symbols] for state in states]
+    inverse = [[[] for _ in states] for _ in symbols]
+    for i, row in enumerate(target):
+        for s, j in enumerate(row):
+            inverse[s][j].append(i)
+
+    # Начальное разбиение: выходы по всем символам и признак конечного состояния
+    blocks = []
+    block_of = [0] * len(states)
+    keys = {}
+    for i, state in enumerate(states):
+        key = (state in finals, tuple(transitions[state][symbol][1] for symbol in symbols))
+        if key not in keys:
+            keys[key] = len(blocks)
+            blocks.append(set())
+        block_of[i] = keys[key]
+        blocks[keys[key]].add(i)
+
+    waiting = deque((b, s) for b in range(len(blocks)) for s in range(len(symbols)))
+    in_waiting = set(waiting)
+
+    while waiting:
+        splitter = waiting.popleft()
+        in_waiting.discard(splitter)
+        block, s = splitter
+
+        # Состояния, переходящие по символу s в блок splitter
+        touched = {}
+        for j in blocks[block]:
+            for i in inverse[s][j]:
+                touched.setdefault(block_of[i], set()).add(i)
+
+        for b, inside in touched.items():
+            if len(inside) == len(blocks[b]):
+                continue
+            # Блок b дробится: новые номера получают состояния из inside
+            blocks[b] -= inside
+            new = len(blocks)
+            blocks.append(inside)
+            for i in inside:
+                block_of[i] = new
+            for c in range(len(symbols)):
+                if (b, c) in in_waiting:
+                    pair = (new, c)
+                else:
+                    pair = (new, c) if len(inside) <= len(blocks[b]) else (b, c)
+                waiting.append(pair)
+                in_waiting.add(pair)
+
+    representative = {}
+    for i, state in enumerate(states):
+        representative.setdefault(block_of[i], state)
+    state_map = {state: representative[block_of[i]] for i, state in enumerate(states)}
+
+    minimal = {}
+    for i, state in enumerate(states):
+        if state_map[state] != state:
+            continue
+        minimal[state] = {symbol: (state_map[transitions[state][symbol][0]], transitions[state][symbol][1])
+                          for symbol in symbols}
+    return minimal, state_map
+
+
+def run_word(transitions, word, start="Qstart", final="Qfinal"):
+    """Прогон слова без печати: (принято ли, выходная последовательность)"""
+    state = start
+    output = []
+    for char in word:
+        row = transitions[state]
+        if char not in row:
+            return False, ''.join(output)
+        state, out = row[char]
+        output.append(out)
+    return state == final, ''.join(output)
+
+
+def test_minimize(max_length=7):
+    """Минимальный автомат ведёт себя как исходный на всех коротких словах"""
+    from itertools import product
+
+    from lab5 import MealyMachineGenerator
+
+    ok = True
+    for n, m, k in ((1, 1, 1), (2, 3, 1), (2, 3, 2), (2, 2, 3), (1, 2, 2)):
+        transitions = MealyMachineGenerator(n, m, k).generate_automaton()
+        minimal, state_map = minimize(transitions)
+        again, _ = minimize(minimal)
+        if len(again) != len(minimal) or set(state_map.values()) != set(minimal):
+            ok = False
+        for length in range(max_length + 1):
+            for letters in product(SYMBOLS, repeat=length):
+                word = ''.join(letters)
+                if run_word(transitions, word) != run_word(minimal, word):
+                    ok = False
+                    print(f"✗ n={n} m={m} k={k}: слово '{word}' обрабатывается по-разному")
+                    break
+        print(f"n={n}, m={m}, k={k}: состояний {len(transitions)} -> {len(minimal)}")
+
+    if ok:
+        print(f"✓ УСПЕХ! Минимальные автоматы эквивалентны исходным на словах длины до {max_length}")
+    return ok
+
+
+if __name__ == '__main__':
+    test_minimize()
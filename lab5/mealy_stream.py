@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Потоковый автомат Мили.
+
+MealyTransducer хранит текущее состояние между вызовами feed(chunk) и
+возвращает выходы только для этого куска, не накапливая вход. Перевод
+строки - граница слова: автомат возвращается в начальное состояние, в
+выход пишется перевод строки, так что построчный поток (журнал, сокет)
+даёт по строке выходов на слово - те же, что CompactMealy.run. После
+неверного символа или неопределённого перехода выходов до конца строки нет.
+
+serve() - асинхронный сервер (TCP или Unix-сокет): каждое соединение
+получает свой автомат, статистика по потоку - байты, куски, принятые
+слова, задержка обработки куска и пропускная способность.
+"""
+
+import asyncio
+import sys
+import time
+
+from mealy_table import INVALID, SYMBOL_IDS, CompactMealy
+
+NEWLINE = 0xFD
+IGNORED = 0xFC
+
+# Перекодировка байтов потока: символы, перевод строки, пробелы, прочее
+_ENCODE = bytearray([INVALID]) * 256
+for _symbol, _id in SYMBOL_IDS.items():
+    _ENCODE[ord(_symbol)] = _id
+_ENCODE[ord('\n')] = NEWLINE
+for _ch in ' \t\r':
+    _ENCODE[ord(_ch)] = IGNORED
+_ENCODE = bytes(_ENCODE)
+
+
+class MealyTransducer:
+    """Автомат Мили с состоянием между кусками входа"""
+
+    def __init__(self, table):
+        self.table = table if isinstance(table, CompactMealy) else CompactMealy.from_transitions(table)
+        self.state = self.table.start
+        self.words = 0
+        self.accepted = 0
+
+    def reset(self):
+        self.state = self.table.start
+
+    def feed(self, chunk):
+        """Выходы "0"/"1" для куска (bytes или str); перевод строки завершает слово"""
+        if isinstance(chunk, str):
+            chunk = chunk.encode('ascii', 'replace')
+        table = self.table
+        next_state, outputs, final, start = table.next_state, table.outputs, table.final, table.start
+        state = self.state
+        produced = bytearray()
+        for code in chunk.translate(_ENCODE):
+            if code < 4:
+                if state < 0:
+                    continue
+                index = (state << 2) | code
+                state = next_state[index]
+                if state >= 0:
+                    produced.append(48 + ((outputs[index >> 3] >> (index & 7)) & 1))
+            elif code == NEWLINE:
+                self.words += 1
+                self.accepted += state == final
+                state = start
+                produced.append(10)
+            elif code == INVALID:
+                state = -1
+        self.state = state
+        return bytes(produced)
+
+    @property
+    def in_final(self):
+        """Находится ли автомат сейчас в принимающем состоянии"""
+        return self.state == self.table.final
+
+
+class StreamStats:
+    """Счётчики одного потока"""
+
+    def __init__(self, name):
+        self.name = name
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.chunks = 0
+        self.words = 0
+        self.accepted = 0
+        self.latencies = []      # время обработки и отправки каждого куска, с
+        self.started = time.perf_counter()
+        self.finished = None
+
+    def throughput(self):
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        return self.bytes_in / elapsed if elapsed else 0.0
+
+    def __str__(self):
+        latencies = sorted(self.latencies)
+        median = latencies[len(latencies) // 2] if latencies else 0.0
+        worst = latencies[-1] if latencies else 0.0
+        return (f"{self.name}: вход {self.bytes_in} байт, кусков {self.chunks}, слов {self.words} "
+                f"(принято {self.accepted}), задержка куска медиана {median * 1e6:.0f} мкс, "
+                f"максимум {worst * 1e6:.0f} мкс, {self.throughput() / 2**20:.2f} МБ/с")
+
+
+async def handle_stream(reader, writer, table, stats, chunk_size=65536):
+    """Прогнать один поток через свой автомат, отвечая выходами на каждый кусок"""
+    transducer = MealyTransducer(table)
+    try:
+        while True:
+            chunk = await reader.read(chunk_size)
+            if not chunk:
+                break
+            received = time.perf_counter()
+            output = transducer.feed(chunk)
+            writer.write(output)
+            await writer.drain()
+            stats.latencies.append(time.perf_counter() - received)
+            stats.chunks += 1
+            stats.bytes_in += len(chunk)
+            stats.bytes_out += len(output)
+    finally:
+        stats.words, stats.accepted = transducer.words, transducer.accepted
+        stats.finished = time.perf_counter()
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+async def serve(table, host='127.0.0.1', port=0, path=None, chunk_size=65536):
+    """
+    Запустить сервер: TCP на host:port или Unix-сокет path.
+    Возвращает (сервер, список StreamStats всех соединений).
+    """
+    table = table if isinstance(table, CompactMealy) else CompactMealy.from_transitions(table)
+    streams = []
+
+    async def on_connect(reader, writer):
+        stats = StreamStats(f"поток {len(streams) + 1}")
+        streams.append(stats)
+        await handle_stream(reader, writer, table, stats, chunk_size)
+
+    if path is not None:
+        server = await asyncio.start_unix_server(on_connect, path=path)
+    else:
+        server = await asyncio.start_server(on_connect, host, port)
+    return server, streams
+
+
+async def _client(connect, pieces, pause=0.002):
+    """
+    Отправить поток кусками (параллельно с чтением ответа), вернуть весь ответ.
+    Пауза между кусками даёт серверу прочитать их по отдельности, так что
+    слова действительно разрезаются между чтениями.
+    """
+    reader, writer = await connect()
+
+    async def send():
+        for piece in pieces:
+            writer.write(piece)
+            await writer.drain()
+            await asyncio.sleep(pause)
+        writer.write_eof()
+
+    sender = asyncio.create_task(send())
+    received = await reader.read()
+    await sender
+    writer.close()
+    await writer.wait_closed()
+    return received
+
+
+async def _run_streams(table, words_per_stream, streams, unix_path=None):
+    import random
+
+    server, stats = await serve(table, path=unix_path)
+    if unix_path is not None:
+        connect = lambda: asyncio.open_unix_connection(unix_path)
+    else:
+        host, port = server.sockets[0].getsockname()[:2]
+        connect = lambda: asyncio.open_connection(host, port)
+
+    rng = random.Random(streams)
+    inputs = []
+    for _ in range(streams):
+        lines = []
+        for _ in range(words_per_stream):
+            if rng.random() < 0.5:
+                lines.append('xxdddxx' + 'axb')
+            else:
+                lines.append(''.join(rng.choice('xdabz ') for _ in range(rng.randint(0, 14))))
+        data = ('\n'.join(lines) + '\n').encode('ascii')
+        # Куски режут слова в произвольных местах
+        cuts = sorted(rng.sample(range(1, len(data)), min(50, len(data) - 1)))
+        inputs.append((lines, [data[i:j] for i, j in zip([0] + cuts, cuts + [len(data)])]))
+
+    async with server:
+        outputs = await asyncio.gather(*(_client(connect, pieces) for _, pieces in inputs))
+        server.close()
+        await server.wait_closed()
+    return inputs, outputs, stats
+
+
+def test_stream_transducer(streams=20, words_per_stream=500):
+    """Выходы потоков по TCP и Unix-сокету совпадают с CompactMealy.run построчно"""
+    import os
+    import tempfile
+
+    table = CompactMealy.from_parameters(2, 3, 3)
+    ok = True
+
+    # Куски любой длины, даже по одному байту, дают тот же выход
+    transducer = MealyTransducer(table)
+    text = "xxdddxxaxb\nxq\nddd"
+    if b''.join(transducer.feed(ch) for ch in text) != MealyTransducer(table).feed(text):
+        ok = False
+
+    with tempfile.TemporaryDirectory() as directory:
+        for unix_path in (None, os.path.join(directory, 'mealy.sock')):
+            inputs, outputs, stats = asyncio.run(_run_streams(table, words_per_stream, streams, unix_path))
+            for (lines, _), output in zip(inputs, outputs):
+                expected = ''.join(table.run(line.replace(' ', ''))[1] + '\n' for line in lines)
+                if output.decode('ascii') != expected:
+                    ok = False
+                    print(f"✗ Выход потока расходится ({'Unix-сокет' if unix_path else 'TCP'})")
+                    break
+            accepted = sum(s.accepted for s in stats)
+            expected_accepted = sum(table.run(line.replace(' ', ''))[0] for lines, _ in inputs for line in lines)
+            ok = ok and accepted == expected_accepted and len(stats) == streams
+            # Каждый поток пришёл несколькими кусками, то есть слова резались между чтениями
+            if any(s.chunks < 2 for s in stats):
+                ok = False
+                print(f"✗ Поток прочитан одним куском ({'Unix-сокет' if unix_path else 'TCP'})")
+            print(f"{'Unix-сокет' if unix_path else 'TCP'}: {stats[0]}")
+
+    if ok:
+        print(f"✓ УСПЕХ! {streams} одновременных потоков совпали с пословной проверкой")
+    return ok
+
+
+def main(argv=None):
+    """Без аргументов - тест; 'stdin' - поток со стандартного ввода; 'serve порт' - сервер"""
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        test_stream_transducer()
+        return
+
+    from mealy_bulk import parse_parameters
+    params = argv[2] if argv[0] == 'serve' and len(argv) > 2 else "n=2 m=3 k=3"
+    table = CompactMealy.from_parameters(*parse_parameters(params))
+
+    if argv[0] == 'stdin':
+        transducer = MealyTransducer(table)
+        stats = StreamStats("stdin")
+        while True:
+            chunk = sys.stdin.buffer.read1(65536)
+            if not chunk:
+                break
+            received = time.perf_counter()
+            output = transducer.feed(chunk)
+            sys.stdout.buffer.write(output)
+            stats.latencies.append(time.perf_counter() - received)
+            stats.bytes_in += len(chunk)
+            stats.chunks += 1
+        sys.stdout.buffer.flush()
+        stats.finished = time.perf_counter()
+        stats.words, stats.accepted = transducer.words, transducer.accepted
+        print(stats, file=sys.stderr)
+    elif argv[0] == 'serve':
+        async def run():
+            server, streams = await serve(table, port=int(argv[1]) if len(argv) > 1 else 8765)
+            print(f"Сервер слушает {server.sockets[0].getsockname()}", file=sys.stderr)
+            try:
+                async with server:
+                    await server.serve_forever()
+            finally:
+                for stats in streams:
+                    print(stats, file=sys.stderr)
+        try:
+            asyncio.run(run())
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Компактная таблица автомата Мили.
+
+Состояния - целые числа, символы x/d/a/b - номера 0..3. Следующее
+состояние для пары (состояние, символ) лежит в array('i') по индексу
+(состояние << 2) | символ, выход (0/1) - бит в упакованном bytearray
+с тем же индексом. Шаг проверки слова - одно обращение по индексу.
+
+Таблицу можно собрать из словаря MealyMachineGenerator (в том числе
+минимизированного) или сразу по n, m, k, не создавая словарь: при
+k = 10^5 это несколько мегабайт вместо сотен. Имена состояний для вывода
+в этом случае вычисляются по номеру, а не хранятся.
+"""
+
+import sys
+import time
+from array import array
+
+SYMBOLS = ('x', 'd', 'a', 'b')
+SYMBOL_IDS = {symbol: i for i, symbol in enumerate(SYMBOLS)}
+INVALID = 0xFF
+
+# Перекодировка байтов слова в номера символов (неизвестные - INVALID)
+_ENCODE = bytearray([INVALID]) * 256
+for _symbol, _id in SYMBOL_IDS.items():
+    _ENCODE[ord(_symbol)] = _id
+_ENCODE = bytes(_ENCODE)
+
+# Номера служебных состояний MealyMachineGenerator (порядок self.states)
+QSTART, SUFFIX_X, SUFFIX_B, QFINAL, QTRAP = range(5)
+FIXED_STATES = ("Qstart", "SuffixX", "SuffixB", "Qfinal", "Qtrap")
+
+
+class GeneratedNames:
+    """Имена состояний MealyMachineGenerator(n, m, k), вычисляемые по номеру"""
+
+    def __init__(self, n, m, k):
+        self.n, self.m, self.k = n, m, k
+
+    def __len__(self):
+        return len(FIXED_STATES) + self.k * (self.n + self.m)
+
+    def __getitem__(self, state):
+        if not 0 <= state < len(self):
+            raise IndexError(f"Нет состояния с номером {state}")
+        if state < len(FIXED_STATES):
+            return FIXED_STATES[state]
+        group, offset = divmod(state - len(FIXED_STATES), self.n + self.m)
+        if offset < self.n:
+            return f"ReadingX_{group}_{offset + 1}"
+        return f"ReadingD_{group}_{offset - self.n + 1}"
+
+    def index(self, name):
+        if name in FIXED_STATES:
+            return FIXED_STATES.index(name)
+        kind, group, position = name.split('_')
+        base = len(FIXED_STATES) + int(group) * (self.n + self.m) + int(position) - 1
+        return base if kind == "ReadingX" else base + self.n
+
+
+class CompactMealy:
+    """Автомат Мили в плоских массивах: next_state (array('i')) и биты выходов"""
+
+    def __init__(self, names, start, final, fill=QTRAP):
+        self.names = names
+        self.start = start
+        self.final = final
+        size = len(names) << 2
+        self.next_state = array('i', [fill]) * size   # -1: переход не определён
+        self.outputs = bytearray((size + 7) >> 3)
+
+    def _set(self, state, symbol, next_state, output):
+        index = (state << 2) | symbol
+        self.next_state[index] = next_state
+        if output:
+            self.outputs[index >> 3] |= 1 << (index & 7)
+        else:
+            self.outputs[index >> 3] &= ~(1 << (index & 7)) & 0xFF
+
+    @classmethod
+    def from_transitions(cls, transitions, start="Qstart", final="Qfinal"):
+        """Собрать из словаря состояние -> символ -> (следующее, "0"/"1")"""
+        names = list(transitions)
+        ids = {name: i for i, name in enumerate(names)}
+        table = cls(names, ids[start], ids.get(final, -1), fill=-1)
+        for name, row in transitions.items():
+            for symbol, (next_state, output) in row.items():
+                table._set(ids[name], SYMBOL_IDS[symbol], ids[next_state], output == "1")
+        return table
+
+    @classmethod
+    def from_parameters(cls, n, m, k):
+        """Та же таблица, что MealyMachineGenerator(n, m, k), без словаря"""
+        table = cls(GeneratedNames(n, m, k), QSTART, QFINAL)
+        x, d, a, b = range(4)
+        width = n + m
+        first = len(FIXED_STATES)
+
+        table._set(QSTART, x, first, False)
+        table._set(QSTART, d, first + n, False)
+        table._set(SUFFIX_X, x, SUFFIX_B, False)
+        table._set(SUFFIX_B, b, QFINAL, True)
+
+        for group in range(k):
+            base = first + group * width
+            for i in range(n - 1):
+                table._set(base + i, x, base + i + 1, False)
+            for j in range(m - 1):
+                table._set(base + n + j, d, base + n + j + 1, False)
+            # Конец x-группы и конец d-группы: следующая группа или суффикс
+            for last in (base + n - 1, base + width - 1):
+                if group < k - 1:
+                    table._set(last, x, base + width, False)
+                    table._set(last, d, base + width + n, False)
+                else:
+                    table._set(last, a, SUFFIX_X, False)
+        return table
+
+    def __len__(self):
+        return len(self.names)
+
+    def nbytes(self):
+        """Память под массивы переходов и выходов"""
+        return self.next_state.itemsize * len(self.next_state) + len(self.outputs)
+
+    def output(self, index):
+        return (self.outputs[index >> 3] >> (index & 7)) & 1
+
+    def run(self, word):
+        """(принято ли, выходная последовательность "0"/"1") без печати"""
+        codes = word.encode('ascii', 'replace').translate(_ENCODE) if isinstance(word, str) else word
+        next_state, outputs = self.next_state, self.outputs
+        state = self.start
+        produced = bytearray()
+        for code in codes:
+            if code == INVALID:
+                return False, produced.decode('ascii')
+            index = (state << 2) | code
+            state = next_state[index]
+            if state < 0:
+                return False, produced.decode('ascii')
+            produced.append(48 + ((outputs[index >> 3] >> (index & 7)) & 1))
+        return state == self.final, produced.decode('ascii')
+
+    def path(self, word):
+        """Имена состояний на пути слова (для вывода, как в validate_word)"""
+        state = self.start
+        states = [self.names[state]]
+        for char in word:
+            if char not in SYMBOL_IDS or state < 0:
+                break
+            state = self.next_state[(state << 2) | SYMBOL_IDS[char]]
+            if state < 0:
+                break
+            states.append(self.names[state])
+        return states
+
+    def to_transitions(self):
+        """Обратно в словарь формата MealyMachineGenerator"""
+        transitions = {}
+        for state in range(len(self.names)):
+            row = {}
+            for symbol, symbol_id in SYMBOL_IDS.items():
+                index = (state << 2) | symbol_id
+                if self.next_state[index] >= 0:
+                    row[symbol] = (self.names[self.next_state[index]], str(self.output(index)))
+            transitions[self.names[state]] = row
+        return transitions
+
+
+def test_compact_table(max_length=7):
+    """Компактные таблицы совпадают со словарём MealyMachineGenerator"""
+    from itertools import product
+
+    from lab5 import MealyMachineGenerator
+    from mealy_minimize import minimize, run_word
+
+    ok = True
+    for n, m, k in ((1, 1, 1), (2, 3, 1), (2, 3, 3), (3, 1, 2)):
+        transitions = MealyMachineGenerator(n, m, k).generate_automaton()
+        direct = CompactMealy.from_parameters(n, m, k)
+        tables = (direct, CompactMealy.from_transitions(transitions),
+                  CompactMealy.from_transitions(minimize(transitions)[0]))
+        if direct.to_transitions() != transitions:
+            ok = False
+            print(f"✗ n={n} m={m} k={k}: таблица по параметрам отличается от словаря")
+        if any(direct.names.index(direct.names[i]) != i for i in range(len(direct))):
+            ok = False
+        for length in range(max_length + 1):
+            for letters in product(SYMBOLS, repeat=length):
+                word = ''.join(letters)
+                expected = run_word(transitions, word)
+                if any(table.run(word) != expected for table in tables):
+                    ok = False
+                    print(f"✗ n={n} m={m} k={k}: слово '{word}' обрабатывается по-разному")
+                    break
+
+    if ok:
+        print(f"✓ УСПЕХ! Компактные таблицы совпадают со словарём на словах длины до {max_length}")
+    return ok
+
+
+def measure(n, m, k):
+    """Память и время сборки компактной таблицы и проверки длинного слова"""
+    started = time.perf_counter()
+    table = CompactMealy.from_parameters(n, m, k)
+    built = time.perf_counter() - started
+
+    word = ('x' * n + 'd' * m) * (k // 2) + 'x' * n * (k % 2) + 'axb'
+    started = time.perf_counter()
+    accepted, output = table.run(word)
+    elapsed = time.perf_counter() - started
+
+    print(f"n={n}, m={m}, k={k}: состояний {len(table)}, массивы {table.nbytes() / 2**20:.1f} МБ, "
+          f"сборка {built:.2f} с")
+    print(f"Слово длины {len(word)}: {'ПРИНЯТО' if accepted else 'ОТВЕРГНУТО'}, "
+          f"{len(word) / elapsed:,.0f} символов/с")
+
+
+if __name__ == '__main__':
+    test_compact_table()
+    if len(sys.argv) > 3:
+        measure(int(sys.argv[1]), int(sys.argv[2]), int(sys.argv[3]))
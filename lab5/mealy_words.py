@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+"""
+Подсчёт, равномерная выборка и перечисление принимаемых слов автомата.
+
+Динамика по путям: count[r][q] - число слов длины r, которые из состояния q
+приводят в принимающее состояние. По ней известно точное число принимаемых
+слов каждой длины, случайное слово длины L выбирается равномерно за O(L)
+(символ - с вероятностью, пропорциональной числу продолжений), а слова
+перечисляются в лексикографическом порядке без тупиковых ветвей. Почти
+верные отвергаемые слова получаются одной правкой принимаемого слова.
+Счётчики - целые Python (точные при любой длине), векторизованы NumPy.
+Если все счётчики точно представимы в double (меньше 2^53), поток
+выборки идёт пачками: все слова пачки продвигаются по таблице
+накопленных весов одновременно, символ выбирается по равномерному
+числу с плавающей точкой (смещение порядка счётчик / 2^53).
+
+    python mealy_words.py --params "n=2 m=3 k=3" --sample 1000000 --output words.txt
+"""
+
+import argparse
+import itertools
+import random
+import sys
+import time
+from bisect import bisect_right
+
+import numpy as np
+
+from mealy_table import SYMBOLS, SYMBOL_IDS, CompactMealy
+
+# Порядок перебора символов - алфавитный
+ORDER = tuple(sorted(SYMBOLS))
+_ORDER_BYTES = np.frombuffer(''.join(ORDER).encode('ascii'), dtype=np.uint8)
+# Счётчики меньше этой границы точно представимы в double - для выборки пачками
+_FLOAT_LIMIT = 1 << 53
+
+
+class WordCounter:
+    """Число путей в принимающее состояние по (состояние, оставшаяся длина)"""
+
+    def __init__(self, table, max_length):
+        self.table = table
+        self.max_length = max_length
+        states = len(table)
+        next_state = np.frombuffer(table.next_state, dtype=np.int32).reshape(states, 4)
+        # Только символы в алфавитном порядке: столбец i - символ ORDER[i]
+        self.next_state = next_state[:, [SYMBOL_IDS[symbol] for symbol in ORDER]]
+
+        final = np.zeros(states, dtype=object)
+        if table.final >= 0:
+            final[table.final] = 1
+        self.counts = [final]
+        targets = np.where(self.next_state >= 0, self.next_state, 0)
+        defined = self.next_state >= 0
+        for _ in range(max_length):
+            previous = self.counts[-1]
+            self.counts.append(np.where(defined, previous[targets], 0).sum(axis=1))
+        self._nodes = {}
+        self._weights = {}
+        self._cumulative = None
+
+    def count(self, length, state=None):
+        """Число принимаемых слов длины length (из начального состояния)"""
+        self._check(length)
+        return int(self.counts[length][self.table.start if state is None else state])
+
+    def counts_by_length(self):
+        return [int(counts[self.table.start]) for counts in self.counts]
+
+    def _check(self, length):
+        if not 0 <= length <= self.max_length:
+            raise ValueError(f"Длина {length} вне подсчитанного диапазона 0..{self.max_length}")
+
+    def _options(self, state, remaining):
+        """[(символ, следующее состояние, число продолжений)] с ненулевым числом"""
+        counts = self.counts[remaining - 1]
+        options = []
+        for i, symbol in enumerate(ORDER):
+            target = int(self.next_state[state, i])
+            if target >= 0 and counts[target]:
+                options.append((symbol, target, int(counts[target])))
+        return options
+
+    def _node(self, state, remaining):
+        """
+        Узел ветвления для (состояние, длина): вынужденная цепочка символов
+        до первой развилки, затем (развилка: состояние, длина, пороги, варианты).
+        Кешируется, поэтому выборка идёт от развилки к развилке.
+        """
+        key = (state, remaining)
+        node = self._nodes.get(key)
+        if node is not None:
+            return node
+        forced = []
+        options = self._options(state, remaining) if remaining else []
+        while len(options) == 1:
+            symbol, state, _ = options[0]
+            forced.append(symbol)
+            remaining -= 1
+            options = self._options(state, remaining) if remaining else []
+        thresholds, total = [], 0
+        for _, _, count in options:
+            total += count
+            thresholds.append(total)
+        node = (''.join(forced), remaining, thresholds, [(symbol, target) for symbol, target, _ in options])
+        self._nodes[key] = node
+        return node
+
+    def sample(self, length, rng=random):
+        """Равномерно случайное принимаемое слово длины length или None"""
+        self._check(length)
+        state = self.table.start
+        if not self.counts[length][state]:
+            return None
+        parts = []
+        remaining = length
+        while True:
+            forced, remaining, thresholds, options = self._node(state, remaining)
+            parts.append(forced)
+            if not remaining:
+                return ''.join(parts)
+            symbol, state = options[bisect_right(thresholds, rng.randrange(thresholds[-1]))]
+            parts.append(symbol)
+            remaining -= 1
+
+    def sample_any(self, rng=random, lengths=None):
+        """Равномерно случайное слово среди всех принимаемых слов длины из lengths"""
+        lengths = tuple(range(self.max_length + 1) if lengths is None else lengths)
+        weights = self._weights.get(lengths)
+        if weights is None:
+            weights = self._weights[lengths] = list(itertools.accumulate(self.count(length) for length in lengths))
+        if not weights or not weights[-1]:
+            return None
+        return self.sample(lengths[bisect_right(weights, rng.randrange(weights[-1]))], rng)
+
+    def _batch_tables(self):
+        """
+        Накопленные веса символов в float64: строка remaining * состояний + state,
+        столбец - символ ORDER; None, если какой-то счётчик не меньше 2^53.
+        """
+        if self._cumulative is None:
+            largest = max(int(counts.max()) for counts in self.counts)
+            if largest >= _FLOAT_LIMIT or sum(self.counts_by_length()) >= _FLOAT_LIMIT:
+                self._cumulative = False
+            else:
+                counts = self._counts64 = np.array([counts.astype(np.int64) for counts in self.counts])
+                targets = np.where(self.next_state >= 0, self.next_state, 0)
+                weights = np.where(self.next_state >= 0, counts[:-1][:, targets], 0)
+                # Строка (оставшаяся длина * число состояний + состояние): один индекс на слово
+                cumulative = np.concatenate([np.zeros((1,) + targets.shape, dtype=np.int64),
+                                             np.cumsum(weights, axis=2)])
+                self._cumulative = cumulative.reshape(-1, targets.shape[1]).astype(np.float64)
+        return self._cumulative if self._cumulative is not False else None
+
+    def sample_batch(self, size, generator, lengths=None):
+        """
+        Пачка из size равномерно случайных принимаемых слов (как sample_any),
+        generator - numpy.random.Generator. Возвращает (матрица номеров
+        символов ORDER, длины слов, матрица состояний на пути) или None,
+        если принимаемых слов нет. Нужны таблицы _batch_tables.
+        """
+        cumulative = self._batch_tables()
+        lengths = np.array(range(self.max_length + 1) if lengths is None else lengths, dtype=np.int64)
+        weights = np.cumsum([self.count(length) for length in lengths])
+        if not len(weights) or not weights[-1]:
+            return None
+        # Длинные слова первыми: слова, которые ещё читаются, - всегда начало пачки
+        word_lengths = np.sort(lengths[np.searchsorted(weights, generator.integers(0, weights[-1], size),
+                                                       side='right')])[::-1]
+        width = int(word_lengths[0])
+        active = size - np.searchsorted(word_lengths[::-1], np.arange(width), side='right')
+
+        states_count = len(self.table)
+        next_state = self.next_state.ravel()
+        codes = np.zeros((size, width), dtype=np.uint8)
+        states = np.full((size, width + 1), -1, dtype=np.int32)
+        state = np.full(size, self.table.start, dtype=np.int64)
+        states[:, 0] = state
+        row_base = word_lengths * states_count
+        for column in range(width):
+            count = active[column]
+            current = state[:count]
+            thresholds = cumulative[row_base[:count] - column * states_count + current]
+            totals = thresholds[:, 3]
+            draws = np.minimum(np.floor(generator.random(count) * totals), totals - 1)
+            symbols = ((draws >= thresholds[:, 0]).astype(np.int64) + (draws >= thresholds[:, 1])
+                       + (draws >= thresholds[:, 2]))
+            current[:] = next_state[(current << 2) | symbols]
+            codes[:count, column] = symbols
+            states[:count, column + 1] = current
+        # Порядок слов в пачке снова случайный
+        order = generator.permutation(size)
+        return codes[order], word_lengths[order], states[order]
+
+    @staticmethod
+    def _render(codes, word_lengths):
+        """Слова пачки строками"""
+        count, width = codes.shape
+        text = np.full((count, width + 1), ord('\n'), dtype=np.uint8)
+        text[:, :width] = _ORDER_BYTES[codes]
+        text[np.arange(count), word_lengths] = ord('\n')
+        keep = np.arange(width + 1) <= word_lengths[:, None]
+        return text[keep].tobytes().decode('ascii').split('\n')[:-1]
+
+    def samples(self, rng=random, lengths=None, batch_size=16384):
+        """
+        Бесконечный поток равномерно случайных принимаемых слов (как
+        sample_any): пачками, если счётчики меньше 2^53, иначе по слову.
+        """
+        if self._batch_tables() is None:
+            while True:
+                word = self.sample_any(rng, lengths)
+                if word is None:
+                    return
+                yield word
+        generator = np.random.default_rng(rng.getrandbits(64))
+        while True:
+            batch = self.sample_batch(batch_size, generator, lengths)
+            if batch is None:
+                return
+            yield from self._render(batch[0], batch[1])
+
+    def enumerate(self, length):
+        """Все принимаемые слова длины length в лексикографическом порядке"""
+        self._check(length)
+        if not self.counts[length][self.table.start]:
+            return
+        prefix = []
+        # Стек: (длина префикса до узла, итератор по вариантам развилки)
+        stack = []
+
+        def enter(state, remaining):
+            forced, remaining, _, options = self._node(state, remaining)
+            stack.append((len(prefix), remaining, iter(options)))
+            prefix.append(forced)
+            return remaining
+
+        if not enter(self.table.start, length):
+            yield ''.join(prefix)
+            return
+        while stack:
+            size, remaining, options = stack[-1]
+            option = next(options, None)
+            if option is None:
+                stack.pop()
+                del prefix[size:]
+                continue
+            del prefix[size + 1:]
+            symbol, target = option
+            prefix.append(symbol)
+            if not enter(target, remaining - 1):
+                yield ''.join(prefix)
+                stack.pop()
+                del prefix[-1]
+
+    def near_misses(self, rng=random, lengths=None, batch_size=16384):
+        """
+        Бесконечный поток отвергаемых слов, отличающихся от принимаемого одной
+        правкой: замена, вставка или удаление символа.
+        """
+        if self._batch_tables() is not None:
+            yield from self._near_misses_batched(rng, lengths, batch_size)
+            return
+        while True:
+            word = self.sample_any(rng, lengths)
+            if word is None:
+                return
+            position = rng.randrange(len(word) + 1)
+            edit = rng.randrange(3)
+            if edit == 0 and position < len(word):
+                candidate = word[:position] + rng.choice(ORDER) + word[position + 1:]
+            elif edit == 1:
+                candidate = word[:position] + rng.choice(ORDER) + word[position:]
+            else:
+                candidate = word[:position] + word[position + 1:]
+            if not self.table.run(candidate)[0]:
+                yield candidate
+
+    def _near_misses_batched(self, rng, lengths, batch_size):
+        """
+        Почти верные слова пачками. Правка проверяется от своей позиции: путь
+        правленого слова идёт рядом с путём исходного, пока не сойдётся с ним
+        (остаток тот же - слово принято) или не попадёт в состояние без
+        продолжений нужной длины (отвергнуто). Обычно это несколько символов.
+        """
+        generator = np.random.default_rng(rng.getrandbits(64))
+        next_state = self.next_state.ravel()
+        counts = self._counts64
+        while True:
+            batch = self.sample_batch(batch_size, generator, lengths)
+            if batch is None:
+                return
+            codes, word_lengths, states = batch
+            rows = np.arange(batch_size)
+            positions = (generator.random(batch_size) * (word_lengths + 1)).astype(np.int64)
+            edits = generator.integers(0, 3, batch_size)
+            symbols = generator.integers(0, len(ORDER), batch_size)
+            inside = positions < word_lengths
+            at = np.minimum(positions, np.maximum(word_lengths - 1, 0))
+            original = codes[rows, at] if codes.shape[1] else np.zeros(batch_size, dtype=np.uint8)
+            # Замена - только на другой символ; замена и удаление за концом слова - не правка
+            edits[(edits == 0) & ~inside] = 2
+            valid = inside | (edits == 1)
+            valid &= ~((edits == 0) & (symbols == original))
+
+            # Состояние перед символом position_after исходного слова
+            before = states[rows, positions]
+            inserted = next_state[(before.astype(np.int64) << 2) | symbols]
+            state = np.where(edits == 2, before, inserted).astype(np.int64)
+            position = positions + (edits != 1)
+
+            rejected = np.zeros(batch_size, dtype=bool)
+            pending = np.nonzero(valid)[0]
+            while len(pending):
+                current, where, length = state[pending], position[pending], word_lengths[pending]
+                dead = current < 0
+                dead[~dead] = counts[length[~dead] - where[~dead], current[~dead]] == 0
+                rejected[pending[dead]] = True
+                joined = ~dead & ((where == length) | (states[pending, where] == current))
+                pending = pending[~dead & ~joined]
+                where = position[pending]
+                state[pending] = next_state[(state[pending] << 2) | codes[pending, where]]
+                position[pending] += 1
+
+            words = self._render(codes, word_lengths)
+            for row in np.nonzero(rejected)[0].tolist():
+                word, at = words[row], int(positions[row])
+                edit = edits[row]
+                if edit == 0:
+                    yield word[:at] + ORDER[symbols[row]] + word[at + 1:]
+                elif edit == 1:
+                    yield word[:at] + ORDER[symbols[row]] + word[at:]
+                else:
+                    yield word[:at] + word[at + 1:]
+
+
+def test_word_counter(max_length=9):
+    """Счётчики, перечисление и выборка сверяются с полным перебором слов"""
+    from collections import Counter
+
+    from lab5 import MealyMachineGenerator
+    from mealy_minimize import minimize
+
+    ok = True
+    rng = random.Random(2)
+    for n, m, k in ((1, 1, 1), (2, 3, 1), (2, 3, 2), (1, 2, 3)):
+        tables = (CompactMealy.from_parameters(n, m, k),
+                  CompactMealy.from_transitions(minimize(MealyMachineGenerator(n, m, k).generate_automaton())[0]))
+        for table in tables:
+            counter = WordCounter(table, max_length)
+            for length in range(max_length + 1):
+                accepted = [''.join(letters) for letters in itertools.product(ORDER, repeat=length)
+                            if table.run(''.join(letters))[0]]
+                if counter.count(length) != len(accepted) or list(counter.enumerate(length)) != accepted:
+                    ok = False
+                    print(f"✗ n={n} m={m} k={k}: длина {length} - счётчик или перечисление неверны")
+
+        # Равномерность: частоты всех слов одной длины близки
+        length = max(n, m) * k + 3
+        total = counter.count(length)
+        if total:
+            for draws in (Counter(counter.sample(length, rng) for _ in range(total * 400)),
+                          Counter(itertools.islice(counter.samples(rng, [length], batch_size=999), total * 400))):
+                if set(draws) != set(counter.enumerate(length)) or min(draws.values()) < 300:
+                    ok = False
+                    print(f"✗ n={n} m={m} k={k}: выборка неравномерна {dict(draws)}")
+        # Пачками и по слову (с проверкой правки целым прогоном)
+        counter._cumulative = False
+        misses = list(itertools.islice(counter.near_misses(rng), 200))
+        counter._cumulative = None
+        misses += list(itertools.islice(counter.near_misses(rng, batch_size=500), 5000))
+        if any(table.run(word)[0] for word in misses) or len(misses) != 5200:
+            ok = False
+
+    if ok:
+        print(f"✓ УСПЕХ! Подсчёт, перечисление и выборка совпали с перебором до длины {max_length}")
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Принимаемые слова автомата: число, выборка, перечисление")
+    parser.add_argument('--params', default=None, help="параметры 'n=2 m=3 k=3' (по умолчанию - тест)")
+    parser.add_argument('--max-length', type=int, default=None,
+                        help="наибольшая длина слова (по умолчанию - длина самых длинных принимаемых)")
+    parser.add_argument('--length', type=int, default=None, help="только слова этой длины")
+    parser.add_argument('--sample', type=int, default=0, help="число случайных принимаемых слов")
+    parser.add_argument('--enumerate', type=int, default=0, help="число первых слов в лексикографическом порядке")
+    parser.add_argument('--near-miss', type=int, default=0, help="число почти верных отвергаемых слов")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--output', default=None, help="файл для слов (по умолчанию - стандартный вывод)")
+    args = parser.parse_args(argv)
+
+    if args.params is None:
+        test_word_counter()
+        return
+
+    from mealy_bulk import parse_parameters
+    n, m, k = parse_parameters(args.params)
+    max_length = args.max_length if args.max_length is not None else max(n, m) * k + 3
+    started = time.perf_counter()
+    counter = WordCounter(CompactMealy.from_parameters(n, m, k), max_length)
+    print(f"Счётчики до длины {max_length}: {time.perf_counter() - started:.2f} с", file=sys.stderr)
+    for length, count in enumerate(counter.counts_by_length()):
+        if count:
+            print(f"Длина {length}: принимаемых слов {count}", file=sys.stderr)
+
+    rng = random.Random(args.seed)
+    lengths = None if args.length is None else [args.length]
+    target = sys.stdout if args.output is None else open(args.output, 'w', encoding='utf-8')
+    started = time.perf_counter()
+    written = 0
+    try:
+        sources = []
+        if args.enumerate:
+            enumerated = (word for length in (lengths or range(max_length + 1))
+                          for word in counter.enumerate(length))
+            sources.append(itertools.islice(enumerated, args.enumerate))
+        if args.sample:
+            sources.append(itertools.islice(counter.samples(rng, lengths), args.sample))
+        if args.near_miss:
+            sources.append(itertools.islice(counter.near_misses(rng, lengths), args.near_miss))
+        for source in sources:
+            for chunk in iter(lambda: list(itertools.islice(source, 65536)), []):
+                words = [word for word in chunk if word is not None]
+                if words:
+                    target.write('\n'.join(words) + '\n')
+                written += len(words)
+    finally:
+        if target is not sys.stdout:
+            target.close()
+    elapsed = time.perf_counter() - started
+    print(f"Записано слов: {written}, {written / elapsed if elapsed else 0:,.0f} слов/с", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+"""
+Компилятор регулярных выражений в автомат Мили.
+
+Метод из лабораторной работы №4: выражение разбирается, по нему строится
+автомат позиций Глушкова (без ε-переходов), детерминизируется построением
+подмножеств, минимизируется (mealy_minimize) и выдаётся таблицей в формате
+MealyMachineGenerator: состояние -> символ -> (следующее состояние, выход).
+Выход "1" - на переходе в принимающее состояние, иначе "0".
+
+Синтаксис: символы алфавита, (), |, постфиксные *, +, ?, {i}, {i,j}, {i,},
+а также запись лабораторной: <...> вокруг подвыражения - просто группа,
+(A|B)<p|q> - альтернатива i повторена счётчик_i раз, счётчик или имя
+параметра сразу после подвыражения - повторение. Параметры (однобуквенные
+имена, например n, m, k) берутся из params и не считаются символами:
+
+    (x|d)<n|m>k(<a>x<b>)   при n=2, m=3, k=3   ==  (xx|ddd){3}axb
+
+Скомпилированные автоматы кешируются на диске по (выражение, параметры).
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import pickle
+from collections import deque
+
+from mealy_minimize import SYMBOLS, minimize
+
+CACHE_VERSION = 2
+CACHE_DIR_NAME = '.regex_cache'
+LAB_EXPRESSION = "(x|d)<n|m>k(<a>x<b>)"
+
+
+class RegexParser:
+    """Разбор выражения в дерево: ('sym', c), ('eps',), ('cat', [...]), ('alt', [...]),
+    ('star', e), ('repeat', e, min, max или None)"""
+
+    def __init__(self, expression, params):
+        self.text = ''.join(expression.split())
+        self.params = params
+        self.pos = 0
+
+    def error(self, message):
+        raise ValueError(f"{message} (позиция {self.pos} в '{self.text}')")
+
+    def peek(self):
+        return self.text[self.pos] if self.pos < len(self.text) else None
+
+    def parse(self):
+        if not self.text:
+            return ('eps',)
+        tree = self.alternation()
+        if self.pos != len(self.text):
+            self.error(f"Лишний символ '{self.peek()}'")
+        return tree
+
+    def alternation(self):
+        branches = [self.concatenation()]
+        while self.peek() == '|':
+            self.pos += 1
+            branches.append(self.concatenation())
+        return branches[0] if len(branches) == 1 else ('alt', branches)
+
+    def concatenation(self):
+        items = []
+        while self.peek() is not None and self.peek() not in '|)>':
+            items.append(self.postfix())
+        if not items:
+            return ('eps',)
+        return items[0] if len(items) == 1 else ('cat', items)
+
+    def postfix(self):
+        tree = self.atom()
+        while True:
+            ch = self.peek()
+            if ch == '*':
+                self.pos += 1
+                tree = ('star', tree)
+            elif ch == '+':
+                self.pos += 1
+                tree = ('repeat', tree, 1, None)
+            elif ch == '?':
+                self.pos += 1
+                tree = ('repeat', tree, 0, 1)
+            elif ch == '{':
+                tree = self.braces(tree)
+            elif ch == '<' and self.counts_ahead():
+                tree = self.counted_alternatives(tree)
+            elif ch is not None and (ch.isdigit() or ch in self.params):
+                count = self.count()
+                tree = ('repeat', tree, count, count)
+            else:
+                return tree
+
+    def atom(self):
+        ch = self.peek()
+        if ch in ('(', '<'):
+            closing = ')' if ch == '(' else '>'
+            self.pos += 1
+            tree = self.alternation()
+            if self.peek() != closing:
+                self.error(f"Ожидалась '{closing}'")
+            self.pos += 1
+            return tree
+        if ch is None or ch in '|)>*+?{}' or ch.isdigit() or ch in self.params:
+            self.error(f"Неожиданный символ '{ch}'" if ch else "Неожиданный конец выражения")
+        self.pos += 1
+        return ('sym', ch)
+
+    def count(self):
+        ch = self.peek()
+        if ch is not None and ch in self.params:
+            self.pos += 1
+            value = self.params[ch]
+        else:
+            start = self.pos
+            while self.peek() is not None and self.peek().isdigit():
+                self.pos += 1
+            if start == self.pos:
+                self.error("Ожидалось число или имя параметра")
+            value = int(self.text[start:self.pos])
+        if value < 0:
+            self.error("Число повторений не может быть отрицательным")
+        return value
+
+    def counts_ahead(self):
+        """<...> - список счётчиков (а не группа), если внутри только числа и параметры"""
+        end = self.text.find('>', self.pos)
+        if end < 0:
+            return False
+        parts = self.text[self.pos + 1:end].split('|')
+        return all(part.isdigit() or (len(part) == 1 and part in self.params) for part in parts)
+
+    def counted_alternatives(self, tree):
+        self.pos += 1
+        counts = [self.count()]
+        while self.peek() == '|':
+            self.pos += 1
+            counts.append(self.count())
+        self.pos += 1   # '>'
+        if len(counts) == 1:
+            return ('repeat', tree, counts[0], counts[0])
+        if tree[0] != 'alt' or len(tree[1]) != len(counts):
+            self.error(f"Счётчиков {len(counts)}, а альтернатив в группе "
+                       f"{len(tree[1]) if tree[0] == 'alt' else 1}")
+        return ('alt', [('repeat', branch, count, count) for branch, count in zip(tree[1], counts)])
+
+    def braces(self, tree):
+        self.pos += 1
+        low = self.count()
+        high = low
+        if self.peek() == ',':
+            self.pos += 1
+            high = None if self.peek() == '}' else self.count()
+        if self.peek() != '}':
+            self.error("Ожидалась '}'")
+        self.pos += 1
+        if high is not None and high < low:
+            self.error("Верхняя граница повторений меньше нижней")
+        return ('repeat', tree, low, high)
+
+
+class _Positions:
+    """Автомат позиций Глушкова: символ каждой позиции и множества follow"""
+
+    def __init__(self):
+        self.symbols = [None]        # позиция 0 - начальная
+        self.follow = [set()]
+
+    def new(self, symbol):
+        self.symbols.append(symbol)
+        self.follow.append(set())
+        return len(self.symbols) - 1
+
+    def build(self, tree):
+        """(допускает ли пустое слово, first, last) поддерева; повторения раскрываются"""
+        kind = tree[0]
+        if kind == 'sym':
+            p = self.new(tree[1])
+            return False, {p}, {p}
+        if kind == 'eps':
+            return True, set(), set()
+        if kind == 'alt':
+            nullable, first, last = False, set(), set()
+            for branch in tree[1]:
+                n, f, l = self.build(branch)
+                nullable, first, last = nullable or n, first | f, last | l
+            return nullable, first, last
+        if kind == 'star':
+            _, first, last = self.build(tree[1])
+            for p in last:
+                self.follow[p] |= first
+            return True, first, last
+        if kind == 'cat':
+            return self.concatenate(self.build(item) for item in tree[1])
+        # repeat: min обязательных копий, затем (max - min) необязательных или звезда
+        _, sub, low, high = tree
+        parts = [self.build(sub) for _ in range(low)]
+        if high is None:
+            parts.append(self.build(('star', sub)))
+        else:
+            parts.extend(self.build(('alt', [sub, ('eps',)])) for _ in range(high - low))
+        return self.concatenate(parts)
+
+    def concatenate(self, parts):
+        nullable, first, last = True, set(), set()
+        for n, f, l in parts:
+            for p in last:
+                self.follow[p] |= f
+            first = first | f if nullable else first
+            last = l | last if n else l
+            nullable = nullable and n
+        return nullable, first, last
+
+
+class RegexAutomaton:
+    """Минимальный автомат Мили выражения: таблица, принимающие состояния, алфавит"""
+
+    def __init__(self, expression, params, transitions, finals, alphabet):
+        self.expression = expression
+        self.params = params
+        self.transitions = transitions
+        self.finals = finals
+        self.alphabet = alphabet
+
+    def to_dict(self):
+        """Словарь из встроенных типов: кеш не зависит от того, как запущен модуль"""
+        return {'expression': self.expression, 'params': self.params, 'transitions': self.transitions,
+                'finals': self.finals, 'alphabet': self.alphabet}
+
+    def run(self, word):
+        """(принято ли, выходная последовательность) без печати"""
+        state = "Qstart"
+        output = []
+        for char in word:
+            if char not in self.alphabet:
+                return False, ''.join(output)
+            state, out = self.transitions[state][char]
+            output.append(out)
+        return state in self.finals, ''.join(output)
+
+
+def compile_regex(expression, params=None):
+    """Скомпилировать выражение в минимальный автомат Мили (без кеша)"""
+    params = dict(params or {})
+    tree = RegexParser(expression, params).parse()
+
+    positions = _Positions()
+    nullable, first, last = positions.build(tree)
+    positions.follow[0] = first
+    accepting_positions = set(last) | ({0} if nullable else set())
+
+    used = set(positions.symbols[1:])
+    alphabet = SYMBOLS if used <= set(SYMBOLS) else tuple(sorted(used))
+
+    # Переходы позиций по символам: позиция -> символ -> множество позиций
+    moves = []
+    for follow in positions.follow:
+        by_symbol = {}
+        for q in follow:
+            by_symbol.setdefault(positions.symbols[q], set()).add(q)
+        moves.append(by_symbol)
+
+    # Построение подмножеств; пустое множество - ловушка
+    start = frozenset({0})
+    ids = {start: 0}
+    order = [start]
+    queue = deque([start])
+    rows = []
+    while queue:
+        subset = queue.popleft()
+        row = {}
+        for symbol in alphabet:
+            target = frozenset(q for p in subset for q in moves[p].get(symbol, ()))
+            if target not in ids:
+                ids[target] = len(order)
+                order.append(target)
+                queue.append(target)
+            row[symbol] = ids[target]
+        rows.append(row)
+
+    accepting = [bool(subset & accepting_positions) for subset in order]
+    table = {f"D{i}": {symbol: (f"D{j}", "1" if accepting[j] else "0") for symbol, j in row.items()}
+             for i, row in enumerate(rows)}
+    finals = {f"D{i}" for i, flag in enumerate(accepting) if flag}
+    minimal, _ = minimize(table, start="D0", finals=finals, symbols=alphabet)
+    return _rename(expression, params, minimal, finals, alphabet)
+
+
+def _rename(expression, params, minimal, finals, alphabet):
+    """Имена как у MealyMachineGenerator: Qstart, Qfinal, Qtrap, остальные S1, S2, ..."""
+    names = {}
+    finals_found = 0
+    others = 0
+    queue = deque(["D0"])
+    seen = {"D0"}
+    while queue:
+        state = queue.popleft()
+        row = minimal[state]
+        dead = state not in finals and all(row[s] == (state, "0") for s in alphabet)
+        if state == "D0":
+            names[state] = "Qstart"
+        elif state in finals:
+            finals_found += 1
+            names[state] = "Qfinal" if finals_found == 1 else f"Qfinal_{finals_found}"
+        elif dead:
+            names[state] = "Qtrap"
+        else:
+            others += 1
+            names[state] = f"S{others}"
+        for next_state, _ in row.values():
+            if next_state not in seen:
+                seen.add(next_state)
+                queue.append(next_state)
+
+    transitions = {names[state]: {symbol: (names[next_state], output)
+                                  for symbol, (next_state, output) in minimal[state].items()}
+                   for state in minimal}
+    return RegexAutomaton(expression, params, transitions,
+                          {names[state] for state in minimal if state in finals}, alphabet)
+
+
+def load_regex(expression, params=None, cache_dir=None):
+    """
+    Скомпилировать выражение с дисковым кешем по (выражение, параметры).
+    По умолчанию кеш лежит в каталоге .regex_cache рядом с модулем.
+    В файле - словарь to_dict(), а не сам объект: при запуске модуля как
+    скрипта класс назывался бы __main__.RegexAutomaton и не читался бы
+    при импорте.
+    """
+    params = dict(params or {})
+    key = json.dumps([expression, sorted(params.items()), CACHE_VERSION], ensure_ascii=False)
+    digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), CACHE_DIR_NAME)
+    cache_path = os.path.join(cache_dir, digest + '.pickle')
+
+    try:
+        with open(cache_path, 'rb') as f:
+            return RegexAutomaton(**pickle.load(f))
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, TypeError):
+        pass
+
+    automaton = compile_regex(expression, params)
+    os.makedirs(cache_dir, exist_ok=True)
+    temporary = cache_path + f'.{os.getpid()}.tmp'
+    with open(temporary, 'wb') as f:
+        pickle.dump(automaton.to_dict(), f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporary, cache_path)
+    return automaton
+
+
+def test_regex_compiler(max_length=7):
+    """Выражение лабораторной даёт автомат генератора; прочие - язык как у re"""
+    import re
+    import tempfile
+    from itertools import product
+
+    from lab5 import MealyMachineGenerator
+    from mealy_minimize import run_word
+
+    ok = True
+    for n, m, k in ((1, 1, 1), (2, 3, 1), (2, 3, 3), (3, 1, 2)):
+        automaton = compile_regex(LAB_EXPRESSION, {'n': n, 'm': m, 'k': k})
+        transitions = MealyMachineGenerator(n, m, k).generate_automaton()
+        if len(automaton.transitions) != len(minimize(transitions)[0]) or automaton.finals != {"Qfinal"}:
+            ok = False
+            print(f"✗ n={n} m={m} k={k}: автомат не совпал по размеру с минимальным автоматом генератора")
+        for length in range(max_length + 1):
+            for letters in product(SYMBOLS, repeat=length):
+                word = ''.join(letters)
+                if automaton.run(word) != run_word(transitions, word):
+                    ok = False
+                    print(f"✗ n={n} m={m} k={k}: слово '{word}' обрабатывается по-разному")
+                    break
+
+    for expression in ("(x|d)*a", "x{2,3}d?b", "(xa|b)+", "x{2,}|d", "", "(x|)(d|a)*b?"):
+        automaton = compile_regex(expression)
+        pattern = re.compile(expression)
+        for length in range(max_length - 1):
+            for letters in product(SYMBOLS, repeat=length):
+                word = ''.join(letters)
+                if automaton.run(word)[0] != bool(pattern.fullmatch(word)):
+                    ok = False
+                    print(f"✗ '{expression}': слово '{word}'")
+                    break
+
+    with tempfile.TemporaryDirectory() as directory:
+        params = {'n': 2, 'm': 3, 'k': 2}
+        first = load_regex(LAB_EXPRESSION, params, directory)
+        second = load_regex(LAB_EXPRESSION, params, directory)
+        ok = ok and first.transitions == second.transitions and len(os.listdir(directory)) == 1
+
+    if ok:
+        print(f"✓ УСПЕХ! Автоматы по выражениям совпали с генератором и с re на словах длины до {max_length}")
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Автомат Мили по регулярному выражению")
+    parser.add_argument('expression', nargs='?', default=None,
+                        help=f"выражение, например '{LAB_EXPRESSION}'")
+    parser.add_argument('--params', default='', help="параметры 'n=2 m=3 k=3'")
+    parser.add_argument('--word', default=None, help="проверить слово")
+    parser.add_argument('--no-cache', action='store_true')
+    args = parser.parse_args(argv)
+
+    if args.expression is None:
+        test_regex_compiler()
+        return
+
+    try:
+        try:
+            params = {name: int(value) for name, value in (item.split('=') for item in args.params.split())}
+        except ValueError:
+            raise ValueError(f"параметры '{args.params}' должны иметь вид 'n=2 m=3 k=3'")
+        automaton = (compile_regex if args.no_cache else load_regex)(args.expression, params)
+    except ValueError as e:
+        print(f"Ошибка: {e}")
+        return
+
+    print(f"Автоматная матрица для {args.expression} {args.params}".rstrip())
+    print(f"Состояний: {len(automaton.transitions)}, принимающие: {', '.join(sorted(automaton.finals))}")
+    print("Состояние | " + " | ".join(automaton.alphabet))
+    print("-" * 80)
+    for state, row in automaton.transitions.items():
+        print(" | ".join([state] + [f"{row[s][0]}/{row[s][1]}" for s in automaton.alphabet]))
+    if args.word is not None:
+        accepted, output = automaton.run(args.word)
+        print(f"\nСлово '{args.word}': выход {output}, {'ПРИНЯТО' if accepted else 'ОТВЕРГНУТО'}")
+
+
+if __name__ == '__main__':
+    main()